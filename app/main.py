@@ -14,16 +14,25 @@ from flask import Flask, jsonify, redirect, url_for
 from dotenv import load_dotenv
 load_dotenv()
 
-# Import Supabase client
-from supabase import create_client, Client
-
 # Get environment variables
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 RENDER = os.getenv('RENDER', 'False').lower() == 'true'
 
-# Initialize Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY) if SUPABASE_URL and SUPABASE_KEY else None
+_supabase = None
+
+
+def get_supabase():
+    """
+    Supabase client, created on first use.
+    Importing supabase and building the client is slow, so it is kept off
+    the startup path.
+    """
+    global _supabase
+    if _supabase is None and SUPABASE_URL and SUPABASE_KEY:
+        from supabase import create_client
+        _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase
 
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'dev-secret-key')
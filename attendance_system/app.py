@@ -1,36 +1,35 @@
+import logging
 import os
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from flask import Flask
+import threading
+from datetime import datetime, date, time, timedelta
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, make_response
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func, select, insert, update, exists, literal, union_all, and_, or_
 from dotenv import load_dotenv
 
 load_dotenv() # This must come before using os.getenv
 
-app = Flask(__name__)
-app.secret_key = os.getenv('SECRET_KEY') or 'dev_fallback_key_change_in_production'
+# Heavy or rarely used modules (smtplib/email, pytz, csv, fpdf) are imported
+# where they are used, and the Flask app itself is only built by
+# create_app(), so importing this module stays cheap for gunicorn workers
+# and scripts. See check_import_time.py for the budget.
+
+from route_registry import RouteRegistry
+from logging_setup import setup_logging
 
-# Enable CORS for all domains (needed for Render deployment)
-from flask_cors import CORS
-CORS(app, resources={r"/api/*": {"origins": "*"}})
+# Named explicitly so LOG_LEVELS=app=DEBUG also applies under `python app.py`
+logger = logging.getLogger('app')
+
+routes = RouteRegistry()
 
 # Add cache control headers to prevent caching
-@app.after_request
+@routes.after_request
 def add_header(response):
     response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '-1'
     return response
 
-# Continue with other imports after app and secret_key are defined
-from datetime import datetime, date, time, timedelta
-from flask import render_template, request, jsonify, redirect, url_for, session, make_response
-from flask_sqlalchemy import SQLAlchemy
-import pytz
-from sqlalchemy import func
-
-
-
 
 # =====================================================
 # CONFIGURATION
@@ -44,34 +43,145 @@ DATABASE_URL = os.environ.get('DATABASE_URL') or os.environ.get('POSTGRES_URL')
 if DATABASE_URL and DATABASE_URL.startswith('postgres://'):
     DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
 
-print(f"📊 Database URL: {DATABASE_URL[:50]}...")
-
 # =====================================================
 # ENGINE FIX: Configure SSL for Supabase PostgreSQL
 # =====================================================
-if DATABASE_URL and 'postgresql' in DATABASE_URL:
-    # Use Flask-SQLAlchemy's engine_options for SSL
-    app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-        'pool_pre_ping': True,
-        'pool_recycle': 300,
-        'pool_size': 5,
-        'max_overflow': 10,
-        'connect_args': {
-            'sslmode': 'require',
-            'connect_timeout': 30,  # Increased timeout
-            'keepalives': 1,
-            'keepalives_idle': 30
-        }
-    }
-    print("🔒 SSL mode enabled for PostgreSQL")
-else:
-    # SQLite configuration (local development)
-    app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Connection profile (direct QueuePool vs external pooler) is chosen in
+# db_pool.py from DB_POOL_PROFILE and the URL (port 6543 = Supabase pooler)
+from db_pool import (build_engine_options, resolve_profile, warm_pool_in_background,
+                     pool_stats, track_checkouts, DB_POOL_WARMUP)
+
+DB_PROFILE = resolve_profile(DATABASE_URL)
+
+# expire_on_commit=False: responses are built from the objects we just wrote,
+# so don't re-SELECT them after every commit (one round trip each to EU West)
+db = SQLAlchemy(session_options={'expire_on_commit': False})
+
+# Per-request DB round-trip counting (X-DB-Round-Trips header, budgets)
+from query_stats import init_query_stats, roundtrip_budget
+
+# Monthly / fiscal-year aggregates (materialized views on PostgreSQL)
+from reporting import (init_reporting, ensure_reporting_views, request_refresh,
+                       reporting_backlog, invalidate_cached_reports)
+
+# Closed fiscal years / months served from the report cache
+from historical_reports import (fiscal_year_reports, fiscal_year_summaries, monthly_summaries,
+                                next_month, report_fiscal_years, staff_figures, default_days_worked)
+
+# Closed fiscal years live in attendance_archive
+from archive import (init_archive, attendance_archive, archived_attendance_select,
+                     attendance_history_select, fiscal_year_bounds, fiscal_year_of)
+
+# One row per employee per working day (status, weight, minutes worked)
+from attendance_facts import attendance_daily, ensure_fact_table, mark_facts_dirty, sync_facts
+
+# /livez, /readyz and /health (cached database probe)
+from health import init_health
+
+# Prometheus /metrics (latency, status, SQL statements per endpoint)
+from metrics import init_metrics
+
+# Statement fingerprints, top-N by total time (/admin/slow-queries)
+from slow_queries import init_slow_query_log
+
+# Casual workers keyed by normalized phone number
+from casual_workers import (CASUAL_LOOKUP_LIMIT, CASUAL_LOOKUP_MIN_DIGITS, CASUAL_MAX_SHIFT_HOURS,
+                            migrate_casual_history, needs_migration, normalize_phone,
+                            phone_prefix_bounds, upsert_worker_stmt)
+
+# Casual hours per worker / work type for payroll periods
+from casual_payroll import init_casual_payroll, shift_hours
+
+# Approval emails are queued here and sent by the scheduler's outbox job
+from outbox import queue_email, outbox_status
+
+# Periodic jobs, run once per cluster by the elected leader process
+from scheduler import init_scheduler, SCHEDULER_ENABLED
+
+
+# =====================================================
+# APP FACTORY
+# =====================================================
+
+def background_backlog():
+    """Pending background work for /readyz: report refresh and email outbox"""
+    backlog = reporting_backlog()
+    backlog['outbox'] = outbox_status(db)
+    return backlog
+
+
+def create_app(config=None):
+    """
+    Build and configure a Flask application.
+
+    Args:
+        config: optional dict applied on top of the environment settings
+                (e.g. {'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+
+    Returns:
+        Flask: app with the database, CORS, request hooks and all routes
+    """
+    setup_logging()
+    flask_app = Flask(__name__)
+    flask_app.secret_key = os.getenv('SECRET_KEY') or 'dev_fallback_key_change_in_production'
+    flask_app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
+    flask_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if config:
+        flask_app.config.update(config)
+
+    database_url = flask_app.config['SQLALCHEMY_DATABASE_URI']
+    profile = resolve_profile(database_url)
+    logger.info("📊 Database URL: %s...", database_url[:50])
+    if profile != 'sqlite' and 'SQLALCHEMY_ENGINE_OPTIONS' not in flask_app.config:
+        flask_app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(database_url, profile)
+        logger.info("🔒 SSL mode enabled for PostgreSQL (connection profile: %s)", profile)
+
+    # Enable CORS for all domains (needed for Render deployment)
+    from flask_cors import CORS
+    CORS(flask_app, resources={r"/api/*": {"origins": "*"}})
+
+    db.init_app(flask_app)
+    with flask_app.app_context():
+        track_checkouts(db.engine)
+
+    init_query_stats(flask_app, db)
+    init_reporting(flask_app, db)
+    init_archive(flask_app, db)
+    init_health(flask_app, db, backlog=background_backlog)
+    init_metrics(flask_app, db)
+    init_slow_query_log(flask_app, db)
+    init_casual_payroll(flask_app, db)
+    init_scheduler(flask_app, db)
+    routes.register(flask_app)
+
+    # Under `gunicorn --preload` (gunicorn.conf.py) each worker warms its own
+    # pool after fork; connections opened here would be shared by the forks
+    if DB_POOL_WARMUP > 0 and os.getenv('ATTENDANCE_PRELOADED') != '1':
+        warm_pool_in_background(flask_app, db)
+    return flask_app
+
+
+_app = None
+_app_lock = threading.Lock()
+
+
+def get_app():
+    """The process-wide application, created on first use"""
+    global _app
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                _app = create_app()
+    return _app
+
+
+def __getattr__(name):
+    # `from app import app` (scripts) and gunicorn's `app:app` build the
+    # application on first access instead of at import
+    if name == 'app':
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-db = SQLAlchemy(app)
 
 # =====================================================
 # GUNICORN COMPATIBLE INITIALIZATION
@@ -80,17 +190,51 @@ db = SQLAlchemy(app)
 # to avoid blocking startup when database is temporarily unavailable
 # The init_db() function is defined but NOT called at module level
 
+# Advisory lock key serializing schema migrations across hosts
+SCHEMA_MIGRATION_LOCK_KEY = 0x41545445
+
+
+def migrate_database():
+    """
+    Bring the schema up to date: missing tables, the casual worker registry
+    migration, model indexes and reporting views. Runs before any worker
+    serves: the gunicorn master (when_ready), `python app.py`, init_db() or
+    `python casual_workers.py --migrate` as a deploy step.
+
+    On PostgreSQL a transaction-level advisory lock, held open on its own
+    connection for the whole run, makes hosts starting together migrate one
+    at a time (the casual migration ends in DROP COLUMN); a transaction
+    keeps its server connection behind the transaction pooler, a session
+    lock would not. Waiters re-check and find nothing left to do.
+    """
+    with get_app().app_context():
+        lock = None
+        if db.engine.dialect.name == 'postgresql':
+            lock = db.engine.connect()
+            lock.execute(db.text("SET LOCAL statement_timeout = 0"))
+            lock.execute(db.text("SELECT pg_advisory_xact_lock(:key)"), {'key': SCHEMA_MIGRATION_LOCK_KEY})
+        try:
+            db.create_all()
+            migrate_casual_history(db)
+            ensure_indexes()
+            ensure_reporting_views(db)
+        finally:
+            if lock is not None:
+                # Rolling back the lock's transaction releases it
+                lock.close()
+
+
 def init_db():
     """Initialize database tables - safe to call multiple times"""
     try:
-        with app.app_context():
-            db.create_all()
-            print("✅ Database tables created/verified (lazy init)")
+        migrate_database()
+        with get_app().app_context():
+            logger.info("✅ Database tables created/verified (lazy init)")
             # Only seed if using SQLite (local dev)
             if 'sqlite' in DATABASE_URL:
                 seed_staff()
     except Exception as e:
-        print(f"⚠️ Database initialization warning: {e}")
+        logger.warning("⚠️ Database initialization warning: %s", e)
 
 # NOTE: We no longer call init_db() at module level to prevent startup blocking
 # Database will be initialized on first request instead
@@ -103,6 +247,12 @@ ADMIN_PASSWORD = 'RAV4Adventure2019'
 # Late threshold time (08:15 AM)
 LATE_THRESHOLD = time(8, 15)
 
+
+def nairobi_today():
+    """Today's date in Nairobi (pytz is imported on first use)"""
+    import pytz
+    return datetime.now(pytz.timezone('Africa/Nairobi')).date()
+
 # =====================================================
 # EMAIL CONFIGURATION
 # =====================================================
@@ -120,6 +270,8 @@ EMAIL_FROM_NAME = os.getenv('EMAIL_FROM_NAME', 'Attendance System')
 def send_leave_approval_email(staff_email, staff_name, start_date, end_date, total_days, leave_type, remaining_balance):
     """
     Send an email notification when a leave request is approved.
+    With the scheduler enabled the email is queued in email_outbox and sent
+    by the outbox job (see scheduler.py) instead of inside the request.
     
     Args:
         staff_email: Staff email address
@@ -131,14 +283,14 @@ def send_leave_approval_email(staff_email, staff_name, start_date, end_date, tot
         remaining_balance: Remaining leave balance after approval
     
     Returns:
-        bool: True if email was sent successfully, False otherwise
+        bool: True if the email was sent (or queued), False otherwise
     """
     if not EMAIL_ENABLED:
-        print(f"📧 Email notification skipped (EMAIL_ENABLED=false): To {staff_email}")
+        logger.info("📧 Email notification skipped (EMAIL_ENABLED=false): To %s", staff_email)
         return False
     
     if not staff_email:
-        print(f"📧 Email notification skipped: No email address for {staff_name}")
+        logger.info("📧 Email notification skipped: No email address for %s", staff_name)
         return False
     
     try:
@@ -173,28 +325,42 @@ Best regards,
 Attendance System
 """
         
-        # Create message
-        msg = MIMEMultipart()
-        msg['From'] = f"{EMAIL_FROM_NAME} <{EMAIL_FROM}>"
-        msg['To'] = staff_email
-        msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'plain'))
-        
-        # Connect to server and send
-        with smtplib.SMTP(EMAIL_HOST, EMAIL_PORT) as server:
-            if EMAIL_USE_TLS:
-                server.starttls()
-            if EMAIL_USERNAME and EMAIL_PASSWORD:
-                server.login(EMAIL_USERNAME, EMAIL_PASSWORD)
-            server.send_message(msg)
-        
-        print(f"📧 Approval email sent to {staff_email}: {staff_name} - {days_display} days ({leave_type})")
+        if SCHEDULER_ENABLED:
+            # Sent by the scheduler's outbox job, off the request path
+            queue_email(db, staff_email, subject, body)
+            logger.info("📧 Approval email queued for %s: %s - %s days (%s)", staff_email, staff_name, days_display, leave_type)
+            return True
+        
+        deliver_email(staff_email, subject, body)
+        logger.info("📧 Approval email sent to %s: %s - %s days (%s)", staff_email, staff_name, days_display, leave_type)
         return True
         
     except Exception as e:
-        print(f"❌ Failed to send approval email to {staff_email}: {str(e)}")
+        logger.exception("❌ Failed to send approval email to %s: %s", staff_email, e)
         return False
 
+
+def deliver_email(recipient, subject, body):
+    """Send one plain-text email over SMTP (raises on failure)"""
+    import smtplib
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+    
+    # Create message
+    msg = MIMEMultipart()
+    msg['From'] = f"{EMAIL_FROM_NAME} <{EMAIL_FROM}>"
+    msg['To'] = recipient
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    
+    # Connect to server and send
+    with smtplib.SMTP(EMAIL_HOST, EMAIL_PORT, timeout=30) as server:
+        if EMAIL_USE_TLS:
+            server.starttls()
+        if EMAIL_USERNAME and EMAIL_PASSWORD:
+            server.login(EMAIL_USERNAME, EMAIL_PASSWORD)
+        server.send_message(msg)
+
 # =====================================================
 # DATABASE MODELS (SQLAlchemy 2.0 compatible)
 # =====================================================
@@ -233,20 +399,25 @@ class Staff(db.Model):
         return self.last_name
     
     def to_dict(self):
+        return Staff.serialize(self)
+    
+    @staticmethod
+    def serialize(row):
+        """JSON shape shared by ORM objects and Core rows"""
         return {
-            'id': self.id,
-            'emp_id': self.id,
-            'employee_code': self.employee_code,
-            'first_name': self.first_name,
-            'last_name': self.last_name,
-            'full_name': f"{self.first_name} {self.last_name}",
-            'email': self.email,
-            'phone': self.phone,
-            'department': self.department,
-            'join_date': self.join_date.isoformat() if self.join_date else None,
-            'is_active': self.is_active,
-            'leave_balance': self.leave_balance,
-            'annual_leave_balance': self.leave_balance
+            'id': row.id,
+            'emp_id': row.id,
+            'employee_code': row.employee_code,
+            'first_name': row.first_name,
+            'last_name': row.last_name,
+            'full_name': f"{row.first_name} {row.last_name}",
+            'email': row.email,
+            'phone': row.phone,
+            'department': row.department,
+            'join_date': row.join_date.isoformat() if row.join_date else None,
+            'is_active': row.is_active,
+            'leave_balance': row.leave_balance,
+            'annual_leave_balance': row.leave_balance
         }
 
 
@@ -271,17 +442,22 @@ class Attendance(db.Model):
         staff_name = None
         if self.staff:
             staff_name = f"{self.staff.first_name} {self.staff.last_name}"
+        return Attendance.serialize(self, staff_name)
+    
+    @staticmethod
+    def serialize(row, staff_name=None):
+        """JSON shape shared by ORM objects and RETURNING rows"""
         return {
-            'id': self.id,
-            'emp_id': self.staff_id,
-            'staff_id': self.staff_id,
-            'work_date': self.work_date.isoformat() if self.work_date else None,
-            'clock_in': self.clock_in.strftime('%H:%M') if self.clock_in else None,
-            'clock_out': self.clock_out.strftime('%H:%M') if self.clock_out else None,
-            'day_type': self.day_type,
-            'status': self.status,
-            'is_late': self.is_late,
-            'notes': self.notes,
+            'id': row.id,
+            'emp_id': row.staff_id,
+            'staff_id': row.staff_id,
+            'work_date': row.work_date.isoformat() if row.work_date else None,
+            'clock_in': row.clock_in.strftime('%H:%M') if row.clock_in else None,
+            'clock_out': row.clock_out.strftime('%H:%M') if row.clock_out else None,
+            'day_type': row.day_type,
+            'status': row.status,
+            'is_late': row.is_late,
+            'notes': row.notes,
             'staff_name': staff_name
         }
 
@@ -355,28 +531,73 @@ class Holiday(db.Model):
         }
 
 
+class CasualWorker(db.Model):
+    """One row per casual worker, keyed by normalized phone (see casual_workers.py)"""
+    __tablename__ = 'casual_workers'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    phone_number = db.Column(db.String(20), unique=True, nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    default_work_type = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'phone_number': self.phone_number,
+            'name': self.name,
+            'default_work_type': self.default_work_type
+        }
+
+
 class CasualAttendance(db.Model):
     __tablename__ = 'casual_attendance'
+    __table_args__ = (
+        # Gate traffic: today's board, and clock-outs resolving the open shift
+        db.Index('ix_casual_attendance_work_date', 'work_date'),
+        # Per-worker history is a range scan
+        db.Index('ix_casual_attendance_worker_date', 'worker_id', 'work_date'),
+        # Partial: only shifts still open, so it stays a few rows deep
+        db.Index('ix_casual_attendance_open_shift', 'worker_id', 'work_date', 'clock_in',
+                 postgresql_where=db.text('clock_out IS NULL'),
+                 sqlite_where=db.text('clock_out IS NULL')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
-    phone_number = db.Column(db.String(20), nullable=False)
+    worker_id = db.Column(db.Integer, db.ForeignKey('casual_workers.id'), nullable=False)
     work_type = db.Column(db.String(50), nullable=False)  # Loading, Cleaning, Workshop, etc.
     clock_in = db.Column(db.Time, nullable=False)
     clock_out = db.Column(db.Time)
     work_date = db.Column(db.Date, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Joined so lists of shifts (dashboard, logs, CSV export) stay one query
+    worker = db.relationship('CasualWorker', lazy='joined', innerjoin=True)
+    
+    @property
+    def name(self):
+        return self.worker.name
+    
+    @property
+    def phone_number(self):
+        return self.worker.phone_number
+    
     def to_dict(self):
+        return CasualAttendance.serialize(self)
+    
+    @staticmethod
+    def serialize(row):
+        """JSON shape shared by ORM objects and RETURNING rows"""
         return {
-            'id': self.id,
-            'name': self.name,
-            'phone_number': self.phone_number,
-            'work_type': self.work_type,
-            'clock_in': self.clock_in.strftime('%H:%M') if self.clock_in else None,
-            'clock_out': self.clock_out.strftime('%H:%M') if self.clock_out else None,
-            'work_date': self.work_date.isoformat() if self.work_date else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'id': row.id,
+            'worker_id': row.worker_id,
+            'name': row.name,
+            'phone_number': row.phone_number,
+            'work_type': row.work_type,
+            'clock_in': row.clock_in.strftime('%H:%M') if row.clock_in else None,
+            'clock_out': row.clock_out.strftime('%H:%M') if row.clock_out else None,
+            'work_date': row.work_date.isoformat() if row.work_date else None,
+            'created_at': row.created_at.isoformat() if row.created_at else None
         }
 
 
@@ -541,6 +762,347 @@ def is_late_arrival(clock_in_time):
     return clock_in_time > LATE_THRESHOLD
 
 
+# =====================================================
+# ROUND-TRIP MINIMIZED QUERIES
+# =====================================================
+# Each statement below is one network round trip. They run on an autocommit
+# connection so psycopg2 doesn't add BEGIN/COMMIT round trips around them.
+
+ATTENDANCE_COLUMNS = (
+    Attendance.id, Attendance.staff_id, Attendance.work_date, Attendance.clock_in,
+    Attendance.clock_out, Attendance.day_type, Attendance.status, Attendance.is_late,
+    Attendance.notes
+)
+
+
+def execute_single_round_trip(stmt):
+    """Execute one statement outside a transaction and return its rows"""
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        return conn.execute(stmt).all()
+
+
+def _first_attendance_today(today):
+    """CTE: each staff member's first attendance row for `today`"""
+    return (
+        select(Attendance.staff_id, func.min(Attendance.id).label('attendance_id'))
+        .where(Attendance.work_date == today)
+        .group_by(Attendance.staff_id)
+        .cte('today_att')
+    )
+
+
+def today_attendance_stmt(today):
+    """
+    Active staff with today's attendance and approved-leave flag in one query.
+    
+    Rows are (id, first_name, last_name, employee_code, leave_balance,
+    clock_in, clock_out, on_leave) ordered by employee code.
+    """
+    today_att = _first_attendance_today(today)
+    on_leave = (
+        select(LeaveRequest.staff_id)
+        .where(
+            LeaveRequest.status == 'Approved',
+            LeaveRequest.start_date <= today,
+            LeaveRequest.end_date >= today
+        )
+        .distinct()
+        .cte('on_leave')
+    )
+    return (
+        select(
+            Staff.id, Staff.first_name, Staff.last_name, Staff.employee_code,
+            Staff.leave_balance, Attendance.clock_in, Attendance.clock_out,
+            on_leave.c.staff_id.isnot(None).label('on_leave')
+        )
+        .outerjoin(today_att, today_att.c.staff_id == Staff.id)
+        .outerjoin(Attendance, Attendance.id == today_att.c.attendance_id)
+        .outerjoin(on_leave, on_leave.c.staff_id == Staff.id)
+        .where(Staff.is_active == True)
+        .order_by(Staff.employee_code.asc())
+    )
+
+
+def today_attendance_rows(today):
+    return execute_single_round_trip(today_attendance_stmt(today))
+
+
+def today_attendance_payload(today, rows):
+    """JSON body of GET /api/attendance/today"""
+    result = []
+    for row in rows:
+        # First check: Is employee on approved leave today?
+        if row.on_leave:
+            status = 'On Leave'
+            clock_in = ''
+            clock_out = ''
+            is_late = False
+        elif row.clock_in is not None:
+            # Second check: attendance row for today
+            status = 'Present' if not row.clock_out else 'Clocked Out'
+            clock_in = row.clock_in.strftime('%H:%M')
+            clock_out = row.clock_out.strftime('%H:%M') if row.clock_out else ''
+            # Check if late based on 08:15 AM threshold
+            is_late = is_late_arrival(row.clock_in)
+        else:
+            # Third: No leave, no attendance = Not Clocked In
+            status = 'Not Clocked In'
+            clock_in = ''
+            clock_out = ''
+            is_late = False
+        
+        result.append({
+            'id': row.id,
+            'emp_id': row.id,
+            'employee_name': f"{row.first_name} {row.last_name}",
+            'employee_code': row.employee_code,
+            'status': status,
+            'clock_in': clock_in,
+            'clock_out': clock_out,
+            'is_late': is_late,
+            'leave_balance': row.leave_balance
+        })
+    
+    return {
+        'success': True,
+        'date': today.isoformat(),
+        'employees': result
+    }
+
+
+def employees_stmt(today):
+    """Active staff with today's first clock-in, ordered by employee code"""
+    today_att = _first_attendance_today(today)
+    return (
+        select(*Staff.__table__.c, Attendance.clock_in.label('today_clock_in'))
+        .outerjoin(today_att, today_att.c.staff_id == Staff.id)
+        .outerjoin(Attendance, Attendance.id == today_att.c.attendance_id)
+        .where(Staff.is_active == True)
+        .order_by(Staff.employee_code.asc())
+    )
+
+
+def employees_payload(today, rows):
+    """JSON body of GET /api/employees"""
+    result = []
+    for row in rows:
+        staff_dict = Staff.serialize(row)
+        
+        # Check if late today (after 08:15 AM)
+        if row.today_clock_in:
+            staff_dict['is_late_today'] = is_late_arrival(row.today_clock_in)
+            if staff_dict['is_late_today']:
+                staff_dict['late_minutes'] = (
+                    (datetime.combine(today, row.today_clock_in) - datetime.combine(today, LATE_THRESHOLD)).total_seconds() / 60
+                )
+        else:
+            staff_dict['is_late_today'] = False
+        
+        result.append(staff_dict)
+    
+    return {
+        'success': True,
+        'employees': result
+    }
+
+
+def casual_today_stmt(today):
+    return (
+        select(CasualAttendance.__table__, CasualWorker.name, CasualWorker.phone_number)
+        .join(CasualWorker, CasualWorker.id == CasualAttendance.worker_id)
+        .where(CasualAttendance.work_date == today)
+        .order_by(CasualAttendance.clock_in.desc())
+    )
+
+
+def casual_today_payload(today, rows):
+    """JSON body of GET /api/casual/today"""
+    return {
+        'success': True,
+        'date': today.isoformat(),
+        'casuals': [CasualAttendance.serialize(row) for row in rows]
+    }
+
+
+def casual_clock_in_rows(name, phone_number, work_type, today, now):
+    """
+    Register (or update) the worker and open a shift.
+
+    One round trip on PostgreSQL (the worker upsert is a CTE of the shift
+    INSERT); SQLite runs the upsert and the INSERT back to back.
+
+    Returns:
+        list: the new casual_attendance row, with name and phone_number
+    """
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        upsert = upsert_worker_stmt(CasualWorker.__table__, conn.dialect.name,
+                                    phone_number, name, work_type)
+        shift = {'work_type': work_type, 'clock_in': now, 'work_date': today,
+                 'created_at': datetime.utcnow()}
+        returning = (*CasualAttendance.__table__.c,
+                     literal(name).label('name'), literal(phone_number).label('phone_number'))
+        if conn.dialect.name == 'postgresql':
+            worker = upsert.cte('worker')
+            stmt = insert(CasualAttendance).from_select(
+                ['worker_id', *shift],
+                select(worker.c.id, *(literal(value) for value in shift.values()))
+            )
+        else:
+            stmt = insert(CasualAttendance).values(worker_id=conn.execute(upsert).scalar_one(), **shift)
+        return conn.execute(stmt.returning(*returning)).all()
+
+
+def casual_clock_out_stmt(phone_number, now):
+    """
+    Close the newest open shift for `phone_number` in one UPDATE ... RETURNING.
+
+    The shift is found through ix_casual_attendance_open_shift and may have
+    started on the previous day (night shifts), as long as it began within
+    CASUAL_MAX_SHIFT_HOURS of `now`.
+    """
+    window_start = now - timedelta(hours=CASUAL_MAX_SHIFT_HOURS)
+    worker_id = select(CasualWorker.id).where(CasualWorker.phone_number == phone_number).scalar_subquery()
+    worker_name = (select(CasualWorker.name)
+                   .where(CasualWorker.id == CasualAttendance.worker_id)
+                   .scalar_subquery())
+    open_shift = (
+        select(CasualAttendance.id)
+        .where(
+            CasualAttendance.worker_id == worker_id,
+            CasualAttendance.clock_out.is_(None),
+            or_(
+                CasualAttendance.work_date > window_start.date(),
+                and_(CasualAttendance.work_date == window_start.date(),
+                     CasualAttendance.clock_in >= window_start.time())
+            ),
+            CasualAttendance.work_date <= now.date()
+        )
+        .order_by(CasualAttendance.work_date.desc(), CasualAttendance.clock_in.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    return (
+        update(CasualAttendance)
+        .where(CasualAttendance.id == open_shift)
+        .values(clock_out=now.time())
+        .returning(*CasualAttendance.__table__.c, worker_name.label('name'),
+                   literal(phone_number).label('phone_number'))
+    )
+
+
+def casual_worker_lookup_stmt(prefix):
+    """Workers whose phone number starts with `prefix` (unique-index range scan)"""
+    low, high = phone_prefix_bounds(prefix)
+    return (
+        select(CasualWorker.__table__)
+        .where(CasualWorker.phone_number >= low, CasualWorker.phone_number < high)
+        .order_by(CasualWorker.phone_number)
+        .limit(CASUAL_LOOKUP_LIMIT)
+    )
+
+
+def ensure_indexes():
+    """Create missing model indexes (no migrations: see migrate_database())"""
+    if needs_migration(db):
+        raise RuntimeError("casual_attendance predates the worker registry: "
+                           "run `python casual_workers.py --migrate` first")
+    for index in CasualAttendance.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+
+
+def leave_balance_stmt(staff_id):
+    return select(Staff.leave_balance).where(Staff.id == staff_id)
+
+
+def leave_balance_payload(staff_id, rows):
+    """(JSON body, status code) of GET /api/leave/balance/<staff_id>"""
+    if not rows:
+        return {'success': False, 'error': 'Staff not found'}, 404
+    
+    leave_balance = rows[0].leave_balance
+    return {
+        'success': True,
+        'staff_id': staff_id,
+        'leave_balance': leave_balance,
+        'is_low': leave_balance <= 3
+    }, 200
+
+
+def has_attendance(staff_id, work_date):
+    """True when the employee has a live or archived attendance row that day"""
+    if Attendance.query.filter_by(staff_id=staff_id, work_date=work_date).first():
+        return True
+    archived = archived_attendance_select(work_date, work_date)
+    return archived is not None and db.session.execute(
+        archived.where(attendance_archive.c.staff_id == staff_id).limit(1)
+    ).first() is not None
+
+
+def upsert_attendance(staff_id, work_date, clock_in, clock_out, day_type, is_late):
+    """
+    Clock in (insert) or clock out (update) an attendance row.
+    
+    On PostgreSQL this is a single statement: a writable CTE updates the
+    existing row or inserts a new one, RETURNING the row joined to the staff
+    name. SQLite has no writable CTEs, so it uses UPDATE/INSERT ... RETURNING.
+    
+    Returns:
+        tuple: (row, staff_name, created) where row has ATTENDANCE_COLUMNS
+    """
+    existing_id = (
+        select(func.min(Attendance.id))
+        .where(Attendance.staff_id == staff_id, Attendance.work_date == work_date)
+        .scalar_subquery()
+    )
+    changes = {'status': 'Present'}
+    if clock_out:
+        changes['clock_out'] = clock_out
+    upd = update(Attendance).where(Attendance.id == existing_id).values(**changes)
+    
+    new_row = {
+        'staff_id': staff_id,
+        'work_date': work_date,
+        'clock_in': clock_in,
+        'day_type': day_type,
+        'is_late': is_late,
+        'status': 'Present' if not is_late else 'Late',
+        'created_at': datetime.utcnow()
+    }
+    
+    if db.engine.dialect.name == 'postgresql':
+        upd_cte = upd.returning(*ATTENDANCE_COLUMNS).cte('upd')
+        ins_cte = (
+            insert(Attendance)
+            .from_select(
+                list(new_row),
+                select(*[literal(v, Attendance.__table__.c[k].type) for k, v in new_row.items()])
+                .where(~exists(select(upd_cte.c.id)))
+            )
+            .returning(*ATTENDANCE_COLUMNS)
+            .cte('ins')
+        )
+        written = union_all(
+            select(upd_cte, literal(False).label('created')),
+            select(ins_cte, literal(True).label('created'))
+        ).subquery('written')
+        stmt = (
+            select(written, Staff.first_name, Staff.last_name)
+            .outerjoin(Staff, Staff.id == written.c.staff_id)
+        )
+        row = execute_single_round_trip(stmt)[0]
+        staff_name = f"{row.first_name} {row.last_name}" if row.first_name else None
+        return row, staff_name, row.created
+    
+    with db.engine.begin() as conn:
+        row = conn.execute(upd.returning(*ATTENDANCE_COLUMNS)).first()
+        created = row is None
+        if created:
+            row = conn.execute(insert(Attendance).values(**new_row).returning(*ATTENDANCE_COLUMNS)).first()
+        names = conn.execute(select(Staff.first_name, Staff.last_name).where(Staff.id == staff_id)).first()
+    staff_name = f"{names.first_name} {names.last_name}" if names else None
+    return row, staff_name, created
+
+
 def seed_staff():
     """Pre-populate 22 staff members"""
     try:
@@ -572,9 +1134,9 @@ def seed_staff():
             db.session.add(staff)
         
         db.session.commit()
-        print(f"✅ Seeded {len(staff_members)} staff members")
+        logger.info("✅ Seeded %d staff members", len(staff_members))
     except Exception as e:
-        print(f"⚠️  Error seeding staff: {e}")
+        logger.warning("⚠️  Error seeding staff: %s", e)
         db.session.rollback()
 
 
@@ -582,7 +1144,7 @@ def seed_staff():
 # ROUTES
 # =====================================================
 
-@app.route('/')
+@routes.route('/')
 def index():
     """Home page - Staff Clock In/Out and Leave Request"""
     try:
@@ -597,7 +1159,7 @@ def index():
                               today=today,
                               attendance=attendance_dict)
     except Exception as e:
-        print(f"❌ ERROR in index: {str(e)}")
+        logger.exception("❌ ERROR in index: %s", e)
         return render_template('staff/index.html', 
                               staff=[], 
                               today=date.today(),
@@ -605,13 +1167,13 @@ def index():
                               error=str(e))
 
 
-@app.route('/casual')
+@routes.route('/casual')
 def casual_page():
     """Casual worker attendance page"""
     return render_template('casual.html')
 
 
-@app.route('/debug')
+@routes.route('/debug')
 def debug_status():
     """Debug/Status page"""
     db_type = "PostgreSQL (Supabase)" if "postgresql" in DATABASE_URL else "SQLite (Local)"
@@ -621,37 +1183,26 @@ def debug_status():
                           supabase_url=SUPABASE_URL)
 
 
-@app.route('/health')
-def health_check():
-    """Health check endpoint for Render"""
-    try:
-        # Test database connection with a simple query
-        db.session.execute(db.text('SELECT 1'))
-        staff_count = Staff.query.count()
-        
-        return jsonify({
-            'status': 'healthy',
-            'database': 'connected',
-            'staff_count': staff_count,
-            'timestamp': datetime.utcnow().isoformat()
-        }), 200
-    except Exception as e:
-        return jsonify({
-            'status': 'unhealthy',
-            'database': 'error',
-            'error': str(e),
-            'timestamp': datetime.utcnow().isoformat()
-        }), 503  # Return 503 so Render knows the service is down
-
+@routes.route('/admin/pool-stats')
+def admin_pool_stats():
+    """Connection pool statistics (checked out, overflow, checkout wait time)"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    
+    return jsonify({
+        'success': True,
+        'profile': DB_PROFILE,
+        'pool': pool_stats(db.engine)
+    })
 
 
-@app.route('/staff')
+@routes.route('/staff')
 def staff_portal():
     """Staff portal"""
     return redirect(url_for('index'))
 
 
-@app.route('/admin-login', methods=['GET', 'POST'])
+@routes.route('/admin-login', methods=['GET', 'POST'])
 def admin_login():
     """Admin login page"""
     if request.method == 'POST':
@@ -663,7 +1214,7 @@ def admin_login():
     return render_template('admin/admin_login.html')
 
 
-@app.route('/admin')
+@routes.route('/admin')
 def admin_home():
     """Admin home"""
     if not session.get('admin_logged_in'):
@@ -671,7 +1222,7 @@ def admin_home():
     return redirect(url_for('admin_dashboard'))
 
 
-@app.route('/admin/dashboard')
+@routes.route('/admin/dashboard')
 def admin_dashboard():
     """Admin dashboard - with error handling"""
     if not session.get('admin_logged_in'):
@@ -680,11 +1231,8 @@ def admin_dashboard():
     try:
         staff_members = Staff.query.filter_by(is_active=True).order_by(Staff.employee_code.asc()).all()
         # Use Nairobi timezone for today to match staff clock-ins
-        nairobi_tz = pytz.timezone('Africa/Nairobi')
-        today = datetime.now(nairobi_tz).date()
-        
-        # Debug: Print what date we're looking for
-        print(f"🔍 Admin is looking for: {today}")
+        today = nairobi_today()
+        logger.debug("🔍 Admin is looking for: %s", today)
         
         # Use func.date() to ensure proper date comparison in PostgreSQL
         # Eager load staff relationship to avoid N+1 query
@@ -692,8 +1240,7 @@ def admin_dashboard():
         today_attendance = Attendance.query.options(joinedload(Attendance.staff)).filter(func.date(Attendance.work_date) == today).all()
 
         
-        # Debug: Print how many records found
-        print(f"📊 Found {len(today_attendance)} attendance records for today")
+        logger.debug("📊 Found %d attendance records for today", len(today_attendance))
 
 
         
@@ -769,8 +1316,7 @@ def admin_dashboard():
         # Convert to int to ensure proper comparison in Jinja2 templates
         staff_ids_on_leave_today = [leave.staff_id for leave in today_leaves]
         
-        print(f"📅 Today: {today}")
-        print(f"👥 Employees on leave today: {staff_ids_on_leave_today}")
+        logger.debug("👥 Employees on leave %s: %s", today, staff_ids_on_leave_today)
         
         # Get upcoming approved leaves (future dates) for the schedule table
         upcoming_leaves = LeaveRequest.query.filter(
@@ -787,7 +1333,7 @@ def admin_dashboard():
         
         # Build yearly_summary dict first
         yearly_summary = {}
-        target_years = [2021, 2022, 2023, 2024, 2025, 2026]
+        target_years = report_fiscal_years()
         
         for leave in historical_leaves:
             staff_id = leave.staff_id
@@ -853,12 +1399,8 @@ def admin_dashboard():
         # Get casual worker attendance for today
         casual_today = CasualAttendance.query.filter_by(work_date=today).order_by(CasualAttendance.clock_in.desc()).all()
         
-        # Calculate total casual hours for today
-        total_casual_hours = 0.0
-        for c in casual_today:
-            if c.clock_in and c.clock_out:
-                total_mins = (c.clock_out.hour * 60 + c.clock_out.minute) - (c.clock_in.hour * 60 + c.clock_in.minute)
-                total_casual_hours += total_mins / 60.0
+        # Total casual hours for today (closed shifts only, as in the payroll)
+        total_casual_hours = round(sum(shift_hours(c.clock_in, c.clock_out) or 0 for c in casual_today), 2)
         
         return render_template('admin/dashboard.html',
                              staff=staff_members,
@@ -875,9 +1417,10 @@ def admin_dashboard():
                              all_approved_leaves=all_approved_leaves,
                              staff_ids_on_leave_today=staff_ids_on_leave_today,
                              upcoming_leaves=upcoming_leaves,
-                             yearly_stats=yearly_stats)
+                             yearly_stats=yearly_stats,
+                             report_years=target_years)
     except Exception as e:
-        print(f"❌ ERROR in admin_dashboard: {str(e)}")
+        logger.exception("❌ ERROR in admin_dashboard: %s", e)
         return render_template('admin/dashboard.html', 
                              staff=[],
                              attendance=[],
@@ -891,7 +1434,7 @@ def admin_dashboard():
                              error=f"Database error: {str(e)}")
 
 
-@app.route('/admin/login', methods=['POST'])
+@routes.route('/admin/login', methods=['POST'])
 def admin_login_post():
     """Process admin login"""
     password = request.form.get('password', '')
@@ -901,14 +1444,14 @@ def admin_login_post():
     return render_template('admin/admin_login.html', error='Invalid password')
 
 
-@app.route('/admin/logout')
+@routes.route('/admin/logout')
 def admin_logout():
     """Admin logout"""
     session.pop('admin_logged_in', None)
     return redirect(url_for('admin_login'))
 
 
-@app.route('/admin/add-historical-leave', methods=['GET', 'POST'])
+@routes.route('/admin/add-historical-leave', methods=['GET', 'POST'])
 def add_historical_leave():
     """Add historical leave entry form and handler"""
     if not session.get('admin_logged_in'):
@@ -1005,19 +1548,23 @@ def add_historical_leave():
                 staff_member.sick_leave_balance = max(0, getattr(staff_member, 'sick_leave_balance', 7) - total_days)
             db.session.commit()
         
+        # Historical reports covering these dates must be recomputed
+        invalidate_cached_reports(db, [(start_date, end_date)])
+        mark_facts_dirty(db, emp_id, start_date, end_date)
+        request_refresh()
+        
         return render_template('admin/add_historical_leave.html', 
                             employees=Staff.query.filter_by(is_active=True).order_by(Staff.employee_code.asc()).all(),
                             success=f'Successfully added historical leave for {staff_member.first_name} {staff_member.last_name}. Duration: {total_days} days')
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ ERROR adding historical leave: %s", e)
         return render_template('admin/add_historical_leave.html', 
                             employees=Staff.query.filter_by(is_active=True).order_by(Staff.employee_code.asc()).all(),
                             error=f'Error: {str(e)}')
 
 
-@app.route('/admin-input')
+@routes.route('/admin-input')
 def admin_input():
     """Admin input page"""
     if not session.get('admin_logged_in'):
@@ -1026,7 +1573,7 @@ def admin_input():
 
 
 # Export Leave Summary to CSV
-@app.route('/export_leave_summary')
+@routes.route('/export_leave_summary')
 def export_leave_summary():
     """Export yearly leave summary to CSV with Annual and Sick leave columns"""
     if not session.get('admin_logged_in'):
@@ -1036,43 +1583,26 @@ def export_leave_summary():
         # Get all active employees
         employees = Staff.query.filter_by(is_active=True).order_by(Staff.employee_code.asc()).all()
         
-        # Get all approved leave requests
-        historical_leaves = LeaveRequest.query.filter_by(status='Approved').order_by(LeaveRequest.start_date.desc()).all()
-        
-        # Create name map
-        staff_lookup = {s.id: f"{s.first_name} {s.last_name}" for s in employees}
+        # Every fiscal year the report pages offer
+        target_years = report_fiscal_years()
         
-        # Target years
-        target_years = [2021, 2022, 2023, 2024, 2025, 2026]
+        # Leave per fiscal year (closed years come from the report cache)
+        reports = {year: staff_figures(report)
+                   for year, report in fiscal_year_reports(db, target_years).items()}
         
         # Build yearly stats with separate Annual and Sick leave
         yearly_stats = []
         for emp in employees:
-            emp_id = emp.id
-            # Initialize separate dictionaries for Annual and Sick leave
-            annual_totals = {year: 0.0 for year in target_years}
-            sick_totals = {year: 0.0 for year in target_years}
-            
-            for leave in historical_leaves:
-                if leave.staff_id == emp_id and leave.start_date:
-                    # Calculate fiscal year (October 1st start)
-                    if leave.start_date.month >= 10:
-                        year = leave.start_date.year + 1
-                    else:
-                        year = leave.start_date.year
-                    
-                    if year in target_years:
-                        days = float(leave.total_days) if leave.total_days else 0.0
-                        # Separate by leave type - check for both 'Annual' and 'Annual Leave'
-                        if leave.leave_type in ['Annual', 'Annual Leave']:
-                            annual_totals[year] += days
-                        # Check for both 'Sick' and 'Sick Leave'
-                        elif leave.leave_type in ['Sick', 'Sick Leave']:
-                            sick_totals[year] += days
+            annual_totals = {}
+            sick_totals = {}
+            for year in target_years:
+                annual, sick, _total, _worked = reports[year].get(emp.id, [0.0, 0.0, 0.0, 0.0])
+                annual_totals[year] = annual
+                sick_totals[year] = sick
             
             yearly_stats.append({
-                'emp_id': emp_id,
-                'full_name': staff_lookup.get(emp_id, f"{emp.first_name} {emp.last_name}"),
+                'emp_id': emp.id,
+                'full_name': f"{emp.first_name} {emp.last_name}",
                 'annual': annual_totals,
                 'sick': sick_totals
             })
@@ -1121,9 +1651,7 @@ def export_leave_summary():
         })
     
     except Exception as e:
-        print(f"❌ ERROR exporting CSV: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ ERROR exporting CSV: %s", e)
         return redirect(url_for('admin_dashboard'))
 
 
@@ -1151,7 +1679,7 @@ def export_leave_summary():
 #         self.cell(0, 7, str(value), 0, 1, 'L')
 
 
-@app.route('/api/leave-requests/<int:request_id>/print-pdf')
+@routes.route('/api/leave-requests/<int:request_id>/print-pdf')
 def print_leave_approval_pdf(request_id):
     """Generate a printable PDF for an approved leave request"""
     if not session.get('admin_logged_in'):
@@ -1267,13 +1795,11 @@ def print_leave_approval_pdf(request_id):
         return jsonify({'success': False, 'error': 'PDF generation is currently disabled'}), 503
         
     except Exception as e:
-        print(f"❌ ERROR generating PDF: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ ERROR generating PDF: %s", e)
         return jsonify({'success': False, 'error': f'Error generating PDF: {str(e)}'}), 500
 
 
-@app.route('/api/leave-requests/<int:request_id>/approve-and-download', methods=['POST'])
+@routes.route('/api/leave-requests/<int:request_id>/approve-and-download', methods=['POST'])
 def approve_and_download_pdf(request_id):
     """Approve leave request and return PDF as direct download"""
     if not session.get('admin_logged_in'):
@@ -1310,12 +1836,7 @@ def approve_and_download_pdf(request_id):
         current_date = leave_request.start_date
         while current_date <= leave_request.end_date:
             if current_date.weekday() != 6:
-                existing_att = Attendance.query.filter_by(
-                    staff_id=leave_request.staff_id,
-                    work_date=current_date
-                ).first()
-                
-                if not existing_att:
+                if not has_attendance(leave_request.staff_id, current_date):
                     leave_attendance = Attendance(
                         staff_id=leave_request.staff_id,
                         work_date=current_date,
@@ -1335,6 +1856,8 @@ def approve_and_download_pdf(request_id):
         leave_request.approved_date = datetime.utcnow()
         
         db.session.commit()
+        mark_facts_dirty(db, leave_request.staff_id, leave_request.start_date, leave_request.end_date)
+        request_refresh()
         
         # Send approval email after successful approval
         email_to_use = override_email if override_email else (staff.email if staff else None)
@@ -1446,13 +1969,11 @@ def approve_and_download_pdf(request_id):
         return jsonify({'success': False, 'error': 'PDF generation is currently disabled'}), 503
         
     except Exception as e:
-        print(f"❌ ERROR approving and generating PDF: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ ERROR approving and generating PDF: %s", e)
         return jsonify({'success': False, 'error': f'Error: {str(e)}'}), 500
 
 
-@app.route('/admin/leave')
+@routes.route('/admin/leave')
 def admin_leave():
     """Admin leave management - with error handling"""
     if not session.get('admin_logged_in'):
@@ -1465,20 +1986,22 @@ def admin_leave():
             'leave_requests': [lr.to_dict() for lr in leave_requests]
         })
     except Exception as e:
-        print(f"❌ ERROR loading leave records: {str(e)}")
+        logger.exception("❌ ERROR loading leave records: %s", e)
         return jsonify({
             'success': False,
             'error': f'Database connection failed: {str(e)}'
         }), 500
 
 
-@app.route('/admin/reports')
+@routes.route('/admin/reports')
 def admin_reports():
     """
     Admin reports page - Shows leave and attendance summary by fiscal year.
-    Queries all LeaveRequest records for a specific fiscal_year.
-    Groups them by staff_id to show total days taken per person.
-    Calculates 'Days Worked' by taking 260 (total workdays in a year) and subtracting their total leave days.
+    Approved leave per person and type comes from fiscal_year_reports()
+    (served from the report cache once the year is closed).
+    'Days Worked' is the weighted count of present/late days in the
+    attendance_daily facts; fiscal years before the first recorded attendance
+    fall back to the year's working days minus leave.
     """
     if not session.get('admin_logged_in'):
         return redirect(url_for('admin_login'))
@@ -1499,61 +2022,30 @@ def admin_reports():
     # Get all active staff members
     staff_members = Staff.query.filter_by(is_active=True).order_by(Staff.employee_code.asc()).all()
     
-    # Get all approved leave requests for the selected fiscal year
-    leave_requests = LeaveRequest.query.filter(
-        LeaveRequest.status == 'Approved',
-        LeaveRequest.fiscal_year == fiscal_year
-    ).all()
-    
-    # Group leave requests by staff_id and calculate totals
-    leave_summary = {}
-    for lr in leave_requests:
-        staff_id = lr.staff_id
-        if staff_id not in leave_summary:
-            leave_summary[staff_id] = {
-                'annual_leave_days': 0,
-                'sick_leave_days': 0,
-                'total_leave_days': 0
-            }
-        
-        if lr.leave_type == 'Annual':
-            leave_summary[staff_id]['annual_leave_days'] += lr.total_days
-        elif lr.leave_type == 'Sick':
-            leave_summary[staff_id]['sick_leave_days'] += lr.total_days
-        
-        leave_summary[staff_id]['total_leave_days'] += lr.total_days
-    
-    # Build the summary report
-    TOTAL_WORKDAYS = 260  # Standard workdays per year
+    # Leave and days worked per employee (closed years come from the report cache)
+    report = fiscal_year_reports(db, [fiscal_year])[fiscal_year]
+    figures = staff_figures(report)
+    TOTAL_WORKDAYS = report['total_workdays']
     
     report_data = []
     for staff in staff_members:
         staff_id = staff.id
-        
-        # Get leave summary for this staff member
-        leave_data = leave_summary.get(staff_id, {
-            'annual_leave_days': 0,
-            'sick_leave_days': 0,
-            'total_leave_days': 0
-        })
-        
-        # Calculate days worked
-        days_worked = TOTAL_WORKDAYS - leave_data['total_leave_days']
+        annual, sick, total_leave, days_worked = figures.get(
+            staff_id, [0, 0, 0, default_days_worked(report)])
         
         report_data.append({
             'staff_id': staff_id,
             'employee_code': staff.employee_code,
             'employee_name': f"{staff.first_name} {staff.last_name}",
             'department': staff.department or 'Operations',
-            'annual_leave_days': leave_data['annual_leave_days'],
-            'sick_leave_days': leave_data['sick_leave_days'],
-            'total_leave_days': leave_data['total_leave_days'],
+            'annual_leave_days': annual,
+            'sick_leave_days': sick,
+            'total_leave_days': total_leave,
             'days_worked': days_worked
         })
     
-    # Get available fiscal years for the dropdown (2021-2025 plus current)
-    available_fiscal_years = [2021, 2022, 2023, 2024, 2025, current_fiscal_year]
-    available_fiscal_years = sorted(set(available_fiscal_years), reverse=True)
+    # Fiscal years for the dropdown, newest first
+    available_fiscal_years = sorted(set(report_fiscal_years()) | {current_fiscal_year}, reverse=True)
     
     return render_template('admin/reports.html',
                          report_data=report_data,
@@ -1562,12 +2054,13 @@ def admin_reports():
                          total_workdays=TOTAL_WORKDAYS)
 
 
-@app.route('/admin/annual_report')
+@routes.route('/admin/annual_report')
 def annual_report():
     """
     Annual Report - Shows leave summary for each employee by fiscal year.
     Accepts fiscal_year as URL parameter.
-    Calculates Estimated Days Worked = 260 - Total Leave Days.
+    Estimated Days Worked comes from the attendance_daily facts, or the
+    year's working days minus leave before the first recorded attendance.
     """
     if not session.get('admin_logged_in'):
         return redirect(url_for('admin_login'))
@@ -1588,28 +2081,15 @@ def annual_report():
     # Get all active staff members
     staff_members = Staff.query.filter_by(is_active=True).order_by(Staff.employee_code.asc()).all()
     
-    # Get all approved leave requests for the selected fiscal year
-    leave_requests = LeaveRequest.query.filter(
-        LeaveRequest.status == 'Approved',
-        LeaveRequest.fiscal_year == fiscal_year
-    ).all()
-    
-    # Group leave by staff_id and sum total days
-    leave_by_staff = {}
-    for lr in leave_requests:
-        staff_id = lr.staff_id
-        if staff_id not in leave_by_staff:
-            leave_by_staff[staff_id] = 0
-        leave_by_staff[staff_id] += lr.total_days
-    
-    # Build report data
-    TOTAL_WORKDAYS = 260
+    # Leave and days worked per employee (closed years come from the report cache)
+    report = fiscal_year_reports(db, [fiscal_year])[fiscal_year]
+    figures = staff_figures(report)
+    TOTAL_WORKDAYS = report['total_workdays']
     
     report_data = []
     for staff in staff_members:
-        staff_id = staff.id
-        total_leave_taken = leave_by_staff.get(staff_id, 0)
-        estimated_days_worked = TOTAL_WORKDAYS - total_leave_taken
+        _annual, _sick, total_leave_taken, estimated_days_worked = figures.get(
+            staff.id, [0, 0, 0, default_days_worked(report)])
         
         report_data.append({
             'employee_name': f"{staff.first_name} {staff.last_name}",
@@ -1618,8 +2098,8 @@ def annual_report():
             'estimated_days_worked': estimated_days_worked
         })
     
-    # Available fiscal years for dropdown (2021-2026)
-    available_fiscal_years = list(range(2021, 2027))
+    # Available fiscal years for dropdown
+    available_fiscal_years = report_fiscal_years()
     
     return render_template('admin/annual_report.html',
                          report_data=report_data,
@@ -1632,53 +2112,24 @@ def annual_report():
 # API ROUTES - WITH ERROR HANDLING
 # =====================================================
 
-@app.route('/api/employees', methods=['GET'])
+@routes.route('/api/employees', methods=['GET'])
+@roundtrip_budget(1)
 def get_employees():
     """Get all employees - with 08:15 AM late flagging"""
     try:
-        # Debug: Print total count in database
-        total_in_db = Staff.query.count()
-        active_in_db = Staff.query.filter_by(is_active=True).count()
-        print(f"DEBUG: Total in DB: {total_in_db}, Active: {active_in_db}")
-        
-        staff_members = Staff.query.filter_by(is_active=True).order_by(Staff.employee_code.asc()).all()
-        print(f"DEBUG: Query returned {len(staff_members)} staff members")
-        
-        # Check today's attendance for late arrivals
+        # Check today's attendance for late arrivals (same query as the async path)
         today = date.today()
-        today_attendance = Attendance.query.filter_by(work_date=today).all()
-        attendance_dict = {a.staff_id: a for a in today_attendance}
-        
-        result = []
-        for staff in staff_members:
-            staff_dict = staff.to_dict()
-            
-            # Check if late today (after 08:15 AM)
-            att = attendance_dict.get(staff.id)
-            if att and att.clock_in:
-                staff_dict['is_late_today'] = is_late_arrival(att.clock_in)
-                if staff_dict['is_late_today']:
-                    staff_dict['late_minutes'] = (
-                        (datetime.combine(date.today(), att.clock_in) - datetime.combine(date.today(), LATE_THRESHOLD)).total_seconds() / 60
-                    )
-            else:
-                staff_dict['is_late_today'] = False
-            
-            result.append(staff_dict)
-        
-        return jsonify({
-            'success': True,
-            'employees': result
-        })
+        rows = execute_single_round_trip(employees_stmt(today))
+        return jsonify(employees_payload(today, rows))
     except Exception as e:
-        print(f"❌ ERROR loading employees: {str(e)}")
+        logger.exception("❌ ERROR loading employees: %s", e)
         return jsonify({
             'success': False,
             'error': f'Database error: {str(e)}'
         }), 500
 
 
-@app.route('/api/staff', methods=['GET'])
+@routes.route('/api/staff', methods=['GET'])
 def get_staff():
     """Get all staff - with 08:15 AM late flagging"""
     try:
@@ -1707,17 +2158,21 @@ def get_staff():
             'staff': result
         })
     except Exception as e:
-        print(f"❌ ERROR loading staff: {str(e)}")
+        logger.exception("❌ ERROR loading staff: %s", e)
         return jsonify({
             'success': False,
             'error': f'Database error: {str(e)}'
         }), 500
 
 
-@app.route('/api/attendance', methods=['GET'])
+@routes.route('/api/attendance', methods=['GET'])
 def get_all_attendance():
-    """Get all attendance records - with late flagging"""
+    """Get all attendance records - with late flagging (includes archived fiscal years)"""
     start_date = request.args.get('start_date')
+    try:
+        start_date = date.fromisoformat(start_date) if start_date else None
+    except ValueError:
+        return jsonify({'success': False, 'error': 'start_date must be YYYY-MM-DD'}), 400
     
     try:
         query = Attendance.query
@@ -1733,91 +2188,53 @@ def get_all_attendance():
             att_dict['is_late'] = is_late_arrival(att.clock_in)
             result.append(att_dict)
         
+        # Older fiscal years have been moved to the archive
+        archived = archived_attendance_select(start_date)
+        if archived is not None:
+            archived_rows = db.session.execute(
+                archived.add_columns(Staff.first_name, Staff.last_name)
+                .outerjoin(Staff, Staff.id == attendance_archive.c.staff_id)
+                .order_by(attendance_archive.c.work_date.desc())
+            ).all()
+            for row in archived_rows:
+                staff_name = f"{row.first_name} {row.last_name}" if row.first_name else None
+                att_dict = Attendance.serialize(row, staff_name)
+                att_dict['is_late'] = is_late_arrival(row.clock_in)
+                result.append(att_dict)
+        
         return jsonify({
             'success': True,
             'attendance': result
         })
     except Exception as e:
-        print(f"❌ ERROR loading attendance: {str(e)}")
+        logger.exception("❌ ERROR loading attendance: %s", e)
         return jsonify({
             'success': False,
             'error': f'Database error: {str(e)}'
         }), 500
 
 
-@app.route('/api/attendance/today', methods=['GET'])
+@routes.route('/api/attendance/today', methods=['GET'])
+@roundtrip_budget(1)
 def get_today_attendance():
     """Get today's attendance for all staff - with 08:15 AM late flagging"""
     try:
         # Use Nairobi timezone to match admin dashboard
-        nairobi_tz = pytz.timezone('Africa/Nairobi')
-        today = datetime.now(nairobi_tz).date()
-        attendance = Attendance.query.filter(func.date(Attendance.work_date) == today).all()
-
-        staff_members = Staff.query.filter_by(is_active=True).order_by(Staff.employee_code.asc()).all()
-        
-        # Get approved leaves for today
-        approved_leaves_today = LeaveRequest.query.filter(
-            LeaveRequest.status == 'Approved',
-            LeaveRequest.start_date <= today,
-            LeaveRequest.end_date >= today
-        ).all()
+        today = nairobi_today()
         
-        # Create a lookup for approved leaves
-        emp_on_leave = {leave.staff_id: leave for leave in approved_leaves_today}
-        
-        result = []
-        for staff in staff_members:
-            # First check: Is employee on approved leave today?
-            leave = emp_on_leave.get(staff.id)
-            if leave:
-                status = 'On Leave'
-                clock_in = ''
-                clock_out = ''
-                is_late = False
-            else:
-                # Second check: Check attendance table
-                att = next((a for a in attendance if a.staff_id == staff.id), None)
-                
-                if att:
-                    status = 'Present' if not att.clock_out else 'Clocked Out'
-                    clock_in = att.clock_in.strftime('%H:%M') if att.clock_in else ''
-                    clock_out = att.clock_out.strftime('%H:%M') if att.clock_out else ''
-                    # Check if late based on 08:15 AM threshold
-                    is_late = is_late_arrival(att.clock_in)
-                else:
-                    # Third: No leave, no attendance = Not Clocked In
-                    status = 'Not Clocked In'
-                    clock_in = ''
-                    clock_out = ''
-                    is_late = False
-            
-            result.append({
-                'id': staff.id,
-                'emp_id': staff.id,
-                'employee_name': f"{staff.first_name} {staff.last_name}",
-                'employee_code': staff.employee_code,
-                'status': status,
-                'clock_in': clock_in,
-                'clock_out': clock_out,
-                'is_late': is_late,
-                'leave_balance': staff.leave_balance
-            })
-        
-        return jsonify({
-            'success': True,
-            'date': today.isoformat(),
-            'employees': result
-        })
+        # Staff, today's attendance and approved leave in one round trip
+        rows = today_attendance_rows(today)
+        return jsonify(today_attendance_payload(today, rows))
     except Exception as e:
-        print(f"❌ ERROR loading today's attendance: {str(e)}")
+        logger.exception("❌ ERROR loading today's attendance: %s", e)
         return jsonify({
             'success': False,
             'error': f'Database error: {str(e)}'
         }), 500
 
 
-@app.route('/api/attendance', methods=['POST'])
+@routes.route('/api/attendance', methods=['POST'])
+@roundtrip_budget(1)
 def create_attendance():
     """Clock in/out - with 08:15 AM late detection"""
     data = request.get_json()
@@ -1838,40 +2255,34 @@ def create_attendance():
     is_saturday = work_date.weekday() == 5
     day_type = 'Saturday Half Day' if is_saturday else 'Full Day'
     
+    clock_out = datetime.strptime(clock_out_str, '%H:%M').time() if clock_out_str else None
+    
     try:
-        existing = Attendance.query.filter_by(staff_id=staff_id, work_date=work_date).first()
+        # Update-or-insert in one round trip (RETURNING the row + staff name)
+        row, staff_name, created = upsert_attendance(
+            staff_id, work_date, clock_in, clock_out, day_type, is_late
+        )
+        # Today's facts are recomputed on every reporting refresh; back-dated
+        # entries are queued for the next one (one more round trip)
+        if work_date < date.today():
+            mark_facts_dirty(db, int(staff_id), work_date)
+            request_refresh()
         
-        if existing:
-            if clock_out_str:
-                existing.clock_out = datetime.strptime(clock_out_str, '%H:%M').time()
-            existing.status = 'Present'
-            db.session.commit()
+        if not created:
             return jsonify({
                 'success': True, 
                 'message': 'Clock out recorded', 
-                'attendance': existing.to_dict()
+                'attendance': Attendance.serialize(row, staff_name)
             })
         
-        attendance = Attendance(
-            staff_id=staff_id,
-            work_date=work_date,
-            clock_in=clock_in,
-            day_type=day_type,
-            is_late=is_late,
-            status='Present' if not is_late else 'Late'
-        )
-        
-        db.session.add(attendance)
-        db.session.commit()
-        
         return jsonify({
             'success': True,
             'message': 'Clock in recorded' + (' (LATE - After 08:15 AM)' if is_late else ''),
-            'attendance': attendance.to_dict(),
+            'attendance': Attendance.serialize(row, staff_name),
             'is_late': is_late
         })
     except Exception as e:
-        print(f"❌ ERROR creating attendance: {str(e)}")
+        logger.exception("❌ ERROR creating attendance: %s", e)
         db.session.rollback()
         return jsonify({
             'success': False,
@@ -1879,7 +2290,7 @@ def create_attendance():
         }), 500
 
 
-@app.route('/api/leave-requests', methods=['GET', 'POST'])
+@routes.route('/api/leave-requests', methods=['GET', 'POST'])
 def leave_requests():
     """Get or create leave requests"""
     if request.method == 'GET':
@@ -1890,7 +2301,7 @@ def leave_requests():
                 'leave_requests': [lr.to_dict() for lr in leave_requests_list]
             })
         except Exception as e:
-            print(f"❌ ERROR loading leave requests: {str(e)}")
+            logger.exception("❌ ERROR loading leave requests: %s", e)
             return jsonify({
                 'success': False,
                 'error': f'Database error: {str(e)}'
@@ -1929,8 +2340,8 @@ def leave_requests():
         # Step 2: Apply the multiplier from the dropdown
         total_days = calendar_days * multiplier
         
-        # Debug log
-        print(f"DEBUG Leave: Start={start_date}, End={end_date}, Calendar Days={calendar_days}, Multiplier={multiplier}, Final Days={total_days}")
+        logger.debug("Leave: start=%s end=%s calendar_days=%s multiplier=%s total_days=%s",
+                     start_date, end_date, calendar_days, multiplier, total_days)
         
         if leave_type == 'Annual':
             if staff.leave_balance < total_days:
@@ -1958,7 +2369,7 @@ def leave_requests():
             'leave_request': leave_request.to_dict()
         })
     except Exception as e:
-        print(f"❌ ERROR creating leave request: {str(e)}")
+        logger.exception("❌ ERROR creating leave request: %s", e)
         db.session.rollback()
         return jsonify({
             'success': False,
@@ -1966,7 +2377,7 @@ def leave_requests():
         }), 500
 
 
-@app.route('/api/leave-requests/<int:request_id>/approve', methods=['POST'])
+@routes.route('/api/leave-requests/<int:request_id>/approve', methods=['POST'])
 def approve_leave(request_id):
     """Approve leave - deducts from balance and creates On Leave attendance"""
     if not session.get('admin_logged_in'):
@@ -1997,12 +2408,7 @@ def approve_leave(request_id):
         current_date = leave_request.start_date
         while current_date <= leave_request.end_date:
             if current_date.weekday() != 6:
-                existing_att = Attendance.query.filter_by(
-                    staff_id=leave_request.staff_id,
-                    work_date=current_date
-                ).first()
-                
-                if not existing_att:
+                if not has_attendance(leave_request.staff_id, current_date):
                     leave_attendance = Attendance(
                         staff_id=leave_request.staff_id,
                         work_date=current_date,
@@ -2022,6 +2428,8 @@ def approve_leave(request_id):
         leave_request.approved_date = datetime.utcnow()
         
         db.session.commit()
+        mark_facts_dirty(db, leave_request.staff_id, leave_request.start_date, leave_request.end_date)
+        request_refresh()
         
         # Send approval email after successful approval
         # Use override_email if provided, otherwise fall back to staff's stored email
@@ -2045,7 +2453,7 @@ def approve_leave(request_id):
             'leave_request': leave_request.to_dict()
         })
     except Exception as e:
-        print(f"❌ ERROR approving leave: {str(e)}")
+        logger.exception("❌ ERROR approving leave: %s", e)
         db.session.rollback()
         return jsonify({
             'success': False,
@@ -2053,7 +2461,7 @@ def approve_leave(request_id):
         }), 500
 
 
-@app.route('/api/leave-requests/<int:request_id>/reject', methods=['POST'])
+@routes.route('/api/leave-requests/<int:request_id>/reject', methods=['POST'])
 def reject_leave(request_id):
     """Reject leave request"""
     if not session.get('admin_logged_in'):
@@ -2064,8 +2472,12 @@ def reject_leave(request_id):
         if not leave_request:
             return jsonify({'success': False, 'error': 'Request not found'}), 404
         
+        was_approved = leave_request.status == 'Approved'
         leave_request.status = 'Rejected'
         db.session.commit()
+        if was_approved:
+            mark_facts_dirty(db, leave_request.staff_id, leave_request.start_date, leave_request.end_date)
+            request_refresh()
         
         return jsonify({
             'success': True,
@@ -2073,7 +2485,7 @@ def reject_leave(request_id):
             'leave_request': leave_request.to_dict()
         })
     except Exception as e:
-        print(f"❌ ERROR rejecting leave: {str(e)}")
+        logger.exception("❌ ERROR rejecting leave: %s", e)
         db.session.rollback()
         return jsonify({
             'success': False,
@@ -2081,139 +2493,202 @@ def reject_leave(request_id):
         }), 500
 
 
-@app.route('/api/leave/balance/<int:staff_id>', methods=['GET'])
+@routes.route('/api/leave/balance/<int:staff_id>', methods=['GET'])
+@roundtrip_budget(1)
 def get_leave_balance(staff_id):
     """Get staff leave balance"""
     try:
-        staff = db.session.get(Staff, staff_id)
-        if not staff:
-            return jsonify({'success': False, 'error': 'Staff not found'}), 404
-        
-        return jsonify({
-            'success': True,
-            'staff_id': staff_id,
-            'leave_balance': staff.leave_balance,
-            'is_low': staff.leave_balance <= 3
-        })
+        rows = execute_single_round_trip(leave_balance_stmt(staff_id))
+        body, status = leave_balance_payload(staff_id, rows)
+        return jsonify(body), status
     except Exception as e:
-        print(f"❌ ERROR getting leave balance: {str(e)}")
+        logger.exception("❌ ERROR getting leave balance: %s", e)
         return jsonify({
             'success': False,
             'error': f'Database error: {str(e)}'
         }), 500
 
 
-@app.route('/api/reports/fiscal-year-summary')
+# =====================================================
+# SUMMARY APIS (closed periods served from report_cache)
+# =====================================================
+
+MAX_SUMMARY_MONTHS = 36
+MAX_SUMMARY_FISCAL_YEARS = 10
+
+
+def _parse_month(value):
+    """'2026-03' -> date(2026, 3, 1)"""
+    return datetime.strptime(value, '%Y-%m').date()
+
+
+def _int_arg(args, name, default=None):
+    """Integer query parameter; ValueError (a 400) when it is not a number"""
+    value = args.get(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a number, got {value!r}') from None
+
+
+def summary_months(args, today):
+    """
+    Month starts requested by ?from=YYYY-MM&to=YYYY-MM, ?fiscal_year=,
+    ?year= (whole calendar year) or ?year=&month= (default: this month).
+    """
+    if args.get('from') or args.get('to'):
+        first = _parse_month(args.get('from') or args.get('to'))
+        last = _parse_month(args.get('to') or args.get('from'))
+    elif args.get('fiscal_year'):
+        first, last = fiscal_year_bounds(_int_arg(args, 'fiscal_year'))
+        last = last.replace(day=1)
+    elif args.get('year') and not args.get('month'):
+        year = _int_arg(args, 'year')
+        first, last = date(year, 1, 1), date(year, 12, 1)
+    else:
+        first = date(_int_arg(args, 'year', today.year), _int_arg(args, 'month', today.month), 1)
+        last = first
+    months = []
+    while first <= last:
+        months.append(first)
+        first = next_month(first)
+    return months
+
+
+def summary_fiscal_years(args, today):
+    """Fiscal years requested by ?fiscal_year= or ?from_fiscal_year=&to_fiscal_year= (default: current)"""
+    current = fiscal_year_of(today)
+    if args.get('from_fiscal_year') or args.get('to_fiscal_year'):
+        last = _int_arg(args, 'to_fiscal_year', current)
+        first = _int_arg(args, 'from_fiscal_year', last)
+        return list(range(first, last + 1))
+    return [_int_arg(args, 'fiscal_year', current)]
+
+
+def active_staff_rows():
+    return db.session.execute(
+        select(Staff.id, Staff.first_name, Staff.last_name, Staff.leave_balance)
+        .where(Staff.is_active == True)
+        .order_by(Staff.employee_code.asc())
+    ).all()
+
+
+@routes.route('/api/reports/fiscal-year-summary')
 def fiscal_year_summary():
-    """Get fiscal year summary"""
+    """
+    Fiscal year summary for every active employee (report_fiscal_year_summary).
+    ?fiscal_year=2026, or ?from_fiscal_year=2024&to_fiscal_year=2026 for the
+    totals over a range; defaults to the current fiscal year.
+    """
     if not session.get('admin_logged_in'):
         return jsonify({'success': False, 'error': 'Unauthorized'}), 401
     
     try:
-        employees = Staff.query.filter_by(is_active=True).order_by(Staff.employee_code.asc()).all()
-        start_date = date(2025, 10, 1)
+        fiscal_years = summary_fiscal_years(request.args, date.today())
+        if not fiscal_years or len(fiscal_years) > MAX_SUMMARY_FISCAL_YEARS:
+            return jsonify({
+                'success': False,
+                'error': f'Request between 1 and {MAX_SUMMARY_FISCAL_YEARS} fiscal years'
+            }), 400
+        
+        per_year = fiscal_year_summaries(db, fiscal_years)
+        
+        # Sum the years per employee
+        totals = {}
+        for rows in per_year.values():
+            for staff_id, days_present, annual_taken, sick_taken, absent_days in rows:
+                t = totals.setdefault(staff_id, [0, 0, 0, 0])
+                t[0] += days_present
+                t[1] += annual_taken
+                t[2] += sick_taken
+                t[3] += absent_days
         
         summary = []
-        for emp in employees:
-            attendance_count = Attendance.query.filter(
-                Attendance.staff_id == emp.id,
-                Attendance.work_date >= start_date
-            ).count()
-            
-            annual_leave = LeaveRequest.query.filter(
-                LeaveRequest.staff_id == emp.id,
-                LeaveRequest.leave_type == 'Annual',
-                LeaveRequest.status == 'Approved',
-                LeaveRequest.start_date >= start_date
-            ).all()
-            annual_taken = sum(lr.total_days for lr in annual_leave)
-            
-            sick_leave = LeaveRequest.query.filter(
-                LeaveRequest.staff_id == emp.id,
-                LeaveRequest.leave_type == 'Sick',
-                LeaveRequest.status == 'Approved',
-                LeaveRequest.start_date >= start_date
-            ).all()
-            sick_taken = sum(lr.total_days for lr in sick_leave)
-            
-            remaining = 21 - annual_taken
-            
+        for staff in active_staff_rows():
+            days_present, annual_taken, sick_taken, absent_days = totals.get(staff.id, [0, 0, 0, 0])
             summary.append({
-                'employee_name': f"{emp.first_name} {emp.last_name}",
-                'days_present': attendance_count,
-                'annual_leave_taken': annual_taken,
-                'annual_leave_remaining': remaining,
-                'sick_days_taken': sick_taken,
-                'unpaid_absences': 0
+                'employee_name': f"{staff.first_name} {staff.last_name}",
+                'days_present': int(days_present),
+                # Leave and absences are weighted days (Saturday 0.5): always floats
+                'annual_leave_taken': float(annual_taken),
+                'annual_leave_remaining': 21 - float(annual_taken),
+                'annual_leave_balance': staff.leave_balance,
+                'sick_days_taken': float(sick_taken),
+                'unpaid_absences': float(absent_days)
             })
         
         return jsonify({
             'success': True,
+            'fiscal_years': fiscal_years,
             'summary': summary
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': f'Invalid fiscal year: {e}'}), 400
     except Exception as e:
-        print(f"❌ ERROR loading fiscal year summary: {str(e)}")
+        logger.exception("❌ ERROR loading fiscal year summary: %s", e)
         return jsonify({
             'success': False,
             'error': f'Database connection failed: {str(e)}'
         }), 500
 
 
-@app.route('/api/reports/monthly-attendance-summary')
+@routes.route('/api/reports/monthly-attendance-summary')
 def monthly_attendance_summary():
-    """Get monthly attendance summary"""
+    """
+    Monthly attendance summary for every active employee
+    (report_monthly_attendance). ?year=2026&month=3 (default: this month),
+    ?year=2026 for a calendar year, ?fiscal_year=2026, or
+    ?from=2025-10&to=2026-03; one row per employee per month.
+    """
     if not session.get('admin_logged_in'):
         return jsonify({'success': False, 'error': 'Unauthorized'}), 401
     
     try:
-        year = request.args.get('year', type=int, default=2026)
-        month = request.args.get('month', type=int, default=1)
-        
-        start_date = date(year, month, 1)
-        if month == 12:
-            end_date = date(year + 1, 1, 1) - timedelta(days=1)
-        else:
-            end_date = date(year, month + 1, 1) - timedelta(days=1)
-        
-        target_days = 0
-        current = start_date
-        while current <= end_date:
-            if current.weekday() < 5:
-                target_days += 1
-            current += timedelta(days=1)
+        months = summary_months(request.args, date.today())
+        if not months or len(months) > MAX_SUMMARY_MONTHS:
+            return jsonify({
+                'success': False,
+                'error': f'Request between 1 and {MAX_SUMMARY_MONTHS} months'
+            }), 400
         
-        employees = Staff.query.filter_by(is_active=True).order_by(Staff.employee_code.asc()).all()
+        per_month = monthly_summaries(db, months)
         
+        staff_rows = active_staff_rows()
         summary = []
-        for emp in employees:
-            attendance_count = Attendance.query.filter(
-                Attendance.staff_id == emp.id,
-                Attendance.work_date >= start_date,
-                Attendance.work_date <= end_date
-            ).count()
-            
-            month_name = start_date.strftime('%B')
-            
-            summary.append({
-                'employee_name': f"{emp.first_name} {emp.last_name}",
-                'month': month_name,
-                'days_present': attendance_count,
-                'target_days': target_days
-            })
+        for month_start in months:
+            # Target = Monday-Friday days in the month
+            target_days = sum(1 for i in range((next_month(month_start) - month_start).days)
+                              if (month_start + timedelta(days=i)).weekday() < 5)
+            by_staff = {row[0]: row for row in per_month[month_start.isoformat()]}
+            for staff in staff_rows:
+                _staff_id, days_present, late_days, leave_days = by_staff.get(staff.id, [staff.id, 0, 0, 0])
+                summary.append({
+                    'employee_name': f"{staff.first_name} {staff.last_name}",
+                    'month': month_start.strftime('%B'),
+                    'month_start': month_start.isoformat(),
+                    'days_present': days_present,
+                    'late_days': late_days,
+                    'leave_days': leave_days,
+                    'target_days': target_days
+                })
         
         return jsonify({
             'success': True,
             'summary': summary
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': f'Invalid month: {e}'}), 400
     except Exception as e:
-        print(f"❌ ERROR loading monthly summary: {str(e)}")
+        logger.exception("❌ ERROR loading monthly summary: %s", e)
         return jsonify({
             'success': False,
             'error': f'Database connection failed: {str(e)}'
         }), 500
 
 
-@app.route('/api/employees/reset-annual-leave', methods=['POST'])
+@routes.route('/api/employees/reset-annual-leave', methods=['POST'])
 def reset_annual_leave():
     """Reset all employees' annual leave to 21 days"""
     if not session.get('admin_logged_in'):
@@ -2230,7 +2705,7 @@ def reset_annual_leave():
             'message': 'All employees annual leave reset to 21 days'
         })
     except Exception as e:
-        print(f"❌ ERROR resetting annual leave: {str(e)}")
+        logger.exception("❌ ERROR resetting annual leave: %s", e)
         db.session.rollback()
         return jsonify({
             'success': False,
@@ -2242,13 +2717,14 @@ def reset_annual_leave():
 # CASUAL WORKER API ROUTES
 # =====================================================
 
-@app.route('/api/casual/clock-in', methods=['POST'])
+@routes.route('/api/casual/clock-in', methods=['POST'])
+@roundtrip_budget(1)
 def casual_clock_in():
     """Casual worker clock in - creates new row every time"""
     data = request.get_json()
     
-    name = data.get('name')
-    phone_number = data.get('phone_number')
+    name = (data.get('name') or '').strip()
+    phone_number = normalize_phone(data.get('phone_number'))
     work_type = data.get('work_type')
     
     if not name or not phone_number or not work_type:
@@ -2259,23 +2735,15 @@ def casual_clock_in():
     
     try:
         # Every clock in creates a NEW row (allow multiple per day per person)
-        casual = CasualAttendance(
-            name=name,
-            phone_number=phone_number,
-            work_type=work_type,
-            clock_in=now,
-            work_date=today
-        )
-        db.session.add(casual)
-        db.session.commit()
+        casual = casual_clock_in_rows(name, phone_number, work_type, today, now)[0]
         
         return jsonify({
             'success': True,
             'message': f'Clocked in at {now.strftime("%H:%M")}',
-            'casual': casual.to_dict()
+            'casual': CasualAttendance.serialize(casual)
         })
     except Exception as e:
-        print(f"❌ ERROR casual clock in: {str(e)}")
+        logger.exception("❌ ERROR casual clock in: %s", e)
         db.session.rollback()
         return jsonify({
             'success': False,
@@ -2283,40 +2751,33 @@ def casual_clock_in():
         }), 500
 
 
-@app.route('/api/casual/clock-out', methods=['POST'])
+@routes.route('/api/casual/clock-out', methods=['POST'])
+@roundtrip_budget(1)
 def casual_clock_out():
-    """Casual worker clock out - updates latest open row for that phone number today"""
+    """Casual worker clock out - closes the latest open shift for that phone number"""
     data = request.get_json()
     
-    phone_number = data.get('phone_number')
+    phone_number = normalize_phone(data.get('phone_number'))
     
     if not phone_number:
         return jsonify({'success': False, 'error': 'Phone number is required'}), 400
     
-    today = date.today()
-    now = datetime.now().time()
+    now = datetime.now()
     
     try:
-        # Find latest open row for this phone number today (clock_out is NULL)
-        latest = CasualAttendance.query.filter(
-            CasualAttendance.phone_number == phone_number,
-            CasualAttendance.work_date == today,
-            CasualAttendance.clock_out == None
-        ).order_by(CasualAttendance.clock_in.desc()).first()
-        
-        if not latest:
-            return jsonify({'success': False, 'error': 'No open clock-in found for today'}), 404
+        # Lookup and update in a single indexed UPDATE ... RETURNING round trip
+        rows = execute_single_round_trip(casual_clock_out_stmt(phone_number, now))
         
-        latest.clock_out = now
-        db.session.commit()
+        if not rows:
+            return jsonify({'success': False, 'error': 'No open clock-in found for today'}), 404
         
         return jsonify({
             'success': True,
             'message': f'Clocked out at {now.strftime("%H:%M")}',
-            'casual': latest.to_dict()
+            'casual': CasualAttendance.serialize(rows[0])
         })
     except Exception as e:
-        print(f"❌ ERROR casual clock out: {str(e)}")
+        logger.exception("❌ ERROR casual clock out: %s", e)
         db.session.rollback()
         return jsonify({
             'success': False,
@@ -2324,34 +2785,63 @@ def casual_clock_out():
         }), 500
 
 
-@app.route('/api/casual/today', methods=['GET'])
+@routes.route('/api/casual/today', methods=['GET'])
+@roundtrip_budget(1)
 def casual_today():
     """Get all casual attendance for today"""
     today = date.today()
     
     try:
-        casuals = CasualAttendance.query.filter_by(work_date=today).order_by(CasualAttendance.clock_in.desc()).all()
+        rows = execute_single_round_trip(casual_today_stmt(today))
+        return jsonify(casual_today_payload(today, rows))
+    except Exception as e:
+        logger.exception("❌ ERROR loading casual today: %s", e)
+        return jsonify({
+            'success': False,
+            'error': f'Database error: {str(e)}'
+        }), 500
+
+
+@routes.route('/api/casual/workers', methods=['GET'])
+@roundtrip_budget(1)
+def casual_worker_lookup():
+    """Returning workers whose phone number starts with ?phone= (as the kiosk types)"""
+    prefix = normalize_phone(request.args.get('phone'), prefix=True)
+    if len(prefix) < CASUAL_LOOKUP_MIN_DIGITS:
+        return jsonify({'success': True, 'workers': []})
+    
+    try:
+        rows = execute_single_round_trip(casual_worker_lookup_stmt(prefix))
         return jsonify({
             'success': True,
-            'date': today.isoformat(),
-            'casuals': [c.to_dict() for c in casuals]
+            'workers': [{
+                'id': row.id,
+                'phone_number': row.phone_number,
+                'name': row.name,
+                'default_work_type': row.default_work_type
+            } for row in rows]
         })
     except Exception as e:
-        print(f"❌ ERROR loading casual today: {str(e)}")
+        logger.exception("❌ ERROR looking up casual workers: %s", e)
         return jsonify({
             'success': False,
             'error': f'Database error: {str(e)}'
         }), 500
 
 
-@app.route('/api/casual/logs', methods=['GET'])
+@routes.route('/api/casual/logs', methods=['GET'])
 def casual_logs():
-    """Get casual attendance logs - optionally filter by date"""
+    """Get casual attendance logs - optionally filter by date and worker phone"""
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
+    phone_number = normalize_phone(request.args.get('phone'))
     
     try:
         query = CasualAttendance.query
+        if phone_number:
+            # Per-worker history: range scan on ix_casual_attendance_worker_date
+            query = query.filter(CasualAttendance.worker_id == select(CasualWorker.id).where(
+                CasualWorker.phone_number == phone_number).scalar_subquery())
         if start_date:
             start = datetime.strptime(start_date, '%Y-%m-%d').date()
             query = query.filter(CasualAttendance.work_date >= start)
@@ -2365,63 +2855,61 @@ def casual_logs():
             'casuals': [c.to_dict() for c in casuals]
         })
     except Exception as e:
-        print(f"❌ ERROR loading casual logs: {str(e)}")
+        logger.exception("❌ ERROR loading casual logs: %s", e)
         return jsonify({
             'success': False,
             'error': f'Database error: {str(e)}'
         }), 500
 
 
-@app.route('/admin/export-attendance')
+@routes.route('/admin/export-attendance')
 def export_attendance():
     """
     Export monthly attendance report to CSV.
-    Compares staff with attendance records for the current month.
-    Marks employees as 'Absent' if they have no record for a working day.
+    One row per active employee per working day of ?month=YYYY-MM (default:
+    the current month so far), read from the attendance_daily facts
+    (Present, Late, On Leave, Absent, Holiday). Clock-in times of archived
+    fiscal years come from attendance_archive.
     """
     if not session.get('admin_logged_in'):
         return redirect(url_for('admin_login'))
     
+    today = date.today()
+    try:
+        first_day = _parse_month(request.args['month']) if request.args.get('month') else today.replace(day=1)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'month must be YYYY-MM'}), 400
+    last_day = min(next_month(first_day) - timedelta(days=1), today)
+    
     try:
         import csv
         from io import StringIO
         
-        # Get current month dates
-        today = date.today()
-        first_day = today.replace(day=1)
-        if today.month == 12:
-            last_day = today.replace(year=today.year+1, month=1, day=1) - timedelta(days=1)
-        else:
-            last_day = today.replace(month=today.month+1, day=1) - timedelta(days=1)
-        
-        # Get all active employees
-        employees = Staff.query.filter_by(is_active=True).order_by(Staff.employee_code.asc()).all()
+        # Apply queued changes and today's clock-ins before reading the facts
+        ensure_fact_table(db)
+        sync_facts(db)
         
-        # Get all attendance records for the current month
-        attendance_records = Attendance.query.filter(
-            Attendance.work_date >= first_day,
-            Attendance.work_date <= last_day
-        ).all()
-        
-        # Get all approved leave requests for the current month
-        leave_requests = LeaveRequest.query.filter(
-            LeaveRequest.status == 'Approved',
-            LeaveRequest.start_date <= last_day,
-            LeaveRequest.end_date >= first_day
+        history = attendance_history_select(Attendance.__table__, first_day, last_day)
+        clock_ins = (
+            select(history.c.staff_id, history.c.work_date, func.min(history.c.clock_in).label('clock_in'))
+            .where(history.c.status != 'On Leave')
+            .group_by(history.c.staff_id, history.c.work_date)
+            .subquery()
+        )
+        rows = db.session.execute(
+            select(attendance_daily.c.work_date, Staff.first_name, Staff.last_name,
+                   attendance_daily.c.status, clock_ins.c.clock_in)
+            .join(Staff, Staff.id == attendance_daily.c.staff_id)
+            .outerjoin(clock_ins, and_(clock_ins.c.staff_id == attendance_daily.c.staff_id,
+                                       clock_ins.c.work_date == attendance_daily.c.work_date))
+            .where(Staff.is_active == True,
+                   attendance_daily.c.work_date >= first_day,
+                   attendance_daily.c.work_date <= last_day)
+            .order_by(attendance_daily.c.work_date, Staff.employee_code)
         ).all()
         
-        # Build attendance lookup: {(staff_id, work_date): attendance_record}
-        attendance_lookup = {(att.staff_id, att.work_date): att for att in attendance_records}
-        
-        # Build leave lookup: {(staff_id, work_date): leave_request}
-        leave_lookup = {}
-        for lr in leave_requests:
-            # Iterate through each day of the leave
-            current = lr.start_date
-            while current <= lr.end_date:
-                if first_day <= current <= last_day:
-                    leave_lookup[(lr.staff_id, current)] = lr
-                current = current + timedelta(days=1)
+        status_labels = {'present': 'Present', 'late': 'Late', 'leave': 'On Leave',
+                         'absent': 'Absent', 'holiday': 'Holiday'}
         
         # Generate CSV
         output = StringIO()
@@ -2430,42 +2918,17 @@ def export_attendance():
         # Header row
         writer.writerow(['Date', 'Staff Name', 'Status', 'Clock-In Time'])
         
-        # Iterate through each day of the month
-        current_date = first_day
-        while current_date <= last_day:
-            # Skip Sundays (weekday 6)
-            if current_date.weekday() != 6:
-                for emp in employees:
-                    staff_name = f"{emp.first_name} {emp.last_name}"
-                    staff_id = emp.id
-                    
-                    # Check if on leave
-                    leave = leave_lookup.get((staff_id, current_date))
-                    if leave:
-                        status = 'On Leave'
-                        clock_in = ''
-                    else:
-                        # Check if has attendance record
-                        att = attendance_lookup.get((staff_id, current_date))
-                        if att:
-                            status = 'Present'
-                            clock_in = att.clock_in.strftime('%H:%M') if att.clock_in else ''
-                        else:
-                            status = 'Absent'
-                            clock_in = ''
-                    
-                    writer.writerow([
-                        current_date.strftime('%Y-%m-%d'),
-                        staff_name,
-                        status,
-                        clock_in
-                    ])
-            
-            current_date = current_date + timedelta(days=1)
+        for row in rows:
+            writer.writerow([
+                row.work_date.strftime('%Y-%m-%d'),
+                f"{row.first_name} {row.last_name}",
+                status_labels.get(row.status, row.status),
+                row.clock_in.strftime('%H:%M') if row.clock_in and row.status in ('present', 'late') else ''
+            ])
         
         # Return as downloadable file
         output.seek(0)
-        month_str = today.strftime('%Y_%m')
+        month_str = first_day.strftime('%Y_%m')
         
         return make_response(output.getvalue(), 200, {
             'Content-Type': 'text/csv',
@@ -2473,13 +2936,11 @@ def export_attendance():
         })
     
     except Exception as e:
-        print(f"❌ ERROR exporting attendance: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ ERROR exporting attendance: %s", e)
         return redirect(url_for('admin_dashboard'))
 
 
-@app.route('/export_casual_csv')
+@routes.route('/export_casual_csv')
 def export_casual_csv():
     """Export casual worker attendance to CSV"""
     if not session.get('admin_logged_in'):
@@ -2523,13 +2984,9 @@ def export_casual_csv():
             # Format clock out time
             clock_out_str = c.clock_out.strftime('%H:%M') if c.clock_out else ''
             
-            # Calculate total hours (decimal format)
-            if c.clock_in and c.clock_out:
-                total_mins = (c.clock_out.hour * 60 + c.clock_out.minute) - (c.clock_in.hour * 60 + c.clock_in.minute)
-                total_hours = total_mins / 60.0
-                total_hours_str = f"{total_hours:.1f}"
-            else:
-                total_hours_str = ''
+            # Calculate total hours (decimal format; overnight shifts end the next day)
+            total_hours = shift_hours(c.clock_in, c.clock_out)
+            total_hours_str = f"{total_hours:.1f}" if total_hours is not None else ''
             
             writer.writerow([
                 date_str,
@@ -2560,9 +3017,7 @@ def export_casual_csv():
         })
     
     except Exception as e:
-        print(f"❌ ERROR exporting casual CSV: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ ERROR exporting casual CSV: %s", e)
         return redirect(url_for('admin_dashboard'))
 
 
@@ -2578,33 +3033,33 @@ if __name__ == '__main__':
     # Check if we're in production (Render sets PORT)
     is_production = os.environ.get('PORT') is not None
     
+    setup_logging()
     db_type = "PostgreSQL (Supabase)" if "postgresql" in DATABASE_URL else "SQLite (Local)"
-    print(f"\n{'='*60}")
-    print("ATTENDANCE SYSTEM STARTUP")
-    print(f"{'='*60}")
-    print(f"Database: {db_type}")
-    print(f"URL: {DATABASE_URL[:50]}...")
-    print(f"Late Threshold: {LATE_THRESHOLD}")
-    print(f"Port: {port}")
-    print(f"Mode: {'PRODUCTION' if is_production else 'DEVELOPMENT'}")
-    print(f"{'='*60}\n")
+    logger.info("ATTENDANCE SYSTEM STARTUP", extra={
+        'database': db_type,
+        'url': DATABASE_URL[:50] + '...',
+        'late_threshold': LATE_THRESHOLD.isoformat(),
+        'port': port,
+        'mode': 'PRODUCTION' if is_production else 'DEVELOPMENT',
+    })
     
     # Initialize database with error handling
     # Don't block startup if database is temporarily unavailable
+    app = get_app()
     db_init_error = None
     try:
+        migrate_database()
         with app.app_context():
-            db.create_all()
-            print("✅ Database tables created/verified")
+            logger.info("✅ Database tables created/verified")
             # Only seed if using SQLite (local dev)
             if 'sqlite' in DATABASE_URL:
                 seed_staff()
     except Exception as e:
         db_init_error = str(e)
-        print(f"⚠️ Database initialization warning: {e}")
-        print("⚠️ Continuing anyway - will retry on first request")
+        logger.warning("⚠️ Database initialization warning: %s", e)
+        logger.warning("⚠️ Continuing anyway - will retry on first request")
     
     # Start server immediately - Render needs the port open ASAP
     # Use threaded=True to handle multiple requests
-    print(f"🚀 Starting server on port {port}...")
+    logger.info("🚀 Starting server on port %d...", port)
     app.run(debug=debug_mode, host='0.0.0.0', port=port, threaded=True)
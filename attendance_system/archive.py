@@ -0,0 +1,352 @@
+"""
+Attendance archival by fiscal year for the Attendance System
+The live `attendance` table keeps only the current and previous fiscal
+year. Rows from older (closed) fiscal years are moved to
+`attendance_archive`, and per-employee, per-month aggregates are kept in
+`attendance_monthly_history` so reports never have to scan old rows.
+
+Tables:
+    attendance_archive          - same columns as attendance, plus
+                                  fiscal_year and archived_at
+    attendance_monthly_history  - (staff_id, month_start, fiscal_year,
+                                   days_present, late_days, leave_days)
+
+Rows are moved in batches, each batch in its own transaction (a single
+DELETE ... RETURNING / INSERT statement on PostgreSQL), so the job can be
+stopped and re-run at any point.
+
+Usage:
+    python archive.py            # archive closed fiscal years
+    python archive.py --status   # rows per fiscal year, live vs archive
+"""
+
+import logging
+import os
+from datetime import date, datetime
+
+from flask import jsonify, request, session
+from sqlalchemy import (Boolean, Column, Date, DateTime, Index, Integer, MetaData, String,
+                        Table, Text, Time, bindparam, func, select, text, union_all)
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '5000'))
+# Fiscal years kept in the live table: the current one and the previous one
+LIVE_FISCAL_YEARS = int(os.getenv('LIVE_FISCAL_YEARS', '2'))
+
+# Separate metadata, like the reporting relations: created by
+# ensure_archive_tables(), not by db.create_all()
+archive_metadata = MetaData()
+
+attendance_archive = Table(
+    'attendance_archive', archive_metadata,
+    Column('id', Integer, primary_key=True, autoincrement=False),
+    Column('staff_id', Integer, nullable=False),
+    Column('work_date', Date, nullable=False),
+    Column('clock_in', Time, nullable=False),
+    Column('clock_out', Time),
+    Column('day_type', String(20)),
+    Column('status', String(20)),
+    Column('is_late', Boolean),
+    Column('notes', Text),
+    Column('created_at', DateTime),
+    Column('fiscal_year', Integer, nullable=False),
+    Column('archived_at', DateTime, nullable=False),
+    Index('ix_attendance_archive_staff_date', 'staff_id', 'work_date'),
+    Index('ix_attendance_archive_fiscal_year', 'fiscal_year'),
+)
+
+attendance_monthly_history = Table(
+    'attendance_monthly_history', archive_metadata,
+    Column('staff_id', Integer, primary_key=True),
+    Column('month_start', Date, primary_key=True),
+    Column('fiscal_year', Integer, nullable=False, index=True),
+    Column('days_present', Integer, nullable=False),
+    Column('late_days', Integer, nullable=False),
+    Column('leave_days', Integer, nullable=False),
+)
+
+_ATTENDANCE_COLUMNS = ('id', 'staff_id', 'work_date', 'clock_in', 'clock_out', 'day_type',
+                       'status', 'is_late', 'notes', 'created_at')
+
+
+# =====================================================
+# FISCAL YEAR HELPERS
+# =====================================================
+# Fiscal year starts October 1st: Oct-Dec belong to the next year's FY.
+
+_PG_FISCAL_YEAR = "(EXTRACT(YEAR FROM {col})::int + CASE WHEN EXTRACT(MONTH FROM {col}) >= 10 THEN 1 ELSE 0 END)"
+_SQLITE_FISCAL_YEAR = "(CAST(strftime('%Y', {col}) AS INTEGER) + (CAST(strftime('%m', {col}) AS INTEGER) >= 10))"
+
+
+def fiscal_year_sql(col, dialect):
+    """SQL expression for the fiscal year of a date column"""
+    template = _PG_FISCAL_YEAR if dialect == 'postgresql' else _SQLITE_FISCAL_YEAR
+    return template.format(col=col)
+
+
+def month_start_sql(col, dialect):
+    """SQL expression for the first day of the month of a date column"""
+    if dialect == 'postgresql':
+        return f"CAST(date_trunc('month', {col}) AS date)"
+    return f"date({col}, 'start of month')"
+
+
+def fiscal_year_of(day):
+    return day.year + 1 if day.month >= 10 else day.year
+
+
+def fiscal_year_bounds(fiscal_year):
+    """First and last day of a fiscal year (FY2026 = 2025-10-01 .. 2026-09-30)"""
+    return date(fiscal_year - 1, 10, 1), date(fiscal_year, 9, 30)
+
+
+def archive_cutoff(today=None):
+    """
+    First work_date that stays in the live table.
+
+    With LIVE_FISCAL_YEARS = 2 on 2026-10-19 (FY2027) this is 2025-10-01,
+    the start of FY2026.
+    """
+    today = today or date.today()
+    first_live_year = fiscal_year_of(today) - (LIVE_FISCAL_YEARS - 1)
+    return date(first_live_year - 1, 10, 1)
+
+
+# =====================================================
+# ARCHIVAL
+# =====================================================
+
+def ensure_archive_tables(db):
+    """Create the archive and history tables if missing"""
+    archive_metadata.create_all(db.engine)
+
+
+def _move_batch_sql(dialect):
+    columns = ', '.join(_ATTENDANCE_COLUMNS)
+    # Leave approvals can re-create "On Leave" rows for days that are already
+    # archived; those duplicates are dropped instead of archived twice.
+    not_duplicate = """
+        NOT (m.status = 'On Leave' AND EXISTS (
+            SELECT 1 FROM attendance_archive x
+            WHERE x.staff_id = m.staff_id AND x.work_date = m.work_date))
+    """
+    if dialect == 'postgresql':
+        return [f"""
+            WITH batch AS (
+                SELECT id FROM attendance
+                WHERE work_date < :cutoff
+                ORDER BY id
+                LIMIT :batch_size
+                FOR UPDATE SKIP LOCKED
+            ),
+            moved AS (
+                DELETE FROM attendance a USING batch
+                WHERE a.id = batch.id
+                RETURNING a.*
+            ),
+            archived AS (
+                INSERT INTO attendance_archive ({columns}, fiscal_year, archived_at)
+                SELECT {', '.join('m.' + c for c in _ATTENDANCE_COLUMNS)},
+                       {fiscal_year_sql('m.work_date', dialect)}, :archived_at
+                FROM moved m
+                WHERE {not_duplicate}
+                ON CONFLICT (id) DO NOTHING
+                RETURNING 1
+            )
+            SELECT (SELECT COUNT(*) FROM moved), (SELECT COUNT(*) FROM archived)
+        """]
+
+    batch = "SELECT id FROM attendance WHERE work_date < :cutoff ORDER BY id LIMIT :batch_size"
+    return [
+        f"""
+            INSERT OR IGNORE INTO attendance_archive ({columns}, fiscal_year, archived_at)
+            SELECT {', '.join('m.' + c for c in _ATTENDANCE_COLUMNS)},
+                   {fiscal_year_sql('m.work_date', dialect)}, :archived_at
+            FROM attendance m
+            WHERE m.id IN ({batch}) AND {not_duplicate}
+        """,
+        f"DELETE FROM attendance WHERE id IN ({batch})",
+    ]
+
+
+def rebuild_monthly_history(conn, fiscal_years, dialect):
+    """Recompute the monthly aggregates of the given fiscal years from the archive"""
+    if not fiscal_years:
+        return
+    params = {'years': list(fiscal_years)}
+    conn.execute(
+        text("DELETE FROM attendance_monthly_history WHERE fiscal_year IN :years")
+        .bindparams(bindparam('years', expanding=True)),
+        params
+    )
+    month_start = month_start_sql('work_date', dialect)
+    conn.execute(
+        text(f"""
+            INSERT INTO attendance_monthly_history
+                (staff_id, month_start, fiscal_year, days_present, late_days, leave_days)
+            SELECT staff_id, {month_start}, fiscal_year,
+                   COUNT(*),
+                   SUM(CASE WHEN is_late THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN status = 'On Leave' THEN 1 ELSE 0 END)
+            FROM attendance_archive
+            WHERE fiscal_year IN :years
+            GROUP BY staff_id, {month_start}, fiscal_year
+        """).bindparams(bindparam('years', expanding=True)),
+        params
+    )
+
+
+def archive_closed_fiscal_years(db, today=None, batch_size=None):
+    """
+    Move attendance rows older than archive_cutoff() into the archive.
+
+    Args:
+        db: Flask-SQLAlchemy instance (call inside an app context)
+        today: reference date (defaults to today)
+        batch_size: rows per transaction (defaults to ARCHIVE_BATCH_SIZE)
+
+    Returns:
+        dict: cutoff date, rows moved, rows archived (moved minus dropped
+              duplicates) and the fiscal years whose history was rebuilt
+    """
+    ensure_archive_tables(db)
+    dialect = db.engine.dialect.name
+    cutoff = archive_cutoff(today)
+    batch_size = batch_size or ARCHIVE_BATCH_SIZE
+    archived_at = datetime.utcnow()
+    params = {'cutoff': cutoff, 'batch_size': batch_size, 'archived_at': archived_at}
+    statements = [
+        text(sql).bindparams(bindparam('archived_at', type_=DateTime)) if ':archived_at' in sql else text(sql)
+        for sql in _move_batch_sql(dialect)
+    ]
+
+    moved = archived = 0
+    while True:
+        with db.engine.begin() as conn:
+            if dialect == 'postgresql':
+                batch_moved, batch_archived = conn.execute(statements[0], params).one()
+            else:
+                batch_archived = conn.execute(statements[0], params).rowcount
+                batch_moved = conn.execute(statements[1], params).rowcount
+        moved += batch_moved
+        archived += batch_archived
+        if batch_moved < batch_size:
+            break
+
+    with db.engine.begin() as conn:
+        fiscal_years = sorted(conn.execute(
+            select(attendance_archive.c.fiscal_year)
+            .where(attendance_archive.c.archived_at == archived_at)
+            .distinct()
+        ).scalars())
+        rebuild_monthly_history(conn, fiscal_years, dialect)
+
+    return {
+        'cutoff': cutoff.isoformat(),
+        'moved': moved,
+        'archived': archived,
+        'fiscal_years': fiscal_years,
+    }
+
+
+def archive_status(db):
+    """Row counts per fiscal year in the live table and in the archive"""
+    ensure_archive_tables(db)
+    dialect = db.engine.dialect.name
+    with db.engine.connect() as conn:
+        live = conn.execute(text(f"""
+            SELECT {fiscal_year_sql('work_date', dialect)} AS fiscal_year, COUNT(*)
+            FROM attendance GROUP BY 1 ORDER BY 1
+        """)).all()
+        archived = conn.execute(
+            select(attendance_archive.c.fiscal_year, func.count())
+            .group_by(attendance_archive.c.fiscal_year)
+            .order_by(attendance_archive.c.fiscal_year)
+        ).all()
+    return {
+        'cutoff': archive_cutoff().isoformat(),
+        'live': {int(fy): count for fy, count in live},
+        'archive': {int(fy): count for fy, count in archived},
+    }
+
+
+# =====================================================
+# HISTORICAL READS
+# =====================================================
+
+def archived_attendance_select(start_date=None, end_date=None):
+    """
+    SELECT over the archive with the same column names as `attendance`,
+    or None when the requested range is entirely live.
+    """
+    if start_date is not None and start_date >= archive_cutoff():
+        return None
+    columns = [attendance_archive.c[name] for name in _ATTENDANCE_COLUMNS]
+    stmt = select(*columns)
+    if start_date is not None:
+        stmt = stmt.where(attendance_archive.c.work_date >= start_date)
+    if end_date is not None:
+        stmt = stmt.where(attendance_archive.c.work_date <= end_date)
+    return stmt
+
+
+def attendance_history_select(attendance, start_date=None, end_date=None):
+    """
+    Live and archived attendance in a date range as one subquery with the
+    `attendance` column names; the archive is only read when the range
+    reaches it.
+
+    Args:
+        attendance: the live attendance Table (Attendance.__table__)
+        start_date / end_date: inclusive bounds (None = open)
+    """
+    live = select(*[attendance.c[name] for name in _ATTENDANCE_COLUMNS])
+    if start_date is not None:
+        live = live.where(attendance.c.work_date >= start_date)
+    if end_date is not None:
+        live = live.where(attendance.c.work_date <= end_date)
+    archived = archived_attendance_select(start_date, end_date)
+    return (live if archived is None else union_all(live, archived)).subquery('attendance_history')
+
+
+# =====================================================
+# ADMIN ROUTES
+# =====================================================
+
+def init_archive(app, db):
+    """Register the admin archive routes on the Flask app"""
+    @app.route('/admin/archive-attendance', methods=['GET', 'POST'])
+    def admin_archive_attendance():
+        """GET: rows per fiscal year; POST: archive closed fiscal years"""
+        if not session.get('admin_logged_in'):
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+        try:
+            if request.method == 'POST':
+                result = archive_closed_fiscal_years(db)
+                logger.info("📦 Archived %d attendance rows before %s", result['archived'], result['cutoff'])
+                return jsonify({'success': True, **result})
+            return jsonify({'success': True, **archive_status(db)})
+        except Exception as e:
+            logger.exception("❌ ERROR archiving attendance: %s", e)
+            return jsonify({'success': False, 'error': f'Database error: {str(e)}'}), 500
+
+
+if __name__ == '__main__':
+    import sys
+    from app import app, db
+    from reporting import refresh_reporting_views
+
+    with app.app_context():
+        if '--status' in sys.argv:
+            status = archive_status(db)
+            print(f"Live table keeps work_date >= {status['cutoff']}")
+            for fy in sorted(set(status['live']) | set(status['archive'])):
+                print(f"  FY{fy}: live={status['live'].get(fy, 0)} archive={status['archive'].get(fy, 0)}")
+        else:
+            result = archive_closed_fiscal_years(db)
+            print(f"📦 Moved {result['moved']} rows before {result['cutoff']} "
+                  f"({result['archived']} archived, {result['moved'] - result['archived']} duplicates dropped)")
+            if result['fiscal_years']:
+                print(f"   Monthly history rebuilt for FY {', '.join(map(str, result['fiscal_years']))}")
+            refresh_reporting_views(db)
@@ -0,0 +1,189 @@
+"""
+Async read path for the Attendance System
+An ASGI application that serves the high-fanout kiosk/dashboard GETs on one
+event loop with SQLAlchemy's async engine (asyncpg / aiosqlite), and hands
+every other request to the Flask app unchanged.
+
+Served asynchronously (same statements and JSON as the Flask views, built
+by the shared *_stmt / *_payload functions in app.py):
+    GET /api/employees
+    GET /api/attendance/today
+    GET /api/casual/today
+    GET /api/leave/balance/<staff_id>
+
+Hundreds of concurrent polls wait on the database together instead of each
+holding a worker thread. Everything else (forms, admin, writes) runs in
+Flask through asgiref's WSGI adapter.
+
+Run:
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+    gunicorn -k uvicorn.workers.UvicornWorker asgi:app
+
+Requires: requirements-async.txt (asgiref, uvicorn, and asyncpg for
+PostgreSQL or aiosqlite for SQLite)
+"""
+
+import json
+import logging
+import re
+from datetime import date
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError as e:
+    raise ImportError("asgi.py needs the async extras: pip install -r requirements-async.txt") from e
+
+import app as attendance
+from db_pool import async_database_url, build_async_engine_options
+
+logger = logging.getLogger(__name__)
+
+_engine = None
+
+# Headers the Flask app adds to these responses (add_header + flask-cors)
+_RESPONSE_HEADERS = [
+    (b'content-type', b'application/json'),
+    (b'cache-control', b'no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0'),
+    (b'pragma', b'no-cache'),
+    (b'expires', b'-1'),
+    (b'access-control-allow-origin', b'*'),
+]
+
+
+def get_engine():
+    """Async engine for the configured database, created on first use"""
+    global _engine
+    if _engine is None:
+        # The Flask engine's URL: Flask-SQLAlchemy has already resolved a
+        # relative SQLite path against the instance folder
+        with attendance.get_app().app_context():
+            url = attendance.db.engine.url.render_as_string(hide_password=False)
+        try:
+            _engine = create_async_engine(async_database_url(url), **build_async_engine_options(url))
+        except ImportError as e:
+            raise ImportError(f"async driver {e.name} is missing: "
+                              "pip install -r requirements-async.txt") from e
+    return _engine
+
+
+async def fetch_all(stmt):
+    """Execute one statement outside a transaction and return its rows"""
+    async with get_engine().connect() as conn:
+        conn = await conn.execution_options(isolation_level='AUTOCOMMIT')
+        result = await conn.execute(stmt)
+        return result.all()
+
+
+# =====================================================
+# ASYNC VIEWS
+# =====================================================
+
+async def employees():
+    today = date.today()
+    rows = await fetch_all(attendance.employees_stmt(today))
+    return attendance.employees_payload(today, rows), 200
+
+
+async def today_attendance():
+    today = attendance.nairobi_today()
+    rows = await fetch_all(attendance.today_attendance_stmt(today))
+    return attendance.today_attendance_payload(today, rows), 200
+
+
+async def casual_today():
+    today = date.today()
+    rows = await fetch_all(attendance.casual_today_stmt(today))
+    return attendance.casual_today_payload(today, rows), 200
+
+
+async def leave_balance(staff_id):
+    staff_id = int(staff_id)
+    rows = await fetch_all(attendance.leave_balance_stmt(staff_id))
+    return attendance.leave_balance_payload(staff_id, rows)
+
+
+ASYNC_ROUTES = [
+    (re.compile(r'^/api/employees$'), employees),
+    (re.compile(r'^/api/attendance/today$'), today_attendance),
+    (re.compile(r'^/api/casual/today$'), casual_today),
+    (re.compile(r'^/api/leave/balance/(\d+)$'), leave_balance),
+]
+
+_ERROR_PREFIX = {
+    employees: 'loading employees',
+    today_attendance: "loading today's attendance",
+    casual_today: 'loading casual today',
+    leave_balance: 'getting leave balance',
+}
+
+
+def _match(scope):
+    if scope['type'] != 'http' or scope['method'] not in ('GET', 'HEAD'):
+        return None, ()
+    for pattern, view in ASYNC_ROUTES:
+        found = pattern.match(scope['path'])
+        if found:
+            return view, found.groups()
+    return None, ()
+
+
+def _dumps(body):
+    # Same bytes as Flask's jsonify outside debug mode
+    return (json.dumps(body, sort_keys=True, separators=(',', ':')) + '\n').encode()
+
+
+async def _send_json(send, body, status, head=False):
+    payload = _dumps(body)
+    headers = _RESPONSE_HEADERS + [(b'content-length', str(len(payload)).encode())]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': b'' if head else payload})
+
+
+# =====================================================
+# ASGI APPLICATION
+# =====================================================
+
+class AttendanceASGI:
+    """Async views for the read endpoints, Flask (via WSGI) for the rest"""
+
+    def __init__(self):
+        self._flask = None
+
+    @property
+    def flask(self):
+        if self._flask is None:
+            self._flask = WsgiToAsgi(attendance.get_app())
+        return self._flask
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+
+        view, args = _match(scope)
+        if view is None:
+            return await self.flask(scope, receive, send)
+
+        try:
+            body, status = await view(*args)
+        except Exception as e:
+            logger.exception("❌ ERROR %s: %s", _ERROR_PREFIX[view], e)
+            body, status = {'success': False, 'error': f'Database error: {str(e)}'}, 500
+        await _send_json(send, body, status, head=scope['method'] == 'HEAD')
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Build the Flask app now rather than on the first request
+                self.flask
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if _engine is not None:
+                    await _engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+app = AttendanceASGI()
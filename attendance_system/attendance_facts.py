@@ -0,0 +1,380 @@
+"""
+Daily attendance facts for the Attendance System
+One attendance_daily row per employee per working day (Monday-Saturday),
+so reports are indexed aggregations instead of re-deriving absences,
+leave days and workday totals from raw rows on every request:
+
+    attendance_daily (staff_id, work_date, fiscal_year, status, leave_type,
+                      weight, minutes_worked)
+
+- status: present / late (an attendance row that is not a synthetic
+  "On Leave" row), holiday, leave (approved leave or an On Leave row),
+  absent - in that order of precedence
+- weight: 1.0 Monday-Friday, 0.5 Saturday (the half day)
+- minutes_worked: clock-in to clock-out of worked days
+- absent is only recorded once the day is over
+- inactive employees get rows up to their last attendance day only
+
+Facts start at the first attendance date (live or archived, see
+archive.py); fiscal years before that have no facts.
+
+Kept current by:
+- mark_facts_dirty(db, staff_id, start, end) from write paths (leave
+  approval, historical leave, back-dated clock-ins), followed by
+  request_refresh(). The ranges are queued in attendance_facts_dirty, so
+  whichever process refreshes next (this worker's refresher or the
+  scheduler leader) applies them, however old the days are
+- sync_facts(), run before every reporting refresh: queued ranges, today,
+  and once a day (the nightly pass) the last FACT_RECOMPUTE_DAYS days, which
+  turns yesterday's missing clock-ins into absences
+- rebuild_facts() after bulk loads (generate_dataset.py, snapshot.py,
+  migrate_to_supabase.py)
+
+Environment:
+    FACT_RECOMPUTE_DAYS   days recomputed by the nightly pass (default 7)
+"""
+
+import logging
+import os
+from datetime import date, timedelta
+
+from sqlalchemy import (Column, Date, Float, Index, Integer, MetaData, String, Table, delete,
+                        insert, select, text)
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from archive import fiscal_year_sql
+
+logger = logging.getLogger(__name__)
+
+FACT_RECOMPUTE_DAYS = int(os.getenv('FACT_RECOMPUTE_DAYS', '7'))
+
+# Created by ensure_fact_table(), like the archive and reporting tables
+facts_metadata = MetaData()
+
+attendance_daily = Table(
+    'attendance_daily', facts_metadata,
+    Column('staff_id', Integer, primary_key=True),
+    Column('work_date', Date, primary_key=True),
+    Column('fiscal_year', Integer, nullable=False),
+    Column('status', String(10), nullable=False),
+    Column('leave_type', String(20)),
+    Column('weight', Float, nullable=False),
+    Column('minutes_worked', Integer),
+    Index('ix_attendance_daily_work_date', 'work_date'),
+    Index('ix_attendance_daily_fiscal_year', 'fiscal_year', 'staff_id'),
+)
+
+# Ranges waiting for the next refresh, in any process
+attendance_facts_dirty = Table(
+    'attendance_facts_dirty', facts_metadata,
+    Column('id', Integer, primary_key=True),
+    Column('staff_id', Integer, nullable=False),
+    Column('start_date', Date, nullable=False),
+    Column('end_date', Date, nullable=False),
+)
+
+_FACT_COLUMNS = ('staff_id', 'work_date', 'fiscal_year', 'status', 'leave_type', 'weight', 'minutes_worked')
+
+_state = {'recomputed_on': None}
+
+
+# =====================================================
+# SQL DEFINITION
+# =====================================================
+
+_FACTS_SELECT = """
+    WITH RECURSIVE cal(day) AS (
+        SELECT {start}
+        UNION ALL
+        SELECT {next_day} FROM cal WHERE day < {end}
+    ),
+    days AS (
+        SELECT day, CASE WHEN {weekday} = 6 THEN 0.5 ELSE 1.0 END AS weight
+        FROM cal
+        WHERE {weekday} <> 0
+    ),
+    att AS (
+        SELECT staff_id, work_date,
+               MAX(clock_out) AS clock_out,
+               MIN(clock_in) AS clock_in,
+               MAX(CASE WHEN status = 'On Leave' THEN 0 ELSE 1 END) AS worked,
+               MAX(CASE WHEN is_late THEN 1 ELSE 0 END) AS late
+        FROM (
+            SELECT staff_id, work_date, clock_in, clock_out, status, is_late
+            FROM attendance
+            WHERE work_date BETWEEN :start AND :end {staff_filter}
+            UNION ALL
+            SELECT staff_id, work_date, clock_in, clock_out, status, is_late
+            FROM attendance_archive
+            WHERE work_date BETWEEN :start AND :end {staff_filter}
+        ) u
+        GROUP BY staff_id, work_date
+    ),
+    lv AS (
+        SELECT l.staff_id, d.day, MIN(l.leave_type) AS leave_type
+        FROM leave_requests l
+        JOIN days d ON d.day BETWEEN l.start_date AND l.end_date
+        WHERE l.status = 'Approved' AND l.start_date <= :end AND l.end_date >= :start {staff_filter}
+        GROUP BY l.staff_id, d.day
+    ),
+    hol AS (
+        SELECT DISTINCT holiday_date AS day FROM holidays
+        WHERE holiday_date BETWEEN :start AND :end
+    ),
+    last_seen AS (
+        SELECT staff_id, MAX(work_date) AS last_day FROM att GROUP BY staff_id
+    )
+    SELECT staff_id, work_date, fiscal_year, status, leave_type, weight, minutes_worked
+    FROM (
+        SELECT s.id AS staff_id,
+               d.day AS work_date,
+               {fiscal_year} AS fiscal_year,
+               CASE WHEN a.worked = 1 THEN CASE WHEN a.late = 1 THEN 'late' ELSE 'present' END
+                    WHEN h.day IS NOT NULL THEN 'holiday'
+                    WHEN lv.staff_id IS NOT NULL OR a.worked = 0 THEN 'leave'
+                    ELSE 'absent' END AS status,
+               CASE WHEN a.worked = 1 OR h.day IS NOT NULL THEN NULL ELSE lv.leave_type END AS leave_type,
+               d.weight,
+               CASE WHEN a.worked = 1 AND a.clock_out IS NOT NULL
+                    THEN ({minutes} + 1440) % 1440 END AS minutes_worked
+        FROM days d
+        JOIN staff s ON s.join_date <= d.day {staff_join}
+        LEFT JOIN last_seen ls ON ls.staff_id = s.id
+        LEFT JOIN att a ON a.staff_id = s.id AND a.work_date = d.day
+        LEFT JOIN lv ON lv.staff_id = s.id AND lv.day = d.day
+        LEFT JOIN hol h ON h.day = d.day
+        WHERE s.is_active IS NOT FALSE OR d.day <= ls.last_day
+    ) f
+    WHERE status <> 'absent' OR work_date < :today
+"""
+
+
+def _facts_sql(dialect, per_staff=False):
+    if dialect == 'postgresql':
+        parts = {
+            'start': 'CAST(:start AS DATE)',
+            'end': 'CAST(:end AS DATE)',
+            'next_day': 'day + 1',
+            'weekday': 'EXTRACT(DOW FROM day)',
+            'minutes': 'CAST(EXTRACT(EPOCH FROM (a.clock_out - a.clock_in)) / 60 AS INTEGER)',
+        }
+    else:
+        parts = {
+            'start': 'date(:start)',
+            'end': 'date(:end)',
+            'next_day': "date(day, '+1 day')",
+            'weekday': "CAST(strftime('%w', day) AS INTEGER)",
+            'minutes': 'CAST(ROUND((julianday(a.clock_out) - julianday(a.clock_in)) * 1440) AS INTEGER)',
+        }
+    return _FACTS_SELECT.format(
+        fiscal_year=fiscal_year_sql('d.day', dialect),
+        staff_filter='AND staff_id = :staff_id' if per_staff else '',
+        staff_join='AND s.id = :staff_id' if per_staff else '',
+        **parts,
+    )
+
+
+# =====================================================
+# BUILD / REFRESH
+# =====================================================
+
+def refresh_facts(db, start, end, staff_id=None, today=None):
+    """
+    Recompute the facts for work dates start..end (one employee or all).
+
+    Returns:
+        int: fact rows written
+    """
+    today = today or date.today()
+    if end < start:
+        return 0
+    dialect = db.engine.dialect.name
+    params = {'start': start, 'end': end, 'today': today}
+    delete = "DELETE FROM attendance_daily WHERE work_date BETWEEN :start AND :end"
+    if staff_id is not None:
+        params['staff_id'] = staff_id
+        delete += " AND staff_id = :staff_id"
+    with db.engine.begin() as conn:
+        conn.execute(text(delete), params)
+        result = conn.execute(text(
+            f"INSERT INTO attendance_daily ({', '.join(_FACT_COLUMNS)}) "
+            f"{_facts_sql(dialect, per_staff=staff_id is not None)}"
+        ), params)
+    return result.rowcount
+
+
+def first_attendance_date(db):
+    """Earliest work_date in the live or archived attendance, or None"""
+    with db.engine.connect() as conn:
+        days = conn.execute(text(
+            "SELECT MIN(work_date) FROM attendance UNION ALL SELECT MIN(work_date) FROM attendance_archive"
+        )).scalars().all()
+    days = [d if isinstance(d, date) else date.fromisoformat(d) for d in days if d]
+    return min(days) if days else None
+
+
+def rebuild_facts(db, today=None):
+    """
+    Rebuild every fact from the first attendance date through today.
+
+    Returns:
+        int: fact rows written
+    """
+    from archive import ensure_archive_tables
+
+    today = today or date.today()
+    ensure_archive_tables(db)
+    facts_metadata.create_all(db.engine)
+    start = first_attendance_date(db)
+    with db.engine.begin() as conn:
+        conn.execute(attendance_daily.delete())
+        # Everything is recomputed below
+        conn.execute(attendance_facts_dirty.delete())
+    if start is None:
+        return 0
+    rows = refresh_facts(db, start, today, today=today)
+    _state['recomputed_on'] = today
+    logger.info("📅 Attendance facts rebuilt: %d rows from %s", rows, start)
+    return rows
+
+
+def ensure_fact_table(db):
+    """Create attendance_daily (and its queue) if missing and fill it the first time"""
+    facts_metadata.create_all(db.engine)
+    with db.engine.connect() as conn:
+        empty = conn.execute(select(attendance_daily.c.staff_id).limit(1)).first() is None
+    if empty:
+        rebuild_facts(db)
+
+
+def mark_facts_dirty(db, staff_id, start, end=None):
+    """Queue an employee's days for recomputation (one INSERT; call
+    request_refresh() afterwards)"""
+    stmt = insert(attendance_facts_dirty).values(staff_id=staff_id, start_date=start, end_date=end or start)
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(stmt)
+            return
+    except (ProgrammingError, OperationalError) as e:
+        if 'attendance_facts_dirty' not in str(e):
+            raise
+    # A database that never had the queue (see query_facts())
+    facts_metadata.create_all(db.engine)
+    with db.engine.begin() as conn:
+        conn.execute(stmt)
+
+
+def apply_pending_facts(db, today=None):
+    """
+    Recompute the ranges queued by mark_facts_dirty() in any process.
+
+    One range per employee (first to last queued day); queue rows are only
+    deleted once their employee's range is recomputed, so a failure leaves
+    the rest for the next refresh.
+
+    Returns:
+        list: (start, end) of every recomputed range
+    """
+    with db.engine.connect() as conn:
+        queued = conn.execute(select(attendance_facts_dirty)).all()
+    pending = {}
+    for row in queued:
+        ids, start, end = pending.get(row.staff_id, ([], row.start_date, row.end_date))
+        ids.append(row.id)
+        pending[row.staff_id] = (ids, min(start, row.start_date), max(end, row.end_date))
+
+    applied = []
+    for staff_id, (ids, start, end) in pending.items():
+        refresh_facts(db, start, end, staff_id=staff_id, today=today)
+        with db.engine.begin() as conn:
+            conn.execute(delete(attendance_facts_dirty).where(attendance_facts_dirty.c.id.in_(ids)))
+        applied.append((start, end))
+    return applied
+
+
+def sync_facts(db, today=None):
+    """
+    Bring the facts up to date: queued ranges, today, and once a day the
+    last FACT_RECOMPUTE_DAYS days.
+
+    Returns:
+        list: (start, end) of the queued ranges that were recomputed
+    """
+    today = today or date.today()
+    applied = apply_pending_facts(db, today=today)
+    if _state['recomputed_on'] != today:
+        refresh_facts(db, today - timedelta(days=FACT_RECOMPUTE_DAYS), today, today=today)
+        _state['recomputed_on'] = today
+    else:
+        refresh_facts(db, today, today, today=today)
+    return applied
+
+
+# =====================================================
+# AGGREGATIONS
+# =====================================================
+
+_TOTALS_SELECT = """
+    SELECT staff_id,
+           SUM(CASE WHEN status IN ('present', 'late') THEN weight ELSE 0 END) AS days_worked,
+           SUM(CASE WHEN status = 'late' THEN 1 ELSE 0 END) AS late_days,
+           SUM(CASE WHEN status = 'leave' THEN weight ELSE 0 END) AS leave_days,
+           SUM(CASE WHEN status = 'leave' AND leave_type = 'Annual' THEN weight ELSE 0 END) AS annual_leave_days,
+           SUM(CASE WHEN status = 'leave' AND leave_type = 'Sick' THEN weight ELSE 0 END) AS sick_leave_days,
+           SUM(CASE WHEN status = 'absent' THEN weight ELSE 0 END) AS absent_days,
+           SUM(CASE WHEN status <> 'holiday' THEN weight ELSE 0 END) AS workdays,
+           SUM(minutes_worked) AS minutes_worked
+    FROM attendance_daily
+    WHERE work_date BETWEEN :start AND :end
+    GROUP BY staff_id
+"""
+
+
+def query_facts(db, sql, params):
+    """Run a query on attendance_daily, creating and filling it first if this database never had it"""
+    try:
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            return conn.execute(text(sql), params).all()
+    except (ProgrammingError, OperationalError) as e:
+        if 'attendance_daily' not in str(e):
+            raise
+    ensure_fact_table(db)
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        return conn.execute(text(sql), params).all()
+
+
+def fact_totals(db, start, end):
+    """
+    Per-employee totals for work dates start..end (one grouped query).
+
+    Returns:
+        dict: staff_id -> days_worked, late_days, leave_days,
+              annual_leave_days, sick_leave_days, absent_days, workdays,
+              minutes_worked
+    """
+    rows = query_facts(db, _TOTALS_SELECT, {'start': start, 'end': end})
+    return {row.staff_id: {
+        'days_worked': float(row.days_worked or 0),
+        'late_days': int(row.late_days or 0),
+        'leave_days': float(row.leave_days or 0),
+        'annual_leave_days': float(row.annual_leave_days or 0),
+        'sick_leave_days': float(row.sick_leave_days or 0),
+        'absent_days': float(row.absent_days or 0),
+        'workdays': float(row.workdays or 0),
+        'minutes_worked': int(row.minutes_worked or 0),
+    } for row in rows}
+
+
+def working_days(db, start, end):
+    """Weighted working days start..end (Saturday 0.5, Sundays and holidays 0)"""
+    with db.engine.connect() as conn:
+        holidays = {d if isinstance(d, date) else date.fromisoformat(d) for d in conn.execute(
+            text("SELECT holiday_date FROM holidays WHERE holiday_date BETWEEN :start AND :end"),
+            {'start': start, 'end': end}).scalars()}
+    total = 0.0
+    day = start
+    while day <= end:
+        if day.weekday() != 6 and day not in holidays:
+            total += 0.5 if day.weekday() == 5 else 1.0
+        day += timedelta(days=1)
+    return total
@@ -1,25 +1,66 @@
 """
-Daily Automated Backup Script for Supabase PostgreSQL Database
--------------------------------------------------------------
-This script performs a pg_dump of the Supabase database and saves 
-the .sql file to a 'backups' folder.
+Daily Automated Backup Script for the Attendance Database
+---------------------------------------------------------
+Backs up whichever database the app is configured for and saves it to
+BACKUP_DIR (default: a 'backups' folder next to this script):
+
+- PostgreSQL (Supabase): pg_dump in the directory format with parallel
+  jobs (-Fd -j BACKUP_JOBS), each table compressed as it is written.
+  pg_dump reads from one MVCC snapshot, so clock-ins keep writing.
+- SQLite (kiosks / local): the online backup API copies BACKUP_SQLITE_PAGES
+  pages at a time and releases the database between steps, so the app
+  keeps writing while the copy runs. The copy is gzip-compressed as a
+  stream.
+
+Every backup is verified by restoring it into a scratch database (a temp
+file for SQLite, BACKUP_VERIFY_DATABASE_URL for PostgreSQL; without one,
+only the archive's table of contents is checked). Size, durations and
+restored row counts are appended to BACKUP_DIR/backup_metrics.jsonl.
 
 Usage:
     python backup.py
+    python backup.py --no-verify
 
 Schedule:
-    Run via Cron Job or GitHub Action at 2:00 AM daily
-    
+    Run via Cron Job or GitHub Action at 2:00 AM daily, or opt in to the
+    app's scheduler running it (backup job: SCHEDULER_BACKUP_HOURS in
+    scheduler.py, plus BACKUP_DIR on a volume outside the app directory)
+
+Environment:
+    DATABASE_URL                  sqlite:///... backs up that file; a
+                                  postgresql:// URL is used when the
+                                  SUPABASE_DB_* settings are not set
+    SUPABASE_DB_HOST/PORT/NAME/USER/PASSWORD
+    BACKUP_DIR                    where backups and metrics go (default
+                                  ./backups; required by the scheduler's job)
+    BACKUP_JOBS                   parallel pg_dump / pg_restore jobs (default 4)
+    BACKUP_COMPRESSION            pg_dump -Z value (default 6, gzip; e.g. zstd:3
+                                  with a PostgreSQL 16 client)
+    BACKUP_TIMEOUT_SECONDS        pg_dump / pg_restore timeout (default 1800)
+    BACKUP_RETENTION_DAYS         backups kept (default 7)
+    BACKUP_SQLITE_PAGES           pages copied per online-backup step (default 1024)
+    BACKUP_VERIFY_DATABASE_URL    scratch PostgreSQL database for test restores
+                                  (its contents are replaced!)
+
+Parallel dumps need a direct connection (port 5432), not the transaction
+pooler (6543): the jobs share one exported snapshot.
+
 Requirements:
     - psycopg2 (already in requirements.txt)
     - python-dotenv (already in requirements.txt)
-    - pg_dump must be installed on the system
+    - pg_dump / pg_restore must be installed on the system (PostgreSQL only)
 """
 
+import datetime
+import gzip
+import json
 import os
+import shutil
+import sqlite3
 import subprocess
-import datetime
 import sys
+import tempfile
+import time as _time
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -35,14 +76,26 @@ SUPABASE_DB_PORT = os.getenv('SUPABASE_DB_PORT', '5432')
 SUPABASE_DB_NAME = os.getenv('SUPABASE_DB_NAME', 'postgres')
 SUPABASE_DB_USER = os.getenv('SUPABASE_DB_USER', 'postgres')
 SUPABASE_DB_PASSWORD = os.getenv('SUPABASE_DB_PASSWORD', '')
+DATABASE_URL = os.getenv('DATABASE_URL', '')
+
+BACKUP_JOBS = int(os.getenv('BACKUP_JOBS', '4'))
+BACKUP_COMPRESSION = os.getenv('BACKUP_COMPRESSION', '6')
+BACKUP_TIMEOUT_SECONDS = int(os.getenv('BACKUP_TIMEOUT_SECONDS', '1800'))
+BACKUP_RETENTION_DAYS = int(os.getenv('BACKUP_RETENTION_DAYS', '7'))
+BACKUP_SQLITE_PAGES = int(os.getenv('BACKUP_SQLITE_PAGES', '1024'))
+BACKUP_VERIFY_DATABASE_URL = os.getenv('BACKUP_VERIFY_DATABASE_URL', '')
 
 # Backup directory
-BACKUP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backups')
+BACKUP_DIR = os.getenv('BACKUP_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backups')
+METRICS_PATH = os.path.join(BACKUP_DIR, 'backup_metrics.jsonl')
+
+# Backup names: backup_YYYYMMDD_HHMMSS.dir (PostgreSQL) / .sqlite.gz (SQLite),
+# stamped per backup so the scheduler's backup job never reuses a name
+def backup_timestamp():
+    return datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
 
-# Backup filename format: backup_YYYYMMDD_HHMMSS.sql
-TIMESTAMP = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-BACKUP_FILENAME = f'backup_{TIMESTAMP}.sql'
-BACKUP_PATH = os.path.join(BACKUP_DIR, BACKUP_FILENAME)
+# Row counts recorded after a test restore
+VERIFY_TABLES = ('staff', 'attendance', 'leave_requests', 'casual_workers', 'casual_attendance')
 
 
 def create_backup_directory():
@@ -57,97 +110,275 @@ def create_backup_directory():
         return False
 
 
-def perform_backup():
-    """Perform the database backup using pg_dump"""
-    try:
-        # Check if pg_dump is available
-        pg_dump_path = os.getenv('PG_DUMP_PATH', 'pg_dump')
-        
-        # Build the pg_dump command
-        cmd = [
-            pg_dump_path,
-            '-h', SUPABASE_DB_HOST,
-            '-p', SUPABASE_DB_PORT,
-            '-U', SUPABASE_DB_USER,
-            '-d', SUPABASE_DB_NAME,
-            '-f', BACKUP_PATH,
-            '--verbose',
-            '--no-password'  # Will use PGPASSWORD environment variable
-        ]
-        
-        # Set password environment variable
-        env = os.environ.copy()
+def sqlite_path(url):
+    """Database file of a sqlite:/// URL (relative paths as Flask-SQLAlchemy resolves them)"""
+    path = url.split(':///', 1)[1]
+    if os.path.isabs(path):
+        return path
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', path)
+
+
+def postgres_target():
+    """
+    pg_dump connection arguments and environment.
+
+    Returns:
+        tuple: (argument list, env dict, description) or None when no
+        PostgreSQL database is configured
+    """
+    env = os.environ.copy()
+    if SUPABASE_DB_PASSWORD:
         env['PGPASSWORD'] = SUPABASE_DB_PASSWORD
-        
-        print(f"📦 Starting backup to: {BACKUP_PATH}")
-        print(f"   Host: {SUPABASE_DB_HOST}:{SUPABASE_DB_PORT}")
-        print(f"   Database: {SUPABASE_DB_NAME}")
-        
-        # Run pg_dump
-        result = subprocess.run(
-            cmd,
-            env=env,
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minutes timeout
-        )
-        
-        if result.returncode == 0:
-            # Get file size
-            file_size = os.path.getsize(BACKUP_PATH)
-            file_size_mb = file_size / (1024 * 1024)
-            
-            print(f"✓ Backup completed successfully!")
-            print(f"   File: {BACKUP_FILENAME}")
-            print(f"   Size: {file_size_mb:.2f} MB")
-            
-            # Clean up old backups (keep last 7 days)
-            cleanup_old_backups()
-            
-            return True
-        else:
-            print(f"✗ Backup failed with return code: {result.returncode}")
-            print(f"   Error: {result.stderr}")
+        args = ['-h', SUPABASE_DB_HOST, '-p', SUPABASE_DB_PORT,
+                '-U', SUPABASE_DB_USER, '-d', SUPABASE_DB_NAME]
+        return args, env, f"{SUPABASE_DB_HOST}:{SUPABASE_DB_PORT}/{SUPABASE_DB_NAME}"
+    if DATABASE_URL.startswith(('postgres://', 'postgresql://')):
+        url = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
+        return ['-d', url], env, url.rsplit('@', 1)[-1]
+    return None
+
+
+def _run(cmd, env=None):
+    """Run a client tool; raises RuntimeError with its stderr on failure"""
+    result = subprocess.run(cmd, env=env, capture_output=True, text=True,
+                            timeout=BACKUP_TIMEOUT_SECONDS)
+    if result.returncode != 0:
+        raise RuntimeError(f"{os.path.basename(cmd[0])} exited with {result.returncode}: "
+                           f"{result.stderr.strip()}")
+    return result.stdout
+
+
+def _size_of(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name))
+                   for root, _dirs, files in os.walk(path) for name in files)
+    return os.path.getsize(path)
+
+
+# =====================================================
+# POSTGRESQL
+# =====================================================
+
+def backup_postgres(args, env):
+    """
+    Parallel directory-format pg_dump.
+
+    Returns:
+        str: path of the backup directory
+    """
+    pg_dump_path = os.getenv('PG_DUMP_PATH', 'pg_dump')
+    backup_path = os.path.join(BACKUP_DIR, f'backup_{backup_timestamp()}.dir')
+    cmd = [
+        pg_dump_path, *args,
+        '-Fd', '-j', str(BACKUP_JOBS),
+        '-Z', BACKUP_COMPRESSION,
+        '-f', backup_path,
+        # Fail instead of queueing behind DDL (and the clock-ins queued after it)
+        '--lock-wait-timeout=30s',
+        '--no-password'  # Will use PGPASSWORD environment variable
+    ]
+    try:
+        _run(cmd, env)
+    except Exception:
+        shutil.rmtree(backup_path, ignore_errors=True)
+        raise
+    return backup_path
+
+
+def verify_postgres(backup_path):
+    """
+    Test-restore into BACKUP_VERIFY_DATABASE_URL (or only read the TOC).
+
+    Returns:
+        dict: restored row counts per table ({} for a TOC-only check)
+    """
+    pg_restore_path = os.getenv('PG_RESTORE_PATH', 'pg_restore')
+    toc = _run([pg_restore_path, '--list', backup_path])
+    if 'TABLE DATA' not in toc:
+        raise RuntimeError("backup contains no table data")
+    if not BACKUP_VERIFY_DATABASE_URL:
+        return {}
+
+    _run([pg_restore_path, '-j', str(BACKUP_JOBS), '--clean', '--if-exists',
+          '--no-owner', '--no-privileges', '-d', BACKUP_VERIFY_DATABASE_URL, backup_path])
+
+    import psycopg2
+    conn = psycopg2.connect(BACKUP_VERIFY_DATABASE_URL)
+    try:
+        with conn.cursor() as cur:
+            counts = {}
+            for table in VERIFY_TABLES:
+                cur.execute("SELECT to_regclass(%s)", (table,))
+                if cur.fetchone()[0] is not None:
+                    cur.execute(f"SELECT COUNT(*) FROM {table}")
+                    counts[table] = cur.fetchone()[0]
+            return counts
+    finally:
+        conn.close()
+
+
+# =====================================================
+# SQLITE
+# =====================================================
+
+def _sqlite_progress(status, remaining, total):
+    done = total - remaining
+    if total and (remaining == 0 or done % (BACKUP_SQLITE_PAGES * 64) == 0):
+        print(f"   {done}/{total} pages")
+
+
+def backup_sqlite(db_path):
+    """
+    Online backup in BACKUP_SQLITE_PAGES steps, then gzip as a stream.
+
+    Returns:
+        str: path of the .sqlite.gz backup
+    """
+    backup_path = os.path.join(BACKUP_DIR, f'backup_{backup_timestamp()}.sqlite.gz')
+    fd, snapshot_path = tempfile.mkstemp(suffix='.sqlite', dir=BACKUP_DIR)
+    os.close(fd)
+    try:
+        source = sqlite3.connect(db_path, timeout=30)
+        snapshot = sqlite3.connect(snapshot_path)
+        try:
+            # Writers get the database back between steps
+            source.backup(snapshot, pages=BACKUP_SQLITE_PAGES, progress=_sqlite_progress, sleep=0.005)
+        finally:
+            snapshot.close()
+            source.close()
+
+        with open(snapshot_path, 'rb') as src, gzip.open(backup_path, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    except Exception:
+        if os.path.exists(backup_path):
+            os.remove(backup_path)
+        raise
+    finally:
+        os.remove(snapshot_path)
+    return backup_path
+
+
+def verify_sqlite(backup_path):
+    """
+    Decompress into a scratch file, run integrity_check and count rows.
+
+    Returns:
+        dict: restored row counts per table
+    """
+    fd, scratch_path = tempfile.mkstemp(suffix='.sqlite')
+    os.close(fd)
+    try:
+        with gzip.open(backup_path, 'rb') as src, open(scratch_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        conn = sqlite3.connect(scratch_path)
+        try:
+            result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+            if result != 'ok':
+                raise RuntimeError(f"integrity_check: {result}")
+            existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    for table in VERIFY_TABLES if table in existing}
+        finally:
+            conn.close()
+    finally:
+        os.remove(scratch_path)
+
+
+# =====================================================
+# BACKUP RUN
+# =====================================================
+
+def record_metrics(entry):
+    """Append one JSON line per backup to BACKUP_DIR/backup_metrics.jsonl"""
+    try:
+        with open(METRICS_PATH, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+    except Exception as e:
+        print(f"   ⚠️  Warning: Could not record backup metrics: {e}")
+
+
+def perform_backup(verify=True):
+    """Back up the configured database, verify the copy and record metrics"""
+    if DATABASE_URL.startswith('sqlite'):
+        engine, target = 'sqlite', sqlite_path(DATABASE_URL)
+    else:
+        pg = postgres_target()
+        if pg is None:
+            print("✗ Error: no database configured!")
+            print("   Set SUPABASE_DB_PASSWORD (or DATABASE_URL) in your environment or .env file")
             return False
-            
-    except FileNotFoundError:
-        print("✗ Error: pg_dump not found!")
+        engine, target = 'postgresql', pg[2]
+
+    print(f"📦 Starting {engine} backup of {target}")
+    started = _time.perf_counter()
+    entry = {'started_at': datetime.datetime.now().isoformat(timespec='seconds'), 'engine': engine}
+    try:
+        if engine == 'sqlite':
+            backup_path = backup_sqlite(target)
+        else:
+            backup_path = backup_postgres(pg[0], pg[1])
+        entry['backup_seconds'] = round(_time.perf_counter() - started, 2)
+        entry['path'] = os.path.basename(backup_path)
+        entry['size_bytes'] = _size_of(backup_path)
+
+        print(f"✓ Backup completed in {entry['backup_seconds']:.1f} s")
+        print(f"   File: {entry['path']}")
+        print(f"   Size: {entry['size_bytes'] / (1024 * 1024):.2f} MB")
+
+        if verify:
+            verify_started = _time.perf_counter()
+            counts = verify_sqlite(backup_path) if engine == 'sqlite' else verify_postgres(backup_path)
+            entry['verify_seconds'] = round(_time.perf_counter() - verify_started, 2)
+            entry['verified'] = 'restore' if (engine == 'sqlite' or BACKUP_VERIFY_DATABASE_URL) else 'toc'
+            entry['row_counts'] = counts
+            print(f"✓ Verified ({entry['verified']}) in {entry['verify_seconds']:.1f} s"
+                  + (f": {', '.join(f'{t}={n}' for t, n in counts.items())}" if counts else ''))
+        entry['success'] = True
+    except FileNotFoundError as e:
+        entry.update(success=False, error=str(e))
+        print(f"✗ Error: {e.filename or 'client tool'} not found!")
         print("   Please ensure PostgreSQL client tools are installed.")
         print("   On macOS: brew install postgresql")
         print("   On Ubuntu: sudo apt-get install postgresql-client")
-        return False
-        
     except subprocess.TimeoutExpired:
-        print("✗ Backup timed out after 5 minutes")
-        return False
-        
+        entry.update(success=False, error='timeout')
+        print(f"✗ Backup timed out after {BACKUP_TIMEOUT_SECONDS} s")
     except Exception as e:
-        print(f"✗ Unexpected error during backup: {e}")
-        return False
+        entry.update(success=False, error=str(e))
+        print(f"✗ Backup failed: {e}")
+
+    entry['total_seconds'] = round(_time.perf_counter() - started, 2)
+    record_metrics(entry)
+    if entry['success']:
+        cleanup_old_backups()
+    return entry['success']
 
 
 def cleanup_old_backups():
-    """Remove backup files older than 7 days"""
+    """Remove backups older than BACKUP_RETENTION_DAYS"""
     try:
         if not os.path.exists(BACKUP_DIR):
             return
-            
-        cutoff_date = datetime.datetime.now() - datetime.timedelta(days=7)
+
+        cutoff_date = datetime.datetime.now() - datetime.timedelta(days=BACKUP_RETENTION_DAYS)
         deleted_count = 0
-        
+
         for filename in os.listdir(BACKUP_DIR):
-            if filename.endswith('.sql'):
+            if filename.startswith('backup_') and filename != os.path.basename(METRICS_PATH):
                 file_path = os.path.join(BACKUP_DIR, filename)
                 file_mtime = datetime.datetime.fromtimestamp(os.path.getmtime(file_path))
-                
+
                 if file_mtime < cutoff_date:
-                    os.remove(file_path)
+                    if os.path.isdir(file_path):
+                        shutil.rmtree(file_path)
+                    else:
+                        os.remove(file_path)
                     deleted_count += 1
                     print(f"   🗑️  Deleted old backup: {filename}")
-        
+
         if deleted_count > 0:
             print(f"   ✓ Cleaned up {deleted_count} old backup(s)")
-            
+
     except Exception as e:
         print(f"   ⚠️  Warning: Could not cleanup old backups: {e}")
 
@@ -162,18 +393,18 @@ def send_failure_notification(error_message):
     print(f"Time: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"Error: {error_message}")
     print("="*50 + "\n")
-    
+
     # Optional: Send email notification
     # You can implement this using smtplib or a service like SendGrid
     """
     import smtplib
     from email.mime.text import MIMEText
-    
+
     msg = MIMEText(f"Database backup failed!\n\nError: {error_message}")
     msg['Subject'] = '⚠️ DATABASE BACKUP FAILED'
     msg['From'] = 'backup@yourdomain.com'
     msg['To'] = 'admin@yourdomain.com'
-    
+
     with smtplib.SMTP('smtp.gmail.com', 587) as server:
         server.starttls()
         server.login('your-email@gmail.com', 'your-password')
@@ -187,27 +418,20 @@ def main():
     print("🚀 DATABASE BACKUP SCRIPT")
     print(f"   Time: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*50 + "\n")
-    
-    # Validate database credentials
-    if not SUPABASE_DB_PASSWORD:
-        print("✗ Error: SUPABASE_DB_PASSWORD environment variable not set!")
-        print("   Please set the database password in your environment or .env file")
-        send_failure_notification("SUPABASE_DB_PASSWORD not set")
-        sys.exit(1)
-    
+
     # Create backup directory
     if not create_backup_directory():
         send_failure_notification("Failed to create backup directory")
         sys.exit(1)
-    
+
     # Perform backup
-    success = perform_backup()
-    
+    success = perform_backup(verify='--no-verify' not in sys.argv)
+
     if success:
         print("\n✅ BACKUP COMPLETED SUCCESSFULLY")
         sys.exit(0)
     else:
-        send_failure_notification("pg_dump failed - check error messages above")
+        send_failure_notification("Backup failed - check error messages above")
         sys.exit(1)
 
 
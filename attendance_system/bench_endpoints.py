@@ -0,0 +1,305 @@
+"""
+Endpoint Benchmark Suite with Stored Baselines
+----------------------------------------------
+Runs the hot endpoints through the Flask test client against generated
+datasets of several sizes (generate_dataset.py) and records, per endpoint
+and dataset size:
+
+- latency (p50 / p95 / mean over --iterations requests)
+- SQL statements per request (X-DB-Queries, from query_stats.py)
+- peak Python memory allocated while serving one request (tracemalloc)
+
+Results are written as JSON. `--compare` loads an earlier results file
+(the baseline) and prints the change for every endpoint, marking latency
+regressions beyond --threshold and any increase in query count.
+
+Usage:
+    python bench_endpoints.py --sizes 50 500 --output bench_results.json
+    python bench_endpoints.py --sizes 50 500 --compare bench_baseline.json
+    python bench_endpoints.py --save-baseline bench_baseline.json
+    python bench_endpoints.py --only today clock_in --iterations 50
+
+SQLite datasets are built in a temporary directory. With --database-url the
+given database is EMPTIED and reloaded for each size, so point it at a
+local or staging database only.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time as _time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+# Measure requests, not side work: no SMTP, no background view refresh or jobs
+os.environ['EMAIL_ENABLED'] = 'false'
+os.environ.setdefault('REPORT_REFRESH_SECONDS', '0')
+os.environ.setdefault('SCHEDULER_ENABLED', '0')
+os.environ.setdefault('SLOW_QUERY_MS', '100000')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Requests traced with tracemalloc per case (slower, so kept apart from timing)
+MEMORY_SAMPLES = 3
+
+
+# =====================================================
+# CASES
+# =====================================================
+
+class Case:
+    """One endpoint: `request(i)` returns (method, path, json body or None)"""
+
+    def __init__(self, name, request, prepare=None):
+        self.name = name
+        self.request = request
+        self.prepare = prepare
+
+
+def _get(path):
+    return lambda i: ('GET', path, None)
+
+
+def build_cases(generator):
+    """Endpoints to benchmark for a dataset built by `generator`"""
+    end = generator.end_date
+    employees = generator.employees
+
+    def clock_in(i):
+        # A fresh (staff, day) pair per request, after the generated history
+        day = end + timedelta(days=1 + i // employees)
+        return 'POST', '/api/attendance', {
+            'staff_id': i % employees + 1,
+            'work_date': day.isoformat(),
+            'clock_in': '08:05',
+        }
+
+    pending_ids = []
+
+    def prepare_approvals(db, count):
+        from app import LeaveRequest
+        requests = []
+        for i in range(count):
+            start = end + timedelta(days=30 + 3 * (i // employees))
+            requests.append(LeaveRequest(
+                staff_id=i % employees + 1, leave_type='Annual', start_date=start,
+                end_date=start + timedelta(days=1), total_days=2, reason='benchmark',
+                status='Pending', fiscal_year=LeaveRequest.get_fiscal_year(start),
+            ))
+        db.session.add_all(requests)
+        db.session.commit()
+        pending_ids[:] = [r.id for r in requests]
+
+    def approve(i):
+        return 'POST', f"/api/leave-requests/{pending_ids[i]}/approve", {}
+
+    return [
+        Case('dashboard', _get('/admin/dashboard')),
+        Case('today', _get('/api/attendance/today')),
+        Case('clock_in', clock_in),
+        Case('export_leave_summary', _get('/export_leave_summary')),
+        Case('export_attendance', _get('/admin/export-attendance')),
+        Case('report_fiscal_year', _get('/api/reports/fiscal-year-summary')),
+        Case('report_monthly', _get(
+            f"/api/reports/monthly-attendance-summary?year={end.year}&month={end.month}")),
+        Case('approve_leave', approve, prepare=prepare_approvals),
+    ]
+
+
+# =====================================================
+# MEASUREMENT
+# =====================================================
+
+def _call(client, method, path, body):
+    started = _time.perf_counter()
+    response = client.open(path, method=method, json=body)
+    response.get_data()
+    return response, _time.perf_counter() - started
+
+
+def run_case(client, db, case, iterations):
+    """
+    Time `iterations` requests, then trace MEMORY_SAMPLES more.
+
+    Returns:
+        dict: p50_ms, p95_ms, mean_ms, queries, peak_kb, status
+    """
+    total = iterations + MEMORY_SAMPLES
+    if case.prepare:
+        case.prepare(db, total)
+
+    latencies, queries, statuses = [], [], set()
+    for i in range(iterations):
+        response, elapsed = _call(client, *case.request(i))
+        latencies.append(elapsed * 1000)
+        queries.append(int(response.headers.get('X-DB-Queries', 0)))
+        statuses.add(response.status_code)
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(iterations, total):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            _call(client, *case.request(i))
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p95_ms': round(latencies[max(0, int(len(latencies) * 0.95) - 1)], 2),
+        'mean_ms': round(statistics.fmean(latencies), 2),
+        'queries': max(queries),
+        'peak_kb': round(max(peaks) / 1024, 1),
+        'status': sorted(statuses),
+    }
+
+
+def load_dataset(db, size, args):
+    """Generate and load the dataset for `size` employees"""
+    from generate_dataset import DatasetGenerator, generate
+    from reporting import rebuild_reports
+
+    generator = DatasetGenerator(employees=size, years=args.years,
+                                 casuals_per_day=max(5, size // 20),
+                                 seed=args.seed, end_date=args.end_date)
+    with contextlib.redirect_stdout(io.StringIO()):
+        generate(db, generator, reset=True)
+        rebuild_reports(db)
+    return generator
+
+
+def bench_size(size, args, workdir):
+    from app import create_app, db
+
+    url = args.database_url or f"sqlite:///{os.path.join(workdir, f'bench_{size}.db')}"
+    with contextlib.redirect_stdout(io.StringIO()):
+        flask_app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+
+    results = {}
+    with flask_app.app_context():
+        started = _time.perf_counter()
+        generator = load_dataset(db, size, args)
+        print(f"📦 {size} employees loaded in {_time.perf_counter() - started:.1f} s")
+
+        client = flask_app.test_client()
+        with client.session_transaction() as sess:
+            sess['admin_logged_in'] = True
+
+        for case in build_cases(generator):
+            if args.only and case.name not in args.only:
+                continue
+            result = run_case(client, db, case, args.iterations)
+            results[f"{case.name}@{size}"] = result
+            print(f"   {case.name:<22} p50 {result['p50_ms']:>9.2f} ms  p95 {result['p95_ms']:>9.2f} ms  "
+                  f"{result['queries']:>5} queries  {result['peak_kb']:>9.1f} KB  HTTP {result['status']}")
+        db.engine.dispose()
+    return results
+
+
+# =====================================================
+# BASELINES
+# =====================================================
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(baseline, current, threshold):
+    """
+    Per-case change from `baseline` to `current` results.
+
+    Returns:
+        (list of report lines, list of regressed case names)
+    """
+    lines = [f"{'case':<32} {'p50 before':>11} {'p50 after':>10} {'change':>8} "
+             f"{'queries':>11} {'peak KB':>17}"]
+    regressions = []
+    for name, now in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            lines.append(f"{name:<32} {'-':>11} {now['p50_ms']:>10.2f}   (new)")
+            continue
+        change = (now['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0.0
+        regressed = change > threshold or now['queries'] > before['queries']
+        if regressed:
+            regressions.append(name)
+        lines.append(
+            f"{name:<32} {before['p50_ms']:>11.2f} {now['p50_ms']:>10.2f} {change:>+7.1f}% "
+            f"{before['queries']:>5} -> {now['queries']:<4} {before['peak_kb']:>7.1f} -> {now['peak_kb']:<7.1f}"
+            + ('  ⚠️' if regressed else '')
+        )
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark hot endpoints against generated datasets')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[50, 500], help='employees per dataset')
+    parser.add_argument('--years', type=int, default=2, help='fiscal years of history per dataset')
+    parser.add_argument('--iterations', type=int, default=20, help='timed requests per endpoint')
+    parser.add_argument('--only', nargs='+', help='case names to run (default all)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end-date', type=date.fromisoformat, default=None,
+                        help='last day of generated data (default today)')
+    parser.add_argument('--database-url', help='benchmark on this database (it is emptied!)')
+    parser.add_argument('--output', default='bench_results.json', help='results file')
+    parser.add_argument('--save-baseline', help='also write the results here as the new baseline')
+    parser.add_argument('--compare', help='baseline results file to compare against')
+    parser.add_argument('--threshold', type=float, default=20.0,
+                        help='p50 increase (%%) reported as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='attendance-bench-') as workdir:
+        for size in args.sizes:
+            results.update(bench_size(size, args, workdir))
+
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'created_at': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'database': 'sqlite' if not args.database_url else args.database_url.split(':', 1)[0],
+            'sizes': args.sizes,
+            'years': args.years,
+            'iterations': args.iterations,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Results written to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        lines, regressions = compare(baseline, report, args.threshold)
+        print(f"\nCompared with {args.compare} (commit {baseline['meta'].get('commit')}):")
+        print('\n'.join(lines))
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+            if args.fail_on_regression:
+                sys.exit(1)
+        else:
+            print("\n✅ No regressions")
+
+
+if __name__ == '__main__':
+    main()
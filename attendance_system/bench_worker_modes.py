@@ -0,0 +1,184 @@
+"""
+Morning-Rush Load Test per Gunicorn Worker Mode
+-----------------------------------------------
+Starts the app under gunicorn.conf.py once per worker mode (sync, gthread,
+gevent) and replays the 07:45-08:30 pattern: every kiosk clocks staff in
+(POST /api/attendance) and polls the board (GET /api/attendance/today).
+
+For each mode it reports requests per second, p50/p95 latency and errors,
+and checks that concurrent clock-ins never produced duplicate rows (each
+staff member has exactly one attendance row for the test date), which
+would indicate sessions leaking between threads or greenlets.
+
+Usage:
+    DATABASE_URL=postgresql://... python bench_worker_modes.py
+    python bench_worker_modes.py --modes gthread gevent --concurrency 50 --rounds 20
+    python bench_worker_modes.py --seed --output bench_worker_modes.json
+
+Run it against a staging database: it writes attendance rows for dates in
+the past (one date per mode, starting at --base-date).
+"""
+
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _request(url, payload=None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, method='POST' if data else 'GET',
+                                 headers={'Content-Type': 'application/json'})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            body = resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        body, status = e.read(), e.code
+    except (urllib.error.URLError, OSError):
+        body, status = b'', 0
+    return status, time.perf_counter() - started, body
+
+
+def _wait_ready(base_url, deadline=30):
+    stop = time.time() + deadline
+    while time.time() < stop:
+        status, _, _ = _request(f"{base_url}/admin-login")
+        if status == 200:
+            return True
+        time.sleep(0.25)
+    return False
+
+
+def _staff_ids(base_url):
+    status, _, body = _request(f"{base_url}/api/attendance/today")
+    if status != 200:
+        raise RuntimeError(f"GET /api/attendance/today returned {status}")
+    return [row['emp_id'] for row in json.loads(body)['employees']]
+
+
+def run_morning_rush(base_url, staff_ids, work_date, concurrency, rounds):
+    """
+    Each round: every staff member clocks in once and every kiosk polls
+    once, all concurrently.
+
+    Returns:
+        dict: requests, seconds, rps, p50/p95 ms, errors
+    """
+    def clock_in(staff_id, minute):
+        return _request(f"{base_url}/api/attendance", {
+            'staff_id': staff_id,
+            'work_date': work_date.isoformat(),
+            'clock_in': f"07:{45 + minute % 15:02d}",
+        })
+
+    def poll(_):
+        return _request(f"{base_url}/api/attendance/today")
+
+    results = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for minute in range(rounds):
+            futures = [pool.submit(clock_in, staff_id, minute) for staff_id in staff_ids]
+            futures += [pool.submit(poll, i) for i in range(concurrency)]
+            results.extend(f.result() for f in futures)
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(r[1] * 1000 for r in results)
+    errors = sum(1 for r in results if not 200 <= r[0] < 300)
+    return {
+        'requests': len(results),
+        'seconds': round(elapsed, 2),
+        'rps': round(len(results) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies), 1),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1], 1),
+        'errors': errors,
+    }
+
+
+def check_no_duplicates(base_url, work_date):
+    """True if every staff member has at most one row for work_date"""
+    status, _, body = _request(f"{base_url}/api/attendance?start_date={work_date.isoformat()}")
+    if status != 200:
+        return False
+    rows = [r for r in json.loads(body)['attendance'] if r['work_date'] == work_date.isoformat()]
+    staff = [r['staff_id'] for r in rows]
+    return len(staff) == len(set(staff))
+
+
+def bench_mode(mode, args, work_date):
+    env = dict(os.environ, GUNICORN_WORKER_CLASS=mode, WEB_CONCURRENCY=str(args.workers),
+               PORT=str(args.port))
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        if not _wait_ready(base_url):
+            server.terminate()
+            _, stderr = server.communicate(timeout=10)
+            return {'mode': mode, 'error': (stderr or 'server did not start')[-500:]}
+        staff_ids = _staff_ids(base_url)
+        # Warm-up (pool connections, first-request work) is not measured
+        run_morning_rush(base_url, staff_ids[:2], work_date, 2, 1)
+        result = run_morning_rush(base_url, staff_ids, work_date, args.concurrency, args.rounds)
+        result['no_duplicate_rows'] = check_no_duplicates(base_url, work_date)
+        return {'mode': mode, 'workers': args.workers, 'concurrency': args.concurrency, **result}
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Morning-rush RPS per gunicorn worker mode')
+    parser.add_argument('--modes', nargs='+', default=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=30, help='concurrent kiosks/clients')
+    parser.add_argument('--rounds', type=int, default=10, help='clock-in waves per mode')
+    parser.add_argument('--port', type=int, default=5077)
+    parser.add_argument('--base-date', default='2020-01-06', help='first test work_date')
+    parser.add_argument('--seed', action='store_true', help='create tables and seed staff first')
+    parser.add_argument('--output', help='write results as JSON')
+    args = parser.parse_args()
+
+    if args.seed:
+        subprocess.run([sys.executable, '-c', 'import app; app.init_db()\n'
+                        'with app.get_app().app_context(): app.seed_staff()'], cwd=HERE, check=True)
+
+    base_date = date.fromisoformat(args.base_date)
+    results = []
+    for i, mode in enumerate(args.modes):
+        print(f"⏱️  {mode} ...", flush=True)
+        results.append(bench_mode(mode, args, base_date + timedelta(days=i)))
+
+    print(f"\n{'mode':<8} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7} {'no dupes':>9}")
+    for r in results:
+        if 'error' in r:
+            print(f"{r['mode']:<8} failed: {r['error'].strip().splitlines()[-1]}")
+            continue
+        print(f"{r['mode']:<8} {r['rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} "
+              f"{r['errors']:>7} {str(r['no_duplicate_rows']):>9}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n📄 Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -260,11 +260,32 @@ CREATE TRIGGER trg_leaverequest_before_insert_update
 COMMENT ON TRIGGER trg_leaverequest_before_insert_update ON LeaveRequests IS 
 'Auto-calculates TotalDays excluding Sundays, Saturdays as 0.5';
 
+-- =====================================================
+-- REPORTING VIEWS 1-4 ARE MATERIALIZED
+-- Aggregated once per refresh instead of on every report query.
+-- Refresh with: SELECT refresh_reporting_views();
+-- Earlier versions created them as plain views; drop those first.
+-- =====================================================
+DO $$
+DECLARE
+    v TEXT;
+BEGIN
+    FOREACH v IN ARRAY ARRAY['vw_employee_attendance_summary', 'vw_leave_balance_summary',
+                             'vw_monthly_attendance_report', 'vw_employeeremainingleave']
+    LOOP
+        IF EXISTS (SELECT 1 FROM pg_views WHERE schemaname = current_schema() AND viewname = v) THEN
+            EXECUTE format('DROP VIEW %I CASCADE', v);
+        END IF;
+    END LOOP;
+END $$;
+
 -- =====================================================
 -- VIEW 1: Employee Attendance Summary
 -- =====================================================
-CREATE OR REPLACE VIEW vw_employee_attendance_summary AS
+DROP MATERIALIZED VIEW IF EXISTS vw_employee_attendance_summary;
+CREATE MATERIALIZED VIEW vw_employee_attendance_summary AS
 SELECT 
+    a.AttendanceID,
     e.EmpID,
     e.EmployeeCode,
     e.FirstName || ' ' || e.LastName AS FullName,
@@ -276,17 +297,23 @@ SELECT
     a.Status,
     get_fiscal_year(a.WorkDate) AS FiscalYear
 FROM Employees e
-LEFT JOIN Attendance a ON e.EmpID = a.EmpID
+JOIN Attendance a ON e.EmpID = a.EmpID
 WHERE e.IsActive = TRUE
 ORDER BY e.EmpID, a.WorkDate;
 
-COMMENT ON VIEW vw_employee_attendance_summary IS 
+-- One row per attendance row (inner join: no NULL WorkDate rows for
+-- employees without attendance), as REFRESH ... CONCURRENTLY requires
+CREATE UNIQUE INDEX ux_vw_employee_attendance_summary
+    ON vw_employee_attendance_summary (AttendanceID);
+
+COMMENT ON MATERIALIZED VIEW vw_employee_attendance_summary IS 
 'Daily attendance summary with fiscal year information';
 
 -- =====================================================
 -- VIEW 2: Leave Balance Summary
 -- =====================================================
-CREATE OR REPLACE VIEW vw_leave_balance_summary AS
+DROP MATERIALIZED VIEW IF EXISTS vw_leave_balance_summary;
+CREATE MATERIALIZED VIEW vw_leave_balance_summary AS
 SELECT 
     e.EmpID,
     e.EmployeeCode,
@@ -311,13 +338,17 @@ JOIN FiscalYears fy ON lb.FiscalYear = fy.FiscalYear
 WHERE e.IsActive = TRUE
 ORDER BY e.EmpID, lb.FiscalYear;
 
-COMMENT ON VIEW vw_leave_balance_summary IS 
+CREATE UNIQUE INDEX ux_vw_leave_balance_summary
+    ON vw_leave_balance_summary (EmpID, FiscalYear);
+
+COMMENT ON MATERIALIZED VIEW vw_leave_balance_summary IS 
 'Leave balance summary with remaining days calculation';
 
 -- =====================================================
 -- VIEW 3: Monthly Attendance Report
 -- =====================================================
-CREATE OR REPLACE VIEW vw_monthly_attendance_report AS
+DROP MATERIALIZED VIEW IF EXISTS vw_monthly_attendance_report;
+CREATE MATERIALIZED VIEW vw_monthly_attendance_report AS
 SELECT 
     e.EmpID,
     e.EmployeeCode,
@@ -331,20 +362,25 @@ SELECT
     SUM(a.WorkHours) AS TotalWorkHours,
     COUNT(CASE WHEN a.DayType = 'Saturday Half Day' THEN 1 END) AS SaturdaysWorked
 FROM Employees e
-LEFT JOIN Attendance a ON e.EmpID = a.EmpID
+JOIN Attendance a ON e.EmpID = a.EmpID
 WHERE e.IsActive = TRUE
 GROUP BY e.EmpID, e.EmployeeCode, e.FirstName, e.LastName, 
          DATE_TRUNC('month', a.WorkDate), get_fiscal_year(a.WorkDate)
 ORDER BY Month DESC, e.EmpID;
 
-COMMENT ON VIEW vw_monthly_attendance_report IS 
+-- Inner join: Month is never NULL, so (EmpID, Month) is unique
+CREATE UNIQUE INDEX ux_vw_monthly_attendance_report
+    ON vw_monthly_attendance_report (EmpID, Month);
+
+COMMENT ON MATERIALIZED VIEW vw_monthly_attendance_report IS 
 'Monthly attendance statistics including Saturday half-days';
 
 -- =====================================================
 -- VIEW 4: Employee Remaining Leave for Current Fiscal Year
 -- Calculates remaining leave by subtracting used days from 21-day entitlement
 -- =====================================================
-CREATE OR REPLACE VIEW vw_EmployeeRemainingLeave AS
+DROP MATERIALIZED VIEW IF EXISTS vw_EmployeeRemainingLeave;
+CREATE MATERIALIZED VIEW vw_EmployeeRemainingLeave AS
 SELECT 
     e.EmpID,
     e.EmployeeCode,
@@ -373,9 +409,31 @@ LEFT JOIN LeaveBalances lb ON e.EmpID = lb.EmpID
 WHERE e.IsActive = TRUE
 ORDER BY e.EmpID;
 
-COMMENT ON VIEW vw_EmployeeRemainingLeave IS 
+CREATE UNIQUE INDEX ux_vw_employeeremainingleave
+    ON vw_EmployeeRemainingLeave (EmpID);
+
+COMMENT ON MATERIALIZED VIEW vw_EmployeeRemainingLeave IS 
 'Shows remaining leave days for current fiscal year (21-day annual entitlement minus used days from LeaveRequests)';
 
+-- =====================================================
+-- FUNCTION: Refresh Reporting Views
+-- CONCURRENTLY keeps the views readable during the refresh
+-- (needs the unique indexes above). Call on a schedule and after
+-- bulk writes such as fiscal-year initialization.
+-- =====================================================
+CREATE OR REPLACE FUNCTION refresh_reporting_views()
+RETURNS VOID AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY vw_employee_attendance_summary;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY vw_leave_balance_summary;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY vw_monthly_attendance_report;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY vw_EmployeeRemainingLeave;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION refresh_reporting_views() IS 
+'Refreshes the materialized reporting views without blocking readers';
+
 -- =====================================================
 -- VIEW 5: Monthly Employee Report
 -- Shows total hours, leave days, sick/absent days, and underworked flag
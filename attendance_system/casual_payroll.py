@@ -0,0 +1,236 @@
+"""
+Casual labour hours for payroll periods
+Per-worker, per-work-type totals for a day, a week (Monday-Sunday), a
+month or any start/end range, computed in one SQL aggregate over
+casual_attendance:
+
+- a shift belongs to the period of its work_date (the day it started)
+- a clock-out earlier than the clock-in crossed midnight and counts
+  24 hours on top (22:00-06:00 is 8 hours)
+- open shifts (no clock-out yet) are counted in open_shifts, not in hours
+
+Totals for closed periods are cached in report_cache (reporting.py), shared
+by every worker: a period is closed once its last day is more than
+CASUAL_MAX_SHIFT_HOURS in the past, because no clock-out can change it
+after that. Periods that still have open shifts are not cached until
+close_stale_shifts() has closed them.
+
+    GET /api/casual/payroll?period=week&date=2026-10-19
+    GET /api/casual/payroll.csv?period=month&date=2026-10-01
+    GET /api/casual/payroll?start=2026-10-01&end=2026-10-15
+"""
+
+import csv
+import io
+import logging
+from datetime import date, datetime, timedelta
+
+from flask import jsonify, make_response, request, session
+from sqlalchemy import text
+
+from casual_workers import CASUAL_MAX_SHIFT_HOURS
+from reporting import get_cached_reports, report_cache_key, store_cached_reports
+
+logger = logging.getLogger(__name__)
+
+
+# =====================================================
+# PERIODS AND SHIFT LENGTHS
+# =====================================================
+
+def period_bounds(period, day):
+    """
+    First and last day of the payroll period containing `day`.
+
+    Args:
+        period: 'day', 'week' (Monday-Sunday) or 'month'
+
+    Returns:
+        tuple: (start date, end date), both inclusive
+    """
+    if period == 'day':
+        return day, day
+    if period == 'week':
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if period == 'month':
+        start = day.replace(day=1)
+        next_month = (start + timedelta(days=32)).replace(day=1)
+        return start, next_month - timedelta(days=1)
+    raise ValueError(f"Unknown payroll period: {period}")
+
+
+def is_closed(end, now=None):
+    """True once no clock-out can still change a period ending on `end`"""
+    now = now or datetime.now()
+    return end < (now - timedelta(hours=CASUAL_MAX_SHIFT_HOURS)).date()
+
+
+def shift_hours(clock_in, clock_out):
+    """
+    Hours between two times of day; a clock-out before the clock-in is the
+    next day. Counts seconds, like _shift_seconds_sql(), so per-shift hours
+    add up to the payroll totals.
+    """
+    if clock_in is None or clock_out is None:
+        return None
+    seconds = (datetime.combine(date.min, clock_out) - datetime.combine(date.min, clock_in)).total_seconds()
+    if seconds < 0:
+        seconds += 24 * 3600
+    return seconds / 3600.0
+
+
+def _shift_seconds_sql(dialect):
+    """SQL seconds worked by casual_attendance row `c` (closed shifts only)"""
+    if dialect == 'postgresql':
+        seconds = "EXTRACT(EPOCH FROM (c.clock_out - c.clock_in))"
+    else:
+        seconds = "(julianday(c.clock_out) - julianday(c.clock_in)) * 86400"
+    return f"CASE WHEN c.clock_out < c.clock_in THEN {seconds} + 86400 ELSE {seconds} END"
+
+
+_PAYROLL_SELECT = """
+    SELECT w.id AS worker_id,
+           w.name,
+           w.phone_number,
+           c.work_type,
+           COUNT(DISTINCT c.work_date) AS days,
+           COUNT(*) AS shifts,
+           SUM(CASE WHEN c.clock_out IS NULL THEN 1 ELSE 0 END) AS open_shifts,
+           SUM(CASE WHEN c.clock_out IS NULL THEN 0 ELSE {seconds} END) AS seconds
+    FROM casual_attendance c
+    JOIN casual_workers w ON w.id = c.worker_id
+    WHERE c.work_date BETWEEN :start AND :end
+    GROUP BY w.id, w.name, w.phone_number, c.work_type
+    ORDER BY w.name, w.id, c.work_type
+"""
+
+
+# =====================================================
+# AGGREGATION
+# =====================================================
+
+def compute_payroll(db, start, end):
+    """
+    Hours per worker and work type for work dates start..end (one query).
+
+    Returns:
+        dict: start, end, rows (worker_id, name, phone_number, work_type,
+              days, shifts, open_shifts, hours) and totals
+    """
+    sql = _PAYROLL_SELECT.format(seconds=_shift_seconds_sql(db.engine.dialect.name))
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        result = conn.execute(text(sql), {'start': start, 'end': end}).all()
+
+    # Totals come from the unrounded seconds, not from the rounded rows
+    seconds = sum(float(row.seconds or 0) for row in result)
+    rows = [{
+        'worker_id': row.worker_id,
+        'name': row.name,
+        'phone_number': row.phone_number,
+        'work_type': row.work_type,
+        'days': int(row.days),
+        'shifts': int(row.shifts),
+        'open_shifts': int(row.open_shifts),
+        'hours': round(float(row.seconds or 0) / 3600, 2),
+    } for row in result]
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'rows': rows,
+        'totals': {
+            'workers': len({r['worker_id'] for r in rows}),
+            'shifts': sum(r['shifts'] for r in rows),
+            'open_shifts': sum(r['open_shifts'] for r in rows),
+            'hours': round(seconds / 3600, 2),
+        },
+    }
+
+
+def casual_payroll(db, start, end):
+    """
+    compute_payroll(), served from the cache for closed periods.
+
+    Returns:
+        dict: as compute_payroll(), plus closed and cached flags
+    """
+    closed = is_closed(end)
+    key = report_cache_key('casual_payroll', {'start': start, 'end': end})
+    if closed:
+        cached = get_cached_reports(db, [key]).get(key)
+        if cached is not None:
+            return {**cached, 'closed': True, 'cached': True}
+
+    payroll = compute_payroll(db, start, end)
+    # Stale open shifts are still closed later, which changes the counts
+    if closed and not payroll['totals']['open_shifts']:
+        store_cached_reports(db, [(key, 'casual_payroll', start, end, payroll)])
+    return {**payroll, 'closed': closed, 'cached': False}
+
+
+def payroll_csv(payroll):
+    """CSV body: one line per worker and work type, then a total line"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['Worker', 'Phone Number', 'Work Type', 'Days', 'Shifts', 'Open Shifts', 'Hours'])
+    for row in payroll['rows']:
+        writer.writerow([row['name'], row['phone_number'], row['work_type'], row['days'],
+                         row['shifts'], row['open_shifts'], f"{row['hours']:.2f}"])
+    totals = payroll['totals']
+    writer.writerow(['TOTAL', '', '', '', totals['shifts'], totals['open_shifts'], f"{totals['hours']:.2f}"])
+    return output.getvalue()
+
+
+# =====================================================
+# ROUTES
+# =====================================================
+
+def _requested_range():
+    """(start, end) from ?start=&end= or ?period=&date= (default: this week)"""
+    if request.args.get('start') and request.args.get('end'):
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d').date()
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date()
+        if end < start:
+            raise ValueError('end is before start')
+        return start, end
+    period = request.args.get('period', 'week')
+    day = request.args.get('date')
+    day = datetime.strptime(day, '%Y-%m-%d').date() if day else date.today()
+    return period_bounds(period, day)
+
+
+def init_casual_payroll(app, db):
+    """Register the casual payroll routes on the Flask app"""
+    @app.route('/api/casual/payroll')
+    def casual_payroll_json():
+        """Casual hours per worker and work type for a payroll period"""
+        if not session.get('admin_logged_in'):
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+        try:
+            start, end = _requested_range()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': f'Invalid period: {e}'}), 400
+        try:
+            return jsonify({'success': True, **casual_payroll(db, start, end)})
+        except Exception as e:
+            logger.exception("❌ ERROR computing casual payroll: %s", e)
+            return jsonify({'success': False, 'error': f'Database error: {str(e)}'}), 500
+
+    @app.route('/api/casual/payroll.csv')
+    def casual_payroll_csv():
+        """The same totals as a CSV download"""
+        if not session.get('admin_logged_in'):
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+        try:
+            start, end = _requested_range()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': f'Invalid period: {e}'}), 400
+        try:
+            payroll = casual_payroll(db, start, end)
+        except Exception as e:
+            logger.exception("❌ ERROR exporting casual payroll: %s", e)
+            return jsonify({'success': False, 'error': f'Database error: {str(e)}'}), 500
+        return make_response(payroll_csv(payroll), 200, {
+            'Content-Type': 'text/csv',
+            'Content-Disposition': f'attachment; filename=casual_payroll_{start}_to_{end}.csv'
+        })
@@ -0,0 +1,265 @@
+"""
+Casual worker registry for the Attendance System
+Each casual worker is one `casual_workers` row keyed by a normalized phone
+number, and every `casual_attendance` shift points at it through
+worker_id instead of repeating the name and phone number. Shift rows stay
+narrow, per-worker history is an index range scan on (worker_id,
+work_date), and returning workers are found by phone prefix while they
+type (GET /api/casual/workers?phone=0712).
+
+Phone numbers are stored in the national format: "+254 712 345 678",
+"254712345678", "712345678" and "0712-345-678" are all 0712345678.
+
+Databases created before the registry are migrated by
+migrate_casual_history() when the schema is brought up to date
+(app.migrate_database(): the gunicorn master before forking workers,
+`python app.py`, or the deploy step below): one worker per normalized
+phone (the most recent name and work type win), worker_id backfilled on
+every shift, and the name / phone_number columns dropped from
+casual_attendance.
+
+Usage:
+    python casual_workers.py             # report whether the migration is pending
+    python casual_workers.py --migrate   # deploy step: migrate before starting the app
+"""
+
+import logging
+import os
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import Date, Time, bindparam, inspect, text
+
+logger = logging.getLogger(__name__)
+
+# Casual shifts open longer than this are not closed by a clock-out (a
+# forgotten clock-out yesterday morning must not become a 24-hour shift);
+# anything shorter may cross midnight
+CASUAL_MAX_SHIFT_HOURS = int(os.getenv('CASUAL_MAX_SHIFT_HOURS', '16'))
+
+# Matches returned by the as-you-type lookup
+CASUAL_LOOKUP_LIMIT = 10
+# Digits typed before the lookup starts searching
+CASUAL_LOOKUP_MIN_DIGITS = 3
+
+_NON_DIGITS = re.compile(r'\D')
+
+
+# =====================================================
+# PHONE NUMBERS
+# =====================================================
+
+def normalize_phone(raw, prefix=False):
+    """
+    Kenyan phone number in the national 0XXXXXXXXX format.
+
+    Args:
+        raw: phone number as typed (spaces, dashes, +254 allowed)
+        prefix: True for a partial number typed so far (a leading 7 or 1
+                is then always read as 07 / 01)
+
+    Returns:
+        str: digits only ('' when there are none)
+    """
+    digits = _NON_DIGITS.sub('', raw or '')
+    if digits.startswith('254') and len(digits) > 3:
+        return '0' + digits[3:]
+    if digits[:1] in ('7', '1') and (prefix or len(digits) == 9):
+        return '0' + digits
+    return digits
+
+
+def phone_prefix_bounds(prefix):
+    """
+    [low, high) range of phone numbers starting with `prefix`.
+
+    A range instead of LIKE 'prefix%' so both SQLite and PostgreSQL (any
+    collation) answer it from the unique phone_number index.
+    """
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def upsert_worker_stmt(workers, dialect, phone_number, name, work_type):
+    """
+    INSERT ... ON CONFLICT (phone_number) DO UPDATE ... RETURNING id.
+
+    The latest name and work type given for a phone number are kept.
+
+    Args:
+        workers: the casual_workers Table
+        dialect: 'postgresql' or 'sqlite'
+    """
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(workers).values(phone_number=phone_number, name=name,
+                                  default_work_type=work_type)
+    return stmt.on_conflict_do_update(
+        index_elements=[workers.c.phone_number],
+        set_={'name': stmt.excluded.name, 'default_work_type': stmt.excluded.default_work_type},
+    ).returning(workers.c.id)
+
+
+# =====================================================
+# MIGRATION
+# =====================================================
+
+def _shift_columns(conn):
+    return {c['name']: c for c in inspect(conn).get_columns('casual_attendance')}
+
+
+def needs_migration(db):
+    """True while casual_attendance still has the per-row name / phone columns
+    (or a nullable worker_id left by an earlier SQLite migration)"""
+    with db.engine.connect() as conn:
+        columns = _shift_columns(conn)
+    return 'phone_number' in columns or columns['worker_id']['nullable']
+
+
+def migrate_casual_history(db):
+    """
+    Move casual_attendance to the registry (idempotent; one transaction).
+
+    casual_workers must already exist (db.create_all()). Callers serialize
+    concurrent runs (app.migrate_database() holds an advisory lock); the
+    columns are re-read inside the transaction, so a run that waited for
+    another one finds nothing left to do.
+
+    Returns:
+        int: workers created (0 when there was nothing to migrate)
+    """
+    with db.engine.begin() as conn:
+        columns = _shift_columns(conn)
+        if 'phone_number' in columns:
+            created = _move_to_registry(conn)
+        elif columns['worker_id']['nullable']:
+            created = 0
+        else:
+            return 0
+        _require_worker_id(conn)
+    return created
+
+
+def _move_to_registry(conn):
+    """Create the workers and backfill worker_id; returns workers created"""
+    # Latest shift per raw phone string decides the worker's name / type
+    latest = conn.execute(text("""
+        SELECT c.phone_number, c.name, c.work_type, c.id
+        FROM casual_attendance c
+        JOIN (SELECT phone_number, MAX(id) AS id
+              FROM casual_attendance GROUP BY phone_number) l ON l.id = c.id
+    """)).all()
+
+    workers = {}
+    for raw, name, work_type, shift_id in latest:
+        phone = normalize_phone(raw) or raw.strip()
+        if phone not in workers or shift_id > workers[phone]['shift_id']:
+            workers[phone] = {'phone_number': phone, 'name': name,
+                              'default_work_type': work_type, 'shift_id': shift_id}
+
+    existing = dict(conn.execute(text("SELECT phone_number, id FROM casual_workers")).all())
+    new_workers = [w for phone, w in workers.items() if phone not in existing]
+    if new_workers:
+        conn.execute(text("""
+            INSERT INTO casual_workers (phone_number, name, default_work_type, created_at)
+            VALUES (:phone_number, :name, :default_work_type, CURRENT_TIMESTAMP)
+        """), new_workers)
+    ids = dict(conn.execute(text("SELECT phone_number, id FROM casual_workers")).all())
+
+    # Raw phone string -> worker id, then one set-based UPDATE
+    conn.execute(text("CREATE TEMPORARY TABLE casual_phone_map "
+                      "(raw VARCHAR(20) PRIMARY KEY, worker_id INTEGER NOT NULL)"))
+    conn.execute(text("INSERT INTO casual_phone_map (raw, worker_id) VALUES (:raw, :worker_id)"), [
+        {'raw': raw, 'worker_id': ids[normalize_phone(raw) or raw.strip()]}
+        for raw, _name, _type, _id in latest
+    ])
+    conn.execute(text("ALTER TABLE casual_attendance "
+                      "ADD COLUMN worker_id INTEGER REFERENCES casual_workers (id)"))
+    conn.execute(text("""
+        UPDATE casual_attendance SET worker_id = (
+            SELECT m.worker_id FROM casual_phone_map m
+            WHERE m.raw = casual_attendance.phone_number)
+    """))
+    conn.execute(text("DROP TABLE casual_phone_map"))
+
+    # The old open-shift index covers phone_number; it is recreated on
+    # worker_id by ensure_indexes()
+    conn.execute(text("DROP INDEX IF EXISTS ix_casual_attendance_open_shift"))
+    conn.execute(text("ALTER TABLE casual_attendance DROP COLUMN name"))
+    conn.execute(text("ALTER TABLE casual_attendance DROP COLUMN phone_number"))
+
+    logger.info("👷 Casual worker registry: %d workers from %d phone numbers",
+                len(new_workers), len(latest))
+    return len(new_workers)
+
+
+def _require_worker_id(conn):
+    """Make casual_attendance.worker_id NOT NULL, as in a fresh database"""
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text("ALTER TABLE casual_attendance ALTER COLUMN worker_id SET NOT NULL"))
+        return
+
+    # SQLite cannot change a column's constraints: rebuild the table in the
+    # model's shape (app.CasualAttendance); ensure_indexes() recreates its
+    # indexes
+    conn.execute(text("""
+        CREATE TABLE casual_attendance_new (
+            id INTEGER NOT NULL PRIMARY KEY,
+            worker_id INTEGER NOT NULL REFERENCES casual_workers (id),
+            work_type VARCHAR(50) NOT NULL,
+            clock_in TIME NOT NULL,
+            clock_out TIME,
+            work_date DATE NOT NULL,
+            created_at DATETIME
+        )
+    """))
+    conn.execute(text("""
+        INSERT INTO casual_attendance_new
+            (id, worker_id, work_type, clock_in, clock_out, work_date, created_at)
+        SELECT id, worker_id, work_type, clock_in, clock_out, work_date, created_at
+        FROM casual_attendance
+    """))
+    conn.execute(text("DROP TABLE casual_attendance"))
+    conn.execute(text("ALTER TABLE casual_attendance_new RENAME TO casual_attendance"))
+
+
+# =====================================================
+# STALE SHIFTS
+# =====================================================
+
+def close_stale_shifts(db, now=None):
+    """
+    Close shifts left open longer than CASUAL_MAX_SHIFT_HOURS.
+
+    No clock-out can reach them any more; they are closed at their own
+    clock-in time, so they count as zero-hour shifts instead of staying
+    open_shifts forever (and keep the open-shift index small).
+
+    Returns:
+        int: shifts closed
+    """
+    now = now or datetime.now()
+    cutoff = now - timedelta(hours=CASUAL_MAX_SHIFT_HOURS)
+    with db.engine.begin() as conn:
+        result = conn.execute(text("""
+            UPDATE casual_attendance SET clock_out = clock_in
+            WHERE clock_out IS NULL
+              AND (work_date < :cutoff_date
+                   OR (work_date = :cutoff_date AND clock_in < :cutoff_time))
+        """).bindparams(bindparam('cutoff_date', type_=Date), bindparam('cutoff_time', type_=Time)),
+            {'cutoff_date': cutoff.date(), 'cutoff_time': cutoff.time().replace(microsecond=0)})
+    if result.rowcount:
+        logger.info("👷 Closed %d stale casual shift(s) opened before %s", result.rowcount,
+                    cutoff.strftime('%Y-%m-%d %H:%M'))
+    return result.rowcount
+
+
+if __name__ == '__main__':
+    import sys
+    from app import app, db, migrate_database
+
+    if '--migrate' in sys.argv:
+        migrate_database()
+    with app.app_context():
+        print("Pending" if needs_migration(db) else "Already migrated")
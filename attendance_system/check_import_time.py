@@ -0,0 +1,163 @@
+"""
+Import-Time and Cold-Start Check for the Attendance System
+-----------------------------------------------------------
+Measures, in fresh interpreters:
+
+1. `import app` under `python -X importtime`, and writes a digest of the
+   slowest modules (cumulative and self time) to the report file
+2. scale-from-zero: import + create_app() + the first GET /health
+
+Exits with status 1 if either exceeds its budget, so it can run in CI or
+before a deploy.
+
+Usage:
+    python check_import_time.py
+    python check_import_time.py --output import_time_report.txt --top 25
+
+Budgets (milliseconds, best of --runs):
+    IMPORT_TIME_BUDGET_MS   default 500
+    COLD_START_BUDGET_MS    default 800
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_TIME_BUDGET_MS = float(os.getenv('IMPORT_TIME_BUDGET_MS', '500'))
+COLD_START_BUDGET_MS = float(os.getenv('COLD_START_BUDGET_MS', '800'))
+
+# Modules that must not be imported by `import app` (loaded on first use)
+DEFERRED_MODULES = ('smtplib', 'pytz', 'fpdf', 'pdfkit', 'supabase', 'flask_cors')
+
+_COLD_START_SNIPPET = r"""
+import time
+started = time.perf_counter()
+import app as module
+flask_app = module.get_app()
+response = flask_app.test_client().get('/health')
+elapsed = (time.perf_counter() - started) * 1000
+print(f"\nCOLD_START {elapsed:.1f} {response.status_code}", flush=True)
+"""
+
+
+def _run(args):
+    # Measure start-up, not side work: no background refresher or job scheduler
+    env = dict(os.environ)
+    env.setdefault('REPORT_REFRESH_SECONDS', '0')
+    env.setdefault('SCHEDULER_ENABLED', '0')
+    return subprocess.run([sys.executable] + args, cwd=HERE, capture_output=True, text=True, env=env)
+
+
+def parse_importtime(stderr):
+    """
+    Parse `-X importtime` output.
+
+    Returns:
+        list of (module, self_us, cumulative_us, depth)
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue
+        # One leading space, then two per nesting level
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        rows.append((name.strip(), self_us, cumulative_us, depth))
+    return rows
+
+
+def measure_import():
+    """One `import app` run: (total ms, parsed rows)"""
+    result = _run(['-X', 'importtime', '-c', 'import app'])
+    if result.returncode != 0:
+        raise RuntimeError(f"import app failed:\n{result.stderr[-2000:]}")
+    rows = app_subtree(parse_importtime(result.stderr))
+    return rows[-1][2] / 1000, rows
+
+
+def app_subtree(rows):
+    """Rows imported on behalf of `app` (interpreter start-up modules dropped)"""
+    end = max(i for i, row in enumerate(rows) if row[0] == 'app' and row[3] == 0)
+    start = end
+    # Children are listed before their parent; walk back to the previous top-level import
+    while start > 0 and rows[start - 1][3] > 0:
+        start -= 1
+    return rows[start:end + 1]
+
+
+def measure_cold_start():
+    """One import + create_app() + GET /health run: (ms, status code)"""
+    result = _run(['-c', _COLD_START_SNIPPET])
+    if result.returncode != 0:
+        raise RuntimeError(f"cold start failed:\n{result.stderr[-2000:]}")
+    # Log lines from the queued handler may surround the result line
+    line = next(line for line in result.stdout.splitlines() if line.startswith('COLD_START '))
+    _marker, elapsed, status = line.split()
+    return float(elapsed), int(status)
+
+
+def format_report(import_ms, rows, cold_ms, cold_status, top):
+    lines = [
+        'ATTENDANCE SYSTEM - IMPORT TIME REPORT',
+        '=' * 60,
+        f"import app:            {import_ms:8.1f} ms  (budget {IMPORT_TIME_BUDGET_MS:.0f} ms)",
+        f"cold start to /health: {cold_ms:8.1f} ms  (budget {COLD_START_BUDGET_MS:.0f} ms, HTTP {cold_status})",
+        '',
+        f"Top {top} top-level imports by cumulative time:",
+    ]
+    top_level = sorted((r for r in rows if r[3] == 1), key=lambda r: r[2], reverse=True)[:top]
+    for name, _self_us, cumulative_us, _depth in top_level:
+        lines.append(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    lines += ['', f"Top {top} modules by self time:"]
+    for name, self_us, _cumulative_us, _depth in sorted(rows, key=lambda r: r[1], reverse=True)[:top]:
+        lines.append(f"  {self_us / 1000:8.1f} ms  {name}")
+
+    imported = {name for name, _, _, _ in rows}
+    eager = [m for m in DEFERRED_MODULES if m in imported]
+    lines += ['', f"Deferred modules imported eagerly: {', '.join(eager) if eager else 'none'}"]
+    return '\n'.join(lines) + '\n', eager
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check import time and cold start against budgets')
+    parser.add_argument('--output', default='import_time_report.txt', help='report file to write')
+    parser.add_argument('--runs', type=int, default=3, help='runs per measurement (best is kept)')
+    parser.add_argument('--top', type=int, default=20, help='modules listed per section')
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    import_ms, rows = min(imports, key=lambda r: r[0])
+    cold_starts = [measure_cold_start() for _ in range(args.runs)]
+    cold_ms, cold_status = min(cold_starts, key=lambda r: r[0])
+
+    report, eager = format_report(import_ms, rows, cold_ms, cold_status, args.top)
+    with open(args.output, 'w') as f:
+        f.write(report)
+    print(report)
+    print(f"📄 Report written to {args.output}")
+
+    failures = []
+    if import_ms > IMPORT_TIME_BUDGET_MS:
+        failures.append(f"import app took {import_ms:.0f} ms (budget {IMPORT_TIME_BUDGET_MS:.0f} ms)")
+    if cold_ms > COLD_START_BUDGET_MS:
+        failures.append(f"cold start took {cold_ms:.0f} ms (budget {COLD_START_BUDGET_MS:.0f} ms)")
+    if eager:
+        failures.append(f"imported at startup: {', '.join(eager)}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ Within budget")
+
+
+if __name__ == '__main__':
+    main()
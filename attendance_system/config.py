@@ -44,13 +44,18 @@ else:
     # SQLite configuration (for local development)
     SQLALCHEMY_DATABASE_URI = 'sqlite:///attendance_system.db'
 
-SQLALCHEMY_ENGINE_OPTIONS = {
-    'pool_size': 10,
-    'max_overflow': 20,
-    'pool_pre_ping': True,
-    'pool_recycle': 3600,
-    'connect_args': {'timeout': 30} if DB_TYPE != 'postgresql' else {}
-}
+if DB_TYPE == 'postgresql':
+    # Direct connection or external pooler (Supabase port 6543) - see db_pool.py
+    from db_pool import build_engine_options
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(SQLALCHEMY_DATABASE_URI)
+else:
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_pre_ping': True,
+        'pool_recycle': 3600,
+        'connect_args': {'timeout': 30}
+    }
 
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 
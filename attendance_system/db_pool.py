@@ -0,0 +1,366 @@
+"""
+Database connection profiles for the Attendance System
+Builds SQLAlchemy engine options for direct connections and for external
+poolers (Supabase Supavisor / PgBouncer in transaction mode on port 6543),
+plus pool warm-up and pool statistics.
+
+Profiles (DB_POOL_PROFILE):
+    direct  - client-side QueuePool with pre-ping and recycling (old behaviour)
+    pooler  - the external pooler owns the server connections; NullPool by
+              default, or a small QueuePool without pre-ping if
+              DB_POOLER_POOL_SIZE > 0
+    auto    - 'pooler' when the URL points at port 6543 or a *.pooler.* host,
+              otherwise 'direct' (default)
+"""
+
+import logging
+import os
+import threading
+import time as _time
+from urllib.parse import urlparse
+
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+# =====================================================
+# CONFIGURATION
+# =====================================================
+
+DB_POOL_PROFILE = os.getenv('DB_POOL_PROFILE', 'auto').lower()
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOLER_POOL_SIZE = int(os.getenv('DB_POOLER_POOL_SIZE', '0'))  # 0 = NullPool
+DB_POOL_WARMUP = int(os.getenv('DB_POOL_WARMUP', '0'))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '15000'))
+DB_APPLICATION_NAME = os.getenv('DB_APPLICATION_NAME', 'attendance_system')
+DB_SSLMODE = os.getenv('DB_SSLMODE', 'require')
+
+POOLER_PORT = 6543
+
+
+# =====================================================
+# POOL CLASSES WITH WAIT-TIME ACCOUNTING
+# =====================================================
+
+class _PoolTimer:
+    """Accumulates how long callers waited to get a connection from a pool"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+
+    def record(self, seconds):
+        with self.lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.last_wait = seconds
+            if seconds > self.max_wait:
+                self.max_wait = seconds
+
+    def snapshot(self):
+        with self.lock:
+            avg = self.total_wait / self.checkouts if self.checkouts else 0.0
+            return {
+                'checkouts': self.checkouts,
+                'wait_ms_total': round(self.total_wait * 1000, 2),
+                'wait_ms_avg': round(avg * 1000, 2),
+                'wait_ms_max': round(self.max_wait * 1000, 2),
+                'wait_ms_last': round(self.last_wait * 1000, 2),
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records the time spent waiting for a free connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timer = _PoolTimer()
+
+    def _do_get(self):
+        started = _time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.timer.record(_time.perf_counter() - started)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.timer = self.timer
+        return pool
+
+
+class TimedNullPool(NullPool):
+    """NullPool that records connect time (each checkout opens a connection)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timer = _PoolTimer()
+
+    def _do_get(self):
+        started = _time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.timer.record(_time.perf_counter() - started)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.timer = self.timer
+        return pool
+
+
+# =====================================================
+# PROFILE SELECTION
+# =====================================================
+
+def is_pooler_url(database_url):
+    """True if the URL points at a transaction-mode pooler"""
+    try:
+        parsed = urlparse(database_url)
+    except ValueError:
+        return False
+    host = parsed.hostname or ''
+    return parsed.port == POOLER_PORT or '.pooler.' in host
+
+
+def resolve_profile(database_url, profile=None):
+    """Return 'direct', 'pooler' or 'sqlite' for the given URL"""
+    if not database_url or not database_url.startswith('postgres'):
+        return 'sqlite'
+    profile = (profile or DB_POOL_PROFILE).lower()
+    if profile in ('direct', 'pooler'):
+        return profile
+    return 'pooler' if is_pooler_url(database_url) else 'direct'
+
+
+def _postgres_connect_args(database_url):
+    """libpq settings applied to every new connection (no extra round trips)"""
+    connect_args = {
+        'sslmode': DB_SSLMODE,
+        'connect_timeout': 30,
+        'keepalives': 1,
+        'keepalives_idle': 30,
+        'application_name': DB_APPLICATION_NAME,
+    }
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        # Sent in the startup packet, so it costs nothing per query
+        connect_args['options'] = f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'
+    if database_url.startswith('postgresql+psycopg://'):
+        # psycopg 3 prepares repeated statements server-side, which breaks
+        # under transaction pooling; psycopg2 never prepares.
+        connect_args['prepare_threshold'] = None
+    return connect_args
+
+
+def build_engine_options(database_url, profile=None):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS for the selected connection profile.
+
+    Args:
+        database_url: SQLAlchemy database URL
+        profile: 'direct', 'pooler' or 'auto' (defaults to DB_POOL_PROFILE)
+
+    Returns:
+        dict: engine options for Flask-SQLAlchemy
+    """
+    resolved = resolve_profile(database_url, profile)
+
+    if resolved == 'sqlite':
+        return {}
+
+    connect_args = _postgres_connect_args(database_url)
+
+    if resolved == 'pooler':
+        if DB_POOLER_POOL_SIZE > 0:
+            # Small client pool: the pooler already multiplexes server slots,
+            # so no pre-ping and no recycling round trips.
+            return {
+                'poolclass': TimedQueuePool,
+                'pool_size': DB_POOLER_POOL_SIZE,
+                'max_overflow': 0,
+                'pool_pre_ping': False,
+                'pool_reset_on_return': 'rollback',
+                'connect_args': connect_args,
+            }
+        return {
+            'poolclass': TimedNullPool,
+            'connect_args': connect_args,
+        }
+
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_pre_ping': True,
+        'pool_recycle': 300,
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'connect_args': connect_args,
+    }
+
+
+# =====================================================
+# ASYNC ENGINE (asgi.py)
+# =====================================================
+
+def async_database_url(database_url):
+    """Same database through an async driver (asyncpg / aiosqlite)"""
+    if database_url.startswith('sqlite'):
+        return database_url.replace('sqlite://', 'sqlite+aiosqlite://', 1)
+    scheme, rest = database_url.split('://', 1)
+    return f"postgresql+asyncpg://{rest}"
+
+
+def build_async_engine_options(database_url, profile=None):
+    """
+    create_async_engine() options matching build_engine_options().
+
+    asyncpg has its own connect arguments: libpq settings move to
+    server_settings, and under a transaction-mode pooler prepared statements
+    are disabled and given unique names (a server connection may serve
+    another client between two statements).
+    """
+    resolved = resolve_profile(database_url, profile)
+    if resolved == 'sqlite':
+        return {}
+
+    server_settings = {'application_name': DB_APPLICATION_NAME}
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        server_settings['statement_timeout'] = str(DB_STATEMENT_TIMEOUT_MS)
+    connect_args = {
+        'ssl': DB_SSLMODE,
+        'timeout': 30,
+        'server_settings': server_settings,
+    }
+
+    if resolved == 'pooler':
+        from uuid import uuid4
+        connect_args.update({
+            'statement_cache_size': 0,
+            'prepared_statement_cache_size': 0,
+            'prepared_statement_name_func': lambda: f"__asyncpg_{uuid4()}__",
+        })
+        # Always a small bounded pool: hundreds of concurrent polls share a
+        # few connections instead of each opening one (NullPool would)
+        return {
+            'pool_size': DB_POOLER_POOL_SIZE or 10,
+            'max_overflow': 0,
+            'pool_pre_ping': False,
+            'connect_args': connect_args,
+        }
+
+    return {
+        'pool_pre_ping': True,
+        'pool_recycle': 300,
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'connect_args': connect_args,
+    }
+
+
+# =====================================================
+# WARM-UP AND STATS
+# =====================================================
+
+def warm_pool(engine, connections=None):
+    """
+    Open pool connections ahead of the first request.
+
+    With a QueuePool this fills up to `connections` slots so the first
+    requests after a deploy don't pay the TLS + auth handshake. With a
+    NullPool a single connection is opened to validate DNS and credentials.
+
+    Returns:
+        int: number of connections opened
+    """
+    connections = DB_POOL_WARMUP if connections is None else connections
+    if connections <= 0:
+        return 0
+
+    if isinstance(engine.pool, NullPool):
+        connections = 1
+    elif hasattr(engine.pool, 'size'):
+        connections = min(connections, engine.pool.size())
+
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.raw_connection())
+    finally:
+        for conn in opened:
+            conn.close()  # returns it to the pool
+    return len(opened)
+
+
+def warm_pool_in_background(app, db, connections=None):
+    """Run warm_pool() on a daemon thread so startup is never blocked"""
+    def _run():
+        try:
+            with app.app_context():
+                count = warm_pool(db.engine, connections)
+            if count:
+                logger.info("🔥 Warmed %d database connection(s)", count)
+        except Exception as e:
+            logger.warning("⚠️ Pool warm-up skipped: %s", e)
+
+    thread = threading.Thread(target=_run, name='db-pool-warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def pool_stats(engine):
+    """
+    Current pool statistics.
+
+    Returns:
+        dict: pool class, size, checked-out/idle/overflow counts and
+              wait-time totals for checkouts
+    """
+    pool = engine.pool
+    stats = {
+        'pool_class': type(pool).__name__,
+        'size': None,
+        'checked_out': None,
+        'checked_in': None,
+        'overflow': None,
+    }
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': max(0, pool.overflow()),
+        })
+    elif isinstance(pool, NullPool):
+        stats['checked_out'] = _null_pool_checked_out(engine)
+    timer = getattr(pool, 'timer', None)
+    if timer is not None:
+        stats.update(timer.snapshot())
+    return stats
+
+
+def _null_pool_checked_out(engine):
+    counter = getattr(engine, '_attendance_checked_out', None)
+    return counter[0] if counter else 0
+
+
+def track_checkouts(engine):
+    """Count live connections for pools that don't track them (NullPool)"""
+    if getattr(engine, '_attendance_checked_out', None) is not None:
+        return
+    counter = [0]
+    lock = threading.Lock()
+    engine._attendance_checked_out = counter
+
+    @event.listens_for(engine, 'checkout')
+    def _on_checkout(dbapi_conn, conn_record, conn_proxy):
+        with lock:
+            counter[0] += 1
+
+    @event.listens_for(engine, 'checkin')
+    def _on_checkin(dbapi_conn, conn_record):
+        with lock:
+            counter[0] = max(0, counter[0] - 1)
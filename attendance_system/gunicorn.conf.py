@@ -0,0 +1,187 @@
+"""
+Gunicorn production profile for the Attendance System
+
+    gunicorn -c gunicorn.conf.py app:app
+
+- The app is preloaded once in the master (fast worker boots, shared
+  memory pages). Each worker disposes the inherited engine in post_fork so
+  no database connection is ever shared across processes, then warms its
+  own pool.
+- Worker mode (GUNICORN_WORKER_CLASS):
+    gthread - default. Flask-SQLAlchemy scopes sessions to the app context,
+              so every request thread gets its own session.
+    gevent  - cooperative. Requires requirements-gevent.txt; the standard
+              library and psycopg2 are patched here, before the app is
+              imported, so DB waits yield to other requests.
+    sync    - the old behaviour (one request per worker).
+- Threads/greenlets per worker are derived from the connection profile in
+  db_pool.py so requests never queue on a pool that is smaller than the
+  worker's concurrency.
+- The master brings the schema up to date (app.migrate_database()) once,
+  before any worker is forked, so workers never serve a half-migrated
+  database.
+
+Environment:
+    WEB_CONCURRENCY               workers (default 2)
+    GUNICORN_WORKER_CLASS         gthread | gevent | sync (default gthread)
+    GUNICORN_THREADS              override the derived thread count
+    GUNICORN_WORKER_CONNECTIONS   gevent greenlets per worker (default 100)
+    GUNICORN_TIMEOUT              hard request timeout in seconds (default 30)
+    PORT                          bind port (default 5000)
+    PROMETHEUS_MULTIPROC_DIR      per-worker metric files (default <tmp>/attendance-prometheus)
+    REPORT_CACHE_WARM             1 = compute closed-period reports on a background
+                                  thread of the first worker when the scheduler is
+                                  disabled (default 1, see historical_reports.py)
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+
+WORKER_CLASS = os.getenv('GUNICORN_WORKER_CLASS', 'gthread').lower()
+
+if WORKER_CLASS == 'gevent':
+    # Must happen before the app (and ssl/socket/threading) is preloaded
+    try:
+        from gevent import monkey
+        from psycogreen.gevent import patch_psycopg
+    except ImportError as e:
+        raise SystemExit(f"gevent workers need gevent and psycogreen ({e.name} is missing): "
+                         "pip install -r requirements-gevent.txt")
+    monkey.patch_all()
+    patch_psycopg()
+    # Greenlets share a bounded client pool instead of opening one
+    # connection each (pooler profile defaults to NullPool)
+    os.environ.setdefault('DB_POOLER_POOL_SIZE', '10')
+
+# Tell create_app() that warm-up happens per worker in post_fork
+os.environ['ATTENDANCE_PRELOADED'] = '1'
+
+# Prometheus multiprocess mode: every worker writes its samples here and
+# /metrics sums them. Set before the app (and prometheus_client) is
+# preloaded, and emptied on each start so old worker files don't linger.
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'attendance-prometheus'))
+shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+from db_pool import DB_MAX_OVERFLOW, DB_POOL_SIZE, DB_POOLER_POOL_SIZE, resolve_profile  # noqa: E402
+
+_DATABASE_URL = (os.environ.get('DATABASE_URL') or os.environ.get('POSTGRES_URL')
+                 or 'sqlite:///attendance.db').replace('postgres://', 'postgresql://', 1)
+PROFILE = resolve_profile(_DATABASE_URL)
+
+
+def derived_threads(profile=PROFILE):
+    """
+    Request threads per worker that match the connection pool:
+
+    direct  - pool_size + max_overflow (every thread can hold a connection)
+    pooler  - DB_POOLER_POOL_SIZE when a client pool is used, otherwise 8
+              (NullPool opens one pooler connection per busy thread)
+    sqlite  - 4 (local development)
+    """
+    if profile == 'direct':
+        return DB_POOL_SIZE + DB_MAX_OVERFLOW
+    if profile == 'pooler':
+        return DB_POOLER_POOL_SIZE or 8
+    return 4
+
+
+# =====================================================
+# SERVER SETTINGS
+# =====================================================
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+worker_class = WORKER_CLASS
+threads = int(os.getenv('GUNICORN_THREADS', '0')) or derived_threads()
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '100'))
+preload_app = True
+
+# Hung requests are killed instead of hidden behind a 120 s timeout; slow
+# work (SMTP, exports) no longer blocks a whole worker in gthread/gevent mode
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = 20
+keepalive = 5
+
+# Recycle workers now and then so slow leaks can't accumulate
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = 200
+
+accesslog = '-'
+errorlog = '-'
+
+
+# =====================================================
+# HOOKS
+# =====================================================
+
+def when_ready(server):
+    if worker_class == 'gevent':
+        concurrency = f"{worker_connections} greenlets"
+    elif worker_class == 'gthread':
+        concurrency = f"{threads} threads"
+    else:
+        concurrency = "1 request"
+    server.log.info(f"📐 {workers} {worker_class} worker(s) x {concurrency}, "
+                    f"connection profile: {PROFILE}")
+    migrate_schema(server)
+
+
+def migrate_schema(server):
+    """Create missing tables and run pending migrations before forking workers"""
+    from app import get_app, db, migrate_database
+
+    try:
+        migrate_database()
+        server.log.info("✅ Database schema up to date")
+    except Exception as e:
+        server.log.error(f"❌ Schema migration failed: {e}")
+    finally:
+        # Workers must not inherit the master's connections
+        with get_app().app_context():
+            db.engine.dispose()
+
+
+def warm_report_cache(server, flask_app):
+    """Fill the shared report cache (background thread of the first worker)"""
+    from app import db
+    from historical_reports import warm_report_cache as warm
+
+    try:
+        with flask_app.app_context():
+            warmed = warm(db)
+        server.log.info(f"🗄️ Report cache warm: {warmed['fiscal_years']} closed fiscal year(s), "
+                        f"{warmed['months']} closed month(s)")
+    except Exception as e:
+        server.log.warning(f"⚠️ Report cache warm-up failed: {e}")
+
+
+def post_fork(server, worker):
+    """Give each worker its own connections (never reuse the master's)"""
+    from app import get_app, db
+    from db_pool import DB_POOL_WARMUP, warm_pool_in_background
+    from scheduler import SCHEDULER_ENABLED
+
+    flask_app = get_app()
+    with flask_app.app_context():
+        # close=False: leave the parent's sockets alone, just forget them
+        db.engine.dispose(close=False)
+    if DB_POOL_WARMUP > 0:
+        warm_pool_in_background(flask_app, db)
+    # Once per start, off the boot path; the scheduler's warm_report_cache
+    # job does it when the scheduler is enabled
+    if worker.age == 1 and not SCHEDULER_ENABLED and os.getenv('REPORT_CACHE_WARM', '1') == '1':
+        threading.Thread(target=warm_report_cache, args=(server, flask_app),
+                         name='report-cache-warm', daemon=True).start()
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live-gauge samples from /metrics"""
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
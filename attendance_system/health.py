@@ -0,0 +1,177 @@
+"""
+Liveness and readiness checks for the Attendance System
+
+    GET /livez   - the process is up and serving; never touches the database
+    GET /readyz  - the database answers; 503 otherwise. Also reports pool
+                   utilization, the last successful probe latency and, while
+                   the database answers, any background work backlog
+    GET /health  - kept for Render and the uptime monitor (same as /readyz,
+                   plus staff_count)
+
+Render and the uptime monitor poll constantly, so the database probe is
+cached for HEALTH_CACHE_SECONDS per process and shared: concurrent callers
+wait for the one probe in flight instead of each taking a pool connection.
+
+Environment:
+    HEALTH_CACHE_SECONDS   how long a probe result is reused (default 5)
+"""
+
+import os
+import threading
+import time as _time
+from datetime import datetime
+
+from flask import jsonify
+from sqlalchemy import text
+
+HEALTH_CACHE_SECONDS = float(os.getenv('HEALTH_CACHE_SECONDS', '5'))
+
+# One statement: proves the connection and that the schema is there
+_PROBE_SQL = text('SELECT COUNT(*) FROM staff')
+
+
+class DatabaseProbe:
+    """Cached, single-flight database probe (one per process)"""
+
+    def __init__(self, ttl=None):
+        self.ttl = HEALTH_CACHE_SECONDS if ttl is None else ttl
+        # Also single-flights the /readyz backlog (init_health)
+        self.lock = threading.Lock()
+        self._result = None
+        self._checked_at = 0.0
+        self._last_success = None
+
+    def check(self, engine):
+        """
+        Latest probe result, running a new probe only when the cached one
+        is older than the TTL.
+
+        Returns:
+            dict: ok, staff_count, latency_ms, error, checked_at,
+                  last_success_at, last_success_latency_ms
+        """
+        if self._fresh():
+            return self._result
+        with self.lock:
+            # Another caller may have probed while we waited for the lock
+            if not self._fresh():
+                self._result = self._probe(engine)
+                self._checked_at = _time.monotonic()
+            return self._result
+
+    def _fresh(self):
+        return self._result is not None and _time.monotonic() - self._checked_at < self.ttl
+
+    def _probe(self, engine):
+        started = _time.perf_counter()
+        checked_at = datetime.utcnow().isoformat()
+        try:
+            with engine.connect() as conn:
+                staff_count = conn.execute(_PROBE_SQL).scalar()
+        except Exception as e:
+            result = {'ok': False, 'staff_count': None, 'latency_ms': None, 'error': str(e)}
+        else:
+            latency_ms = round((_time.perf_counter() - started) * 1000, 2)
+            self._last_success = (checked_at, latency_ms)
+            result = {'ok': True, 'staff_count': staff_count, 'latency_ms': latency_ms, 'error': None}
+
+        last_at, last_latency = self._last_success or (None, None)
+        result.update({
+            'checked_at': checked_at,
+            'last_success_at': last_at,
+            'last_success_latency_ms': last_latency,
+        })
+        return result
+
+
+def pool_utilization(engine):
+    """
+    Pool statistics plus utilization (checked out / capacity) where the
+    pool has a fixed capacity.
+
+    Returns:
+        dict: pool_stats() fields and 'utilization' (0..1 or None)
+    """
+    from db_pool import pool_stats
+
+    stats = pool_stats(engine)
+    capacity = None
+    if stats['size'] is not None:
+        capacity = stats['size'] + max(0, getattr(engine.pool, '_max_overflow', 0))
+    stats['utilization'] = round(stats['checked_out'] / capacity, 3) if capacity else None
+    return stats
+
+
+def init_health(app, db, backlog=None):
+    """
+    Register /livez, /readyz and /health on the Flask app.
+
+    Args:
+        app: Flask application
+        db: Flask-SQLAlchemy instance
+        backlog: optional callable returning a dict of pending background
+                 work (reported by /readyz while the database answers,
+                 cached for HEALTH_CACHE_SECONDS, never blocks readiness)
+    """
+    probe = DatabaseProbe()
+    started_at = _time.monotonic()
+    # The backlog may query the database too (outbox), so it is cached and
+    # single-flight like the probe
+    cached_backlog = {'value': None, 'at': 0.0}
+
+    def backlog_fresh():
+        return cached_backlog['value'] is not None and _time.monotonic() - cached_backlog['at'] < probe.ttl
+
+    def backlog_snapshot():
+        if backlog_fresh():
+            return cached_backlog['value']
+        with probe.lock:
+            if not backlog_fresh():
+                try:
+                    value = backlog()
+                except Exception as e:
+                    value = {'error': str(e)}
+                cached_backlog.update(value=value, at=_time.monotonic())
+            return cached_backlog['value']
+
+    def readiness():
+        result = probe.check(db.engine)
+        body = {
+            'status': 'ready' if result['ok'] else 'unready',
+            'database': {k: v for k, v in result.items() if k != 'ok'},
+            'pool': pool_utilization(db.engine),
+            'timestamp': datetime.utcnow().isoformat(),
+        }
+        if backlog is not None and result['ok']:
+            body['backlog'] = backlog_snapshot()
+        return body, 200 if result['ok'] else 503
+
+    @app.route('/livez')
+    def livez():
+        """Liveness: no database access"""
+        return jsonify({
+            'status': 'alive',
+            'uptime_seconds': round(_time.monotonic() - started_at, 1),
+            'timestamp': datetime.utcnow().isoformat(),
+        }), 200
+
+    @app.route('/readyz')
+    def readyz():
+        """Readiness: cached database probe, pool and backlog"""
+        body, status = readiness()
+        return jsonify(body), status
+
+    @app.route('/health')
+    def health_check():
+        """Health check endpoint for Render (cached probe, see /readyz)"""
+        body, status = readiness()
+        database = body['database']
+        return jsonify({
+            'status': 'healthy' if status == 200 else 'unhealthy',
+            'database': 'connected' if status == 200 else 'error',
+            'staff_count': database['staff_count'],
+            'error': database['error'],
+            'timestamp': body['timestamp'],
+        }), status
+
+    return probe
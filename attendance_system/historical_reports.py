@@ -0,0 +1,280 @@
+"""
+Report payloads for closed periods of the Attendance System
+Closed fiscal years and months cannot change any more (except through
+explicit edits to historical data), so their report figures are computed
+once and then served from the report_cache table (see reporting.py),
+shared by every gunicorn worker and kept across restarts:
+
+- fiscal_year_reports()    leave taken per type and days worked per
+                           employee (admin reports, annual report, leave
+                           summary CSV)
+- fiscal_year_summaries()  /api/reports/fiscal-year-summary rows
+- monthly_summaries()      /api/reports/monthly-attendance-summary rows
+
+Payloads are keyed by report, period, payload version and reporting view
+version. They hold per-employee figures only; names and balances are
+always read live. Entries are dropped by invalidate_cached_reports() when
+historical data is edited (add-historical-leave, back-dated approvals via
+the facts refresh) and all of them when the facts are rebuilt.
+
+warm_report_cache() computes every closed period up front, in the
+background: the scheduler's warm_report_cache job, the first gunicorn
+worker when the scheduler is disabled, or this script as a deploy step.
+Historical reports then rarely hit the raw tables on a request.
+
+Usage:
+    python historical_reports.py           # pre-warm the cache
+    python historical_reports.py --clear   # drop every cached payload
+"""
+
+import argparse
+import logging
+import sys
+import time as _time
+from datetime import date, timedelta
+
+from sqlalchemy import bindparam, select, text
+
+from archive import fiscal_year_bounds, fiscal_year_of, fiscal_year_sql
+from attendance_facts import first_attendance_date, query_facts, working_days
+from reporting import (clear_report_cache, get_cached_reports, period_closed, query_reporting,
+                       report_cache_key, report_fiscal_year_summary, report_monthly_attendance,
+                       store_cached_reports)
+
+logger = logging.getLogger(__name__)
+
+# Bump when a payload layout changes so old entries are ignored
+_PAYLOAD_VERSION = 1
+
+# First fiscal year offered by the report pages
+FIRST_REPORT_FISCAL_YEAR = 2021
+
+
+def next_month(month_start):
+    return (month_start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def cached_periods(db, report, periods, compute, today=None):
+    """
+    Report payload per period; closed periods come from report_cache.
+
+    Args:
+        report: report name (part of the cache key)
+        periods: {period: (first day, last day)}
+        compute: function(list of periods) -> {period: payload}, one query for all
+        today: reference date for deciding which periods are closed
+
+    Returns:
+        dict: period -> payload (JSON-compatible)
+    """
+    keys = {p: report_cache_key(report, {'period': p, 'v': _PAYLOAD_VERSION}) for p in periods}
+    closed = [p for p, (_start, end) in periods.items() if period_closed(end, today)]
+    cached = get_cached_reports(db, [keys[p] for p in closed])
+    result = {p: cached[keys[p]] for p in closed if keys[p] in cached}
+    missing = [p for p in periods if p not in result]
+    if missing:
+        fresh = compute(missing)
+        for p in missing:
+            result[p] = fresh.get(p, [])
+        store_cached_reports(db, [(keys[p], report, *periods[p], result[p])
+                                  for p in missing if p in closed])
+    return result
+
+
+# =====================================================
+# FISCAL-YEAR LEAVE / DAYS WORKED
+# =====================================================
+# A leave counts in its recorded fiscal_year, or the fiscal year of its
+# start date when none was recorded (entries made in the app).
+
+_LEAVE_SELECT = """
+    SELECT fiscal_year, staff_id,
+           SUM(CASE WHEN leave_type IN ('Annual', 'Annual Leave') THEN days ELSE 0 END) AS annual,
+           SUM(CASE WHEN leave_type IN ('Sick', 'Sick Leave') THEN days ELSE 0 END) AS sick,
+           SUM(days) AS total
+    FROM (
+        SELECT COALESCE(fiscal_year, {start_fy}) AS fiscal_year, staff_id, leave_type,
+               COALESCE(total_days, 0) AS days
+        FROM leave_requests
+        WHERE status = 'Approved'
+    ) l
+    WHERE fiscal_year IN :years
+    GROUP BY fiscal_year, staff_id
+"""
+
+_DAYS_WORKED_SELECT = """
+    SELECT fiscal_year, staff_id,
+           SUM(CASE WHEN status IN ('present', 'late') THEN weight ELSE 0 END) AS days_worked
+    FROM attendance_daily
+    WHERE fiscal_year IN ({years})
+    GROUP BY fiscal_year, staff_id
+"""
+
+
+def _compute_fiscal_year_reports(db, years):
+    dialect = db.engine.dialect.name
+    stmt = text(_LEAVE_SELECT.format(start_fy=fiscal_year_sql('start_date', dialect))).bindparams(
+        bindparam('years', expanding=True))
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        leave_rows = conn.execute(stmt, {'years': list(years)}).all()
+    worked_rows = query_facts(db, _DAYS_WORKED_SELECT.format(years=', '.join(str(int(y)) for y in years)), {})
+
+    reports = {}
+    for year in years:
+        start, end = fiscal_year_bounds(year)
+        reports[year] = {'total_workdays': working_days(db, start, end), 'has_facts': False, 'staff': {}}
+    for row in leave_rows:
+        reports[row.fiscal_year]['staff'][row.staff_id] = [
+            float(row.annual or 0), float(row.sick or 0), float(row.total or 0), None]
+    for row in worked_rows:
+        report = reports[row.fiscal_year]
+        report['has_facts'] = True
+        report['staff'].setdefault(row.staff_id, [0.0, 0.0, 0.0, None])[3] = float(row.days_worked or 0)
+
+    # Years before the first recorded attendance: working days minus leave
+    for report in reports.values():
+        for figures in report['staff'].values():
+            if figures[3] is None:
+                figures[3] = 0.0 if report['has_facts'] else report['total_workdays'] - figures[2]
+        report['staff'] = [[staff_id] + figures for staff_id, figures in report['staff'].items()]
+    return reports
+
+
+def fiscal_year_reports(db, fiscal_years, today=None):
+    """
+    Leave and days-worked figures per fiscal year.
+
+    Returns:
+        dict: fiscal_year -> {
+            'total_workdays': weighted working days of the year,
+            'has_facts': False when days worked are estimated (workdays - leave),
+            'staff': [[staff_id, annual, sick, total_leave, days_worked], ...]
+        }
+        Employees without leave or attendance in a year are not listed.
+    """
+    return cached_periods(db, 'fiscal_year_report',
+                          {fy: fiscal_year_bounds(fy) for fy in fiscal_years},
+                          lambda years: _compute_fiscal_year_reports(db, years), today)
+
+
+def staff_figures(report):
+    """staff_id -> [annual, sick, total_leave, days_worked] of one fiscal_year_reports() entry"""
+    return {row[0]: row[1:] for row in report['staff']}
+
+
+def default_days_worked(report):
+    """Days worked of an employee the report has no figures for"""
+    return 0.0 if report['has_facts'] else report['total_workdays']
+
+
+# =====================================================
+# SUMMARY API ROWS
+# =====================================================
+
+def _compute_fiscal_year_summaries(db, years):
+    fy = report_fiscal_year_summary.c
+    rows = query_reporting(db,
+        select(fy.fiscal_year, fy.staff_id, fy.days_present, fy.annual_leave_taken,
+               fy.sick_leave_taken, fy.absent_days)
+        .where(fy.fiscal_year.in_(years))
+    )
+    by_year = {}
+    for row in rows:
+        by_year.setdefault(row.fiscal_year, []).append(
+            [row.staff_id, row.days_present, row.annual_leave_taken,
+             row.sick_leave_taken, row.absent_days])
+    return by_year
+
+
+def fiscal_year_summaries(db, fiscal_years, today=None):
+    """fiscal_year -> [[staff_id, days_present, annual_taken, sick_taken, absent_days], ...]"""
+    return cached_periods(db, 'fiscal_year_summary',
+                          {fy: fiscal_year_bounds(fy) for fy in fiscal_years},
+                          lambda years: _compute_fiscal_year_summaries(db, years), today)
+
+
+def _compute_monthly_summaries(db, month_keys):
+    monthly = report_monthly_attendance.c
+    rows = query_reporting(db,
+        select(monthly.month_start, monthly.staff_id, monthly.days_present,
+               monthly.late_days, monthly.leave_days)
+        .where(monthly.month_start.in_([date.fromisoformat(m) for m in month_keys]))
+    )
+    by_month = {}
+    for row in rows:
+        month_start = row.month_start
+        if not isinstance(month_start, date):
+            month_start = date.fromisoformat(month_start)
+        by_month.setdefault(month_start.isoformat(), []).append(
+            [row.staff_id, row.days_present, row.late_days, row.leave_days])
+    return by_month
+
+
+def monthly_summaries(db, months, today=None):
+    """'YYYY-MM-01' -> [[staff_id, days_present, late_days, leave_days], ...]"""
+    return cached_periods(db, 'monthly_attendance',
+                          {m.isoformat(): (m, next_month(m) - timedelta(days=1)) for m in months},
+                          lambda keys: _compute_monthly_summaries(db, keys), today)
+
+
+# =====================================================
+# PRE-WARM
+# =====================================================
+
+def report_fiscal_years(today=None):
+    """Fiscal years offered by the report pages (through the current one), oldest first"""
+    today = today or date.today()
+    return list(range(FIRST_REPORT_FISCAL_YEAR, fiscal_year_of(today) + 1))
+
+
+def closed_fiscal_years(today=None):
+    """Closed fiscal years offered by the report pages, oldest first"""
+    today = today or date.today()
+    return [fy for fy in report_fiscal_years(today) if period_closed(fiscal_year_bounds(fy)[1], today)]
+
+
+def warm_report_cache(db, today=None):
+    """
+    Compute every closed period that is not cached yet.
+
+    Returns:
+        dict: fiscal_years, months warmed
+    """
+    today = today or date.today()
+    years = closed_fiscal_years(today)
+    fiscal_year_reports(db, years, today)
+    fiscal_year_summaries(db, years, today)
+
+    months = []
+    first = first_attendance_date(db)
+    if first is not None:
+        month = first.replace(day=1)
+        while period_closed(next_month(month) - timedelta(days=1), today):
+            months.append(month)
+            month = next_month(month)
+        monthly_summaries(db, months, today)
+    return {'fiscal_years': len(years), 'months': len(months)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-warm the closed-period report cache')
+    parser.add_argument('--clear', action='store_true', help='drop every cached payload instead')
+    args = parser.parse_args()
+
+    from app import get_app, db
+    from reporting import ensure_reporting_views
+
+    started = _time.perf_counter()
+    with get_app().app_context():
+        if args.clear:
+            print(f"🗑️ Dropped {clear_report_cache(db)} cached report(s)")
+            return 0
+        ensure_reporting_views(db)
+        warmed = warm_report_cache(db)
+    print(f"✅ Report cache warm: {warmed['fiscal_years']} closed fiscal year(s), "
+          f"{warmed['months']} closed month(s) in {_time.perf_counter() - started:.1f} s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
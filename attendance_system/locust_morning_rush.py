@@ -0,0 +1,238 @@
+"""
+Morning-Rush Load Scenario (locust)
+-----------------------------------
+Replays 07:45-08:30 Nairobi time against a running server, compressed
+into --rush-minutes of wall-clock time:
+
+- staff kiosks clock every staff member in (POST /api/attendance) and poll
+  the board (GET /api/attendance/today); the simulated clock crosses
+  LATE_THRESHOLD (08:15) two thirds of the way through
+- casual kiosks clock casual workers in (POST /api/casual/clock-in) and
+  poll GET /api/casual/today
+- admins refresh /admin/dashboard
+
+Kiosks ramp up to --peak-users as the rush builds, hold through the peak
+and tail off after 08:15. At the end a per-endpoint table with p50 / p95 /
+p99 latency and error rate is printed (and written as JSON with
+--rush-report).
+
+Usage:
+    python app.py   # or gunicorn -c gunicorn.conf.py app:app
+    locust -f locust_morning_rush.py --headless --host http://127.0.0.1:5000 \\
+        --rush-minutes 5 --peak-users 80 --rush-report morning_rush.json
+
+Clock-ins are written for --work-date (default today), so run it against a
+local or staging database (e.g. one loaded by generate_dataset.py).
+
+Requires: locust
+"""
+
+import itertools
+import json
+import os
+import random
+import threading
+import time as _time
+from datetime import date, datetime, timedelta
+
+from locust import HttpUser, LoadTestShape, between, events, task
+
+RUSH_START = datetime.combine(date.today(), datetime.strptime('07:45', '%H:%M').time())
+RUSH_LENGTH = timedelta(minutes=45)  # 07:45 -> 08:30
+
+# (fraction of the rush, fraction of peak kiosks) - linear in between
+_RUSH_CURVE = [(0.0, 0.2), (0.2, 0.7), (0.35, 1.0), (0.65, 1.0), (0.8, 0.5), (1.0, 0.2)]
+
+_state = {'started': None, 'staff_ids': None}
+_staff_lock = threading.Lock()
+
+
+@events.init_command_line_parser.add_listener
+def _add_arguments(parser):
+    parser.add_argument('--rush-minutes', type=float, default=10,
+                        help='wall-clock minutes the 07:45-08:30 rush is compressed into')
+    parser.add_argument('--peak-users', type=int, default=60, help='concurrent clients at the peak')
+    parser.add_argument('--work-date', default=None, help='date clock-ins are written for (default today)')
+    parser.add_argument('--admin-password', default=os.getenv('ADMIN_PASSWORD'),
+                        help='admin password (default ADMIN_PASSWORD or the app setting)')
+    parser.add_argument('--rush-report', default=None, help='write per-endpoint results as JSON')
+
+
+def _options(user):
+    return user.environment.parsed_options
+
+
+def simulated_clock(environment):
+    """Nairobi wall time in the replayed rush (07:45 at start, 08:30 at the end)"""
+    if _state['started'] is None:
+        return RUSH_START.time()
+    rush_seconds = environment.parsed_options.rush_minutes * 60
+    fraction = min(1.0, (_time.monotonic() - _state['started']) / rush_seconds)
+    return (RUSH_START + RUSH_LENGTH * fraction).time()
+
+
+def _next_staff_id(client):
+    """Each staff member clocks in once; None when everyone has"""
+    with _staff_lock:
+        if _state['staff_ids'] is None:
+            response = client.get('/api/employees', name='/api/employees [setup]')
+            ids = [e['id'] for e in response.json().get('employees', [])] if response.ok else []
+            random.shuffle(ids)
+            _state['staff_ids'] = iter(ids)
+        return next(_state['staff_ids'], None)
+
+
+def _check(response):
+    """Fail on HTTP errors and on {'success': false} bodies"""
+    if response.status_code >= 400:
+        response.failure(f"HTTP {response.status_code}")
+        return
+    try:
+        body = response.json()
+    except ValueError:
+        return
+    if isinstance(body, dict) and body.get('success') is False:
+        response.failure(body.get('error') or 'success: false')
+
+
+# =====================================================
+# USERS
+# =====================================================
+
+class StaffKiosk(HttpUser):
+    """Gate kiosk: clocks staff in between board polls"""
+    weight = 6
+    wait_time = between(0.5, 2)
+
+    @task(3)
+    def clock_in(self):
+        staff_id = _next_staff_id(self.client)
+        if staff_id is None:
+            return self.poll_today()
+        work_date = _options(self).work_date or date.today().isoformat()
+        payload = {
+            'staff_id': staff_id,
+            'work_date': work_date,
+            'clock_in': simulated_clock(self.environment).strftime('%H:%M'),
+        }
+        with self.client.post('/api/attendance', json=payload, name='/api/attendance [clock-in]',
+                              catch_response=True) as response:
+            _check(response)
+
+    @task(2)
+    def poll_today(self):
+        with self.client.get('/api/attendance/today', catch_response=True) as response:
+            _check(response)
+
+
+class CasualKiosk(HttpUser):
+    """Casual workers' kiosk: a new clock-in row every time"""
+    weight = 2
+    wait_time = between(1, 3)
+    _counter = itertools.count(1)
+
+    @task(2)
+    def clock_in(self):
+        n = next(self._counter)
+        payload = {
+            'name': f"Casual Worker {n}",
+            'phone_number': f"07{n:08d}",
+            'work_type': random.choice(['Loading', 'Cleaning', 'Workshop', 'Packing']),
+        }
+        with self.client.post('/api/casual/clock-in', json=payload, name='/api/casual/clock-in',
+                              catch_response=True) as response:
+            _check(response)
+
+    @task(1)
+    def poll_casuals(self):
+        with self.client.get('/api/casual/today', catch_response=True) as response:
+            _check(response)
+
+
+class AdminUser(HttpUser):
+    """Admin watching arrivals on the dashboard"""
+    weight = 1
+    wait_time = between(5, 15)
+
+    def on_start(self):
+        password = _options(self).admin_password
+        if password is None:
+            from app import ADMIN_PASSWORD
+            password = ADMIN_PASSWORD
+        self.client.post('/admin-login', data={'employee_code': password},
+                         allow_redirects=False)
+
+    @task
+    def dashboard(self):
+        with self.client.get('/admin/dashboard', allow_redirects=False,
+                             catch_response=True) as response:
+            if response.status_code != 200:
+                response.failure(f"HTTP {response.status_code} (not logged in?)")
+
+
+# =====================================================
+# RUSH SHAPE AND REPORT
+# =====================================================
+
+class MorningRushShape(LoadTestShape):
+    """Concurrent clients over the compressed rush (see _RUSH_CURVE)"""
+
+    def tick(self):
+        options = self.runner.environment.parsed_options
+        rush_seconds = options.rush_minutes * 60
+        elapsed = self.get_run_time()
+        if elapsed >= rush_seconds:
+            return None
+        if _state['started'] is None:
+            _state['started'] = _time.monotonic()
+
+        fraction = elapsed / rush_seconds
+        for (x0, y0), (x1, y1) in zip(_RUSH_CURVE, _RUSH_CURVE[1:]):
+            if x0 <= fraction <= x1:
+                level = y0 + (y1 - y0) * (fraction - x0) / (x1 - x0)
+                break
+        users = max(1, round(options.peak_users * level))
+        return users, max(1, options.peak_users / 10)
+
+
+def endpoint_report(stats):
+    """
+    Per-endpoint latency percentiles and error rates.
+
+    Returns:
+        list of dict: endpoint, requests, p50_ms, p95_ms, p99_ms, error_rate
+    """
+    rows = []
+    for entry in sorted(stats.entries.values(), key=lambda e: (e.name, e.method)):
+        if not entry.num_requests:
+            continue
+        rows.append({
+            'endpoint': f"{entry.method} {entry.name}",
+            'requests': entry.num_requests,
+            'p50_ms': entry.get_response_time_percentile(0.5),
+            'p95_ms': entry.get_response_time_percentile(0.95),
+            'p99_ms': entry.get_response_time_percentile(0.99),
+            'error_rate': round(entry.num_failures / entry.num_requests, 4),
+        })
+    return rows
+
+
+@events.test_stop.add_listener
+def _print_report(environment, **_kwargs):
+    rows = endpoint_report(environment.stats)
+    print(f"\n🌅 Morning rush (07:45-08:30 in {environment.parsed_options.rush_minutes:g} min)")
+    print(f"{'endpoint':<34} {'requests':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>8}")
+    for row in rows:
+        print(f"{row['endpoint']:<34} {row['requests']:>9} {row['p50_ms']:>8.0f} {row['p95_ms']:>8.0f} "
+              f"{row['p99_ms']:>8.0f} {row['error_rate']:>7.1%}")
+
+    path = environment.parsed_options.rush_report
+    if path:
+        with open(path, 'w') as f:
+            json.dump({
+                'host': environment.host,
+                'rush_minutes': environment.parsed_options.rush_minutes,
+                'peak_users': environment.parsed_options.peak_users,
+                'endpoints': rows,
+            }, f, indent=2)
+        print(f"📄 Results written to {path}")
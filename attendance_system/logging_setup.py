@@ -0,0 +1,164 @@
+"""
+Structured, non-blocking logging for the Attendance System
+Request threads only put log records on a queue (QueueHandler); a single
+QueueListener thread formats them and writes to stdout, so a slow terminal
+or log shipper never holds up a request.
+
+Every record carries the current request's method, path and endpoint when
+there is one. Modules log through `logging.getLogger(__name__)`; debug-only
+work is guarded with `logger.isEnabledFor(logging.DEBUG)` so it costs
+nothing when debug logging is off.
+
+Environment:
+    LOG_LEVEL    root level (default INFO)
+    LOG_LEVELS   per-module levels, e.g. "app=DEBUG,reporting=WARNING"
+    LOG_FORMAT   json (default) or text
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()
+
+# Attributes every LogRecord has; anything else came from `extra=`
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_state = {'handler': None, 'listener': None}
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, extras"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """`time level logger: message key=value ...` for local development"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s: %(message)s', '%H:%M:%S')
+
+    def format(self, record):
+        line = super().format(record)
+        extras = [f"{k}={v}" for k, v in vars(record).items()
+                  if k not in _RECORD_FIELDS and not k.startswith('_') and v is not None]
+        return f"{line}  {' '.join(extras)}" if extras else line
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach method/path/endpoint while still on the request thread"""
+
+    def filter(self, record):
+        from flask import has_request_context, request
+        if has_request_context():
+            record.method = request.method
+            record.path = request.path
+            record.endpoint = request.endpoint
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    """Hands records to the listener with as little work as possible"""
+
+    def prepare(self, record):
+        # Merge the args and render any traceback now (the objects may not
+        # outlive the request); formatting and I/O happen on the listener
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_levels(spec):
+    """'app=DEBUG,reporting=WARNING' -> {'app': 'DEBUG', 'reporting': 'WARNING'}"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, level = item.partition('=')
+        if level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _start_listener(handlers):
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return log_queue, listener
+
+
+def _restart_after_fork():
+    # The listener thread does not survive fork(); gunicorn workers (and
+    # anything else forked after setup) get their own queue and thread
+    handler, listener = _state['handler'], _state['listener']
+    if handler is None:
+        return
+    handler.queue, _state['listener'] = _start_listener(listener.handlers)
+
+
+def _stop():
+    listener = _state['listener']
+    if listener is not None and listener._thread is not None:
+        listener.stop()
+
+
+def setup_logging(level=None, levels=None, fmt=None):
+    """
+    Route all logging through a queue to one stdout writer thread
+    (idempotent; later calls only update levels).
+
+    Args:
+        level: root level (default LOG_LEVEL)
+        levels: dict of logger name -> level (default parsed LOG_LEVELS)
+        fmt: 'json' or 'text' (default LOG_FORMAT)
+    """
+    level = (level or LOG_LEVEL).upper()
+    levels = parse_levels(LOG_LEVELS) if levels is None else levels
+    root = logging.getLogger()
+
+    with _setup_lock:
+        if _state['handler'] is None:
+            stream = logging.StreamHandler(sys.stdout)
+            stream.setFormatter(TextFormatter() if (fmt or LOG_FORMAT) == 'text' else JsonFormatter())
+            log_queue, listener = _start_listener([stream])
+
+            handler = _QueueHandler(log_queue)
+            handler.addFilter(RequestContextFilter())
+            root.addHandler(handler)
+            _state['handler'], _state['listener'] = handler, listener
+
+            atexit.register(_stop)
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=_restart_after_fork)
+
+    root.setLevel(level)
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level)
+    return _state['listener']
@@ -7,18 +7,20 @@ This file serves as the main entry point for the Attendance System.
 All routes (Admin and Staff) are enabled regardless of environment.
 """
 
+import logging
 import os
-import pytz
 from datetime import datetime, date, timedelta
 from functools import wraps
 
-# Timezone configuration
-NAIROBI_TIMEZONE = pytz.timezone('Africa/Nairobi')
-UTC = pytz.UTC
+from logging_setup import setup_logging
+
+setup_logging()
+logger = logging.getLogger('main')
 
 def get_nairobi_now():
-    """Get current datetime in Nairobi timezone"""
-    return datetime.now(NAIROBI_TIMEZONE)
+    """Get current datetime in Nairobi timezone (pytz is imported on first use)"""
+    import pytz
+    return datetime.now(pytz.timezone('Africa/Nairobi'))
 
 def get_nairobi_today():
     """Get today's date in Nairobi timezone"""
@@ -408,12 +410,10 @@ app.calculate_leave_days_python = calculate_leave_days_python
 # ALWAYS-ENABLED ROUTES
 # =====================================================
 
-print(f"\n{'='*60}")
-print(f"ATTENDANCE SYSTEM STARTUP")
-print(f"{'='*60}")
-print(f"Supabase URL: {SUPABASE_URL}")
-print(f"Database: {'PostgreSQL' if 'postgresql' in SQLALCHEMY_DATABASE_URI else 'SQLite'}")
-print(f"{'='*60}\n")
+logger.info("ATTENDANCE SYSTEM STARTUP", extra={
+    'supabase_url': SUPABASE_URL,
+    'database': 'PostgreSQL' if 'postgresql' in SQLALCHEMY_DATABASE_URI else 'SQLite',
+})
 
 # Home route - serves staff portal
 @app.route('/')
@@ -461,12 +461,12 @@ def delete_leave(leave_id):
         db.session.delete(leave_request)
         db.session.commit()
         
-        print(f"✅ Deleted leave request {leave_id} for {employee_name}")
+        logger.info("✅ Deleted leave request %s for %s", leave_id, employee_name)
         
         return redirect(url_for('admin_dashboard'))
     
     except Exception as e:
-        print(f"❌ ERROR deleting leave: {str(e)}")
+        logger.exception("❌ ERROR deleting leave: %s", e)
         db.session.rollback()
         return redirect(url_for('admin_dashboard'))
 
@@ -490,7 +490,7 @@ def manage_leaves():
                             name_map=name_map)
     
     except Exception as e:
-        print(f"❌ ERROR loading leaves: {str(e)}")
+        logger.exception("❌ ERROR loading leaves: %s", e)
         return render_template('admin/manage_leaves.html',
                             leaves=[],
                             name_map={},
@@ -576,9 +576,7 @@ def export_leave_summary():
         })
     
     except Exception as e:
-        print(f"❌ ERROR exporting CSV: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ ERROR exporting CSV: %s", e)
         return redirect(url_for('admin_dashboard'))
 
 # Admin Dashboard route (standalone)
@@ -592,26 +590,20 @@ def admin_dashboard():
         # Use Nairobi timezone for today's date (staff is in Nairobi, server is in Oregon)
         today = get_nairobi_today()
         
-        # Debug: Print database connection info
-        print(f"🔍 Database connection: {SQLALCHEMY_DATABASE_URI[:30]}...")
-        print(f"📅 Nairobi Today: {today}")
-        
         employees = Employee.query.filter_by(IsActive=True).order_by(Employee.EmployeeCode.asc()).all()
-        print(f"👥 Active employees found: {len(employees)}")
         
         # Get today's attendance records using Nairobi timezone
         today_attendance = Attendance.query.filter(
             Attendance.WorkDate == today
         ).all()
-        print(f"📋 Today's attendance records: {len(today_attendance)}")
         
         # Create set of present employee IDs (as strings for easy comparison)
         present_ids = {str(a.EmpID) for a in today_attendance}
-        print(f"✅ Present IDs set: {present_ids}")
         
-        # Debug: Also get all attendance to see if there are any records at all
-        all_attendance_count = Attendance.query.count()
-        print(f"📊 Total attendance records in database: {all_attendance_count}")
+        # The table-wide count is a full scan; only pay for it when debugging
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📋 %s (Nairobi): %d active employees, %d attendance records today, %d in total",
+                         today, len(employees), len(today_attendance), Attendance.query.count())
 
         
         # Get approved leaves for today
@@ -695,10 +687,8 @@ def admin_dashboard():
             }
             yearly_stats.append(row)
         
-        print(f"📅 Today: {today}")
-        print(f"👥 Employees on leave today: {emp_ids_on_leave}")
-        print(f"📋 Historical leaves found: {len(historical_leaves)}")
-        print(f"📊 Yearly stats computed for {len(yearly_stats)} employees")
+        logger.debug("👥 Employees on leave %s: %s (%d historical leaves, yearly stats for %d employees)",
+                     today, emp_ids_on_leave, len(historical_leaves), len(yearly_stats))
         
         return render_template('admin/dashboard.html',
                             staff=employees,
@@ -721,9 +711,7 @@ def admin_dashboard():
                             sick_leave_limit=14)
 
     except Exception as e:
-        print(f"❌ ERROR in admin_dashboard: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ ERROR in admin_dashboard: %s", e)
         return render_template('admin/dashboard.html',
                             staff=[],
                             attendance=[],
@@ -786,9 +774,8 @@ def add_historical_leave():
         # Step 2: Apply multiplier
         final_total = calculate_leave_with_rate_multiplier(start_date, end_date, multiplier)
         
-        print(f"DEBUG: Date range: {start_date} to {end_date}")
-        print(f"DEBUG: Multiplier: {multiplier}")
-        print(f"DEBUG: Final total days: {final_total}")
+        logger.debug("Historical leave: %s to %s multiplier=%s total_days=%s",
+                     start_date, end_date, multiplier, final_total)
         
         fiscal_year = get_fiscal_year_python(start_date)
         
@@ -845,23 +832,19 @@ def add_historical_leave():
                             success=f'Successfully added historical leave for {employee.FirstName} {employee.LastName}. Duration: {final_total} days')
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ ERROR adding historical leave: %s", e)
         return render_template('admin/add_historical_leave.html', 
                             employees=Employee.query.filter_by(IsActive=True).order_by(Employee.EmployeeCode.asc()).all(),
                             error=f'Error: {str(e)}')
 
 # Load Staff routes (no prefix - at root)
-print(">>> Loading Staff Routes <<<")
 from routes.staff_routes import staff_bp
 app.register_blueprint(staff_bp)
-print(">>> Staff Routes Registered Successfully <<<\n")
 
 # Load Admin routes
-print(">>> Loading Admin Routes <<<")
 from routes.admin_routes import admin_bp
 app.register_blueprint(admin_bp)
-print(">>> Admin Routes Registered Successfully <<<\n")
+logger.info("Staff and admin routes registered")
 
 
 # =====================================================
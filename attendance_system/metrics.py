@@ -0,0 +1,131 @@
+"""
+Prometheus metrics for the Attendance System
+Records, per Flask endpoint: request latency, status counts, errors,
+response size, and the SQL statements / database time of each request
+(counted by the engine listeners in query_stats.py). An N+1 loop shows up
+as a jump in attendance_db_queries_per_request for its endpoint.
+
+    GET /metrics   - Prometheus text format
+
+Under gunicorn (gunicorn.conf.py sets PROMETHEUS_MULTIPROC_DIR) every
+worker writes its samples to that directory and /metrics aggregates all
+workers, whichever one serves the scrape.
+
+Environment:
+    PROMETHEUS_MULTIPROC_DIR   enables multiprocess mode (set by gunicorn.conf.py)
+    METRICS_TOKEN              if set, /metrics requires `Authorization: Bearer <token>`
+
+Requires: prometheus_client (the app runs without it; /metrics is then
+not registered)
+"""
+
+import logging
+import os
+import time as _time
+
+from flask import Response, g, jsonify, request
+
+from query_stats import current_request_stats
+
+logger = logging.getLogger(__name__)
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+_QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 200, 500)
+_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_metrics = None
+
+
+def _build_metrics():
+    """Create the metric objects once per process"""
+    global _metrics
+    if _metrics is not None:
+        return _metrics
+    from prometheus_client import Counter, Histogram
+
+    _metrics = {
+        'latency': Histogram(
+            'attendance_http_request_duration_seconds', 'Request latency',
+            ['method', 'endpoint'], buckets=_LATENCY_BUCKETS),
+        'requests': Counter(
+            'attendance_http_requests_total', 'Requests by status',
+            ['method', 'endpoint', 'status']),
+        'errors': Counter(
+            'attendance_http_request_errors_total', 'Responses with status >= 500',
+            ['method', 'endpoint']),
+        'size': Histogram(
+            'attendance_http_response_size_bytes', 'Response body size',
+            ['endpoint'], buckets=_SIZE_BUCKETS),
+        'queries': Histogram(
+            'attendance_db_queries_per_request', 'SQL statements per request',
+            ['endpoint'], buckets=_QUERY_BUCKETS),
+        'db_time': Histogram(
+            'attendance_db_time_seconds', 'Database time per request',
+            ['endpoint'], buckets=_LATENCY_BUCKETS),
+    }
+    return _metrics
+
+
+def render_metrics():
+    """
+    Current metrics in the Prometheus text format.
+
+    Returns:
+        tuple: (body bytes, content type)
+    """
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def init_metrics(app, db):
+    """Register the request hooks and /metrics on the Flask app"""
+    try:
+        metrics = _build_metrics()
+    except ImportError:
+        logger.warning("⚠️ prometheus_client not installed; /metrics disabled")
+        return None
+
+    @app.before_request
+    def _start_timer():
+        g._request_started = _time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.get('_request_started')
+        if started is None:
+            return response
+        # Unmatched URLs share one label so 404 scans can't add series
+        endpoint = request.endpoint or 'unmatched'
+        method = request.method
+        status = response.status_code
+
+        metrics['latency'].labels(method, endpoint).observe(_time.perf_counter() - started)
+        metrics['requests'].labels(method, endpoint, str(status)).inc()
+        if status >= 500:
+            metrics['errors'].labels(method, endpoint).inc()
+        if response.content_length is not None:
+            metrics['size'].labels(endpoint).observe(response.content_length)
+
+        db_stats = current_request_stats()
+        metrics['queries'].labels(endpoint).observe(db_stats['queries'])
+        metrics['db_time'].labels(endpoint).observe(db_stats['db_time_ms'] / 1000)
+        return response
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        """Prometheus scrape endpoint"""
+        if METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {METRICS_TOKEN}":
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+        body, content_type = render_metrics()
+        return Response(body, content_type=content_type)
+
+    return metrics
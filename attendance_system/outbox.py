@@ -0,0 +1,122 @@
+"""
+Email outbox for the Attendance System
+Notification emails are written to email_outbox inside the request and
+sent afterwards by the scheduler's drain_outbox job, so a slow or
+unreachable SMTP server never holds up a leave approval.
+
+    email_outbox (id, recipient, subject, body, created_at, sent_at,
+                  attempts, last_error)
+
+A failed delivery is retried on the next drain, up to OUTBOX_MAX_ATTEMPTS
+times; the error is kept in last_error.
+
+Environment:
+    OUTBOX_MAX_ATTEMPTS   delivery attempts per email (default 5)
+    OUTBOX_BATCH_SIZE     emails sent per drain (default 50)
+"""
+
+import logging
+import os
+from datetime import datetime
+
+from sqlalchemy import (Column, DateTime, Index, Integer, MetaData, String, Table, Text, func,
+                        select)
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '5'))
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '50'))
+
+# Created by ensure_outbox_table(), like the archive tables
+outbox_metadata = MetaData()
+
+email_outbox = Table(
+    'email_outbox', outbox_metadata,
+    Column('id', Integer, primary_key=True),
+    Column('recipient', String(200), nullable=False),
+    Column('subject', String(255), nullable=False),
+    Column('body', Text, nullable=False),
+    Column('created_at', DateTime, nullable=False),
+    Column('sent_at', DateTime),
+    Column('attempts', Integer, nullable=False, default=0),
+    Column('last_error', Text),
+    Index('ix_email_outbox_pending', 'sent_at', 'id'),
+)
+
+
+def ensure_outbox_table(db):
+    """Create email_outbox if missing"""
+    outbox_metadata.create_all(db.engine)
+
+
+def _run(db, fn):
+    try:
+        with db.engine.begin() as conn:
+            return fn(conn)
+    except (ProgrammingError, OperationalError) as e:
+        if 'email_outbox' not in str(e):
+            raise
+    ensure_outbox_table(db)
+    with db.engine.begin() as conn:
+        return fn(conn)
+
+
+def queue_email(db, recipient, subject, body):
+    """Queue one email for the next drain"""
+    stmt = email_outbox.insert().values(recipient=recipient, subject=subject, body=body,
+                                        created_at=datetime.utcnow(), attempts=0)
+    _run(db, lambda conn: conn.execute(stmt))
+
+
+def drain_outbox(db, deliver):
+    """
+    Send queued emails, oldest first.
+
+    Args:
+        db: Flask-SQLAlchemy instance (call inside an app context)
+        deliver: function(recipient, subject, body) that raises on failure
+
+    Returns:
+        dict: sent, failed
+    """
+    pending = select(email_outbox).where(
+        email_outbox.c.sent_at.is_(None),
+        email_outbox.c.attempts < OUTBOX_MAX_ATTEMPTS,
+    ).order_by(email_outbox.c.id).limit(OUTBOX_BATCH_SIZE)
+    rows = _run(db, lambda conn: conn.execute(pending).all())
+
+    sent = failed = 0
+    for row in rows:
+        values = {'attempts': row.attempts + 1}
+        try:
+            deliver(row.recipient, row.subject, row.body)
+            values.update(sent_at=datetime.utcnow(), last_error=None)
+            sent += 1
+        except Exception as e:
+            logger.warning("⚠️ Email %s to %s failed (attempt %d): %s",
+                           row.id, row.recipient, values['attempts'], e)
+            values['last_error'] = str(e)[:1000]
+            failed += 1
+        stmt = email_outbox.update().where(email_outbox.c.id == row.id).values(**values)
+        _run(db, lambda conn: conn.execute(stmt))
+    return {'sent': sent, 'failed': failed}
+
+
+def outbox_status(db):
+    """
+    Queued and given-up email counts. Read-only (polled by /readyz): no
+    transaction is opened and a missing table counts as empty.
+    """
+    stmt = select(
+        func.count().filter(email_outbox.c.attempts < OUTBOX_MAX_ATTEMPTS).label('pending'),
+        func.count().filter(email_outbox.c.attempts >= OUTBOX_MAX_ATTEMPTS).label('dead'),
+    ).where(email_outbox.c.sent_at.is_(None))
+    try:
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            row = conn.execute(stmt).one()
+    except (ProgrammingError, OperationalError) as e:
+        if 'email_outbox' not in str(e):
+            raise
+        return {'pending': 0, 'dead': 0}
+    return {'pending': row.pending, 'dead': row.dead}
@@ -0,0 +1,178 @@
+"""
+Per-request database round-trip accounting for the Attendance System
+Counts statements, transaction round trips (BEGIN/COMMIT/ROLLBACK and
+pre-ping) and database time for each request, reports them in response
+headers and flags endpoints that exceed their round-trip budget.
+
+Staff clock in from Nairobi, the server runs in Oregon and the database in
+EU West, so each round trip is ~150 ms; the count matters more than CPU.
+
+Response headers:
+    X-DB-Queries      - SQL statements executed
+    X-DB-Round-Trips  - statements + BEGIN/COMMIT/ROLLBACK + pings
+    Server-Timing     - db;dur=<ms>
+"""
+
+import logging
+import threading
+import time as _time
+from functools import wraps
+
+from flask import g, has_app_context, request, jsonify, session
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Endpoint -> [requests, total round trips, max round trips, over budget]
+_endpoint_totals = {}
+_totals_lock = threading.Lock()
+
+
+def _stats():
+    """Counters for the current request, or None outside a request"""
+    if not has_app_context():
+        return None
+    return g.get('_db_stats')
+
+
+def _is_autocommit(conn):
+    return conn.get_execution_options().get('isolation_level') == 'AUTOCOMMIT'
+
+
+def attach_engine_listeners(engine):
+    """Install the cursor/transaction event listeners on an engine (idempotent)"""
+    if getattr(engine, '_attendance_query_stats', False):
+        return
+    engine._attendance_query_stats = True
+    networked = engine.dialect.name != 'sqlite'
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_query_started', []).append(_time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['_query_started'].pop()
+        stats = _stats()
+        if stats is not None:
+            stats['queries'] += 1
+            stats['round_trips'] += 1
+            stats['db_time'] += _time.perf_counter() - started
+
+    @event.listens_for(engine, 'handle_error')
+    def _failed(context):
+        # A failed statement still cost a round trip
+        conn = context.connection
+        if conn is not None and conn.info.get('_query_started'):
+            conn.info['_query_started'].pop()
+            stats = _stats()
+            if stats is not None:
+                stats['queries'] += 1
+                stats['round_trips'] += 1
+
+    def _transaction_round_trip(conn):
+        # psycopg2 sends BEGIN/COMMIT/ROLLBACK as separate commands unless
+        # the connection is in autocommit mode.
+        if not networked or _is_autocommit(conn):
+            return
+        stats = _stats()
+        if stats is not None:
+            stats['round_trips'] += 1
+
+    event.listen(engine, 'begin', _transaction_round_trip)
+    event.listen(engine, 'commit', _transaction_round_trip)
+    event.listen(engine, 'rollback', _transaction_round_trip)
+
+    if networked and getattr(engine.pool, '_pre_ping', False):
+        @event.listens_for(engine, 'checkout')
+        def _ping(dbapi_conn, conn_record, conn_proxy):
+            stats = _stats()
+            if stats is not None:
+                stats['round_trips'] += 1
+                stats['pings'] += 1
+
+
+def roundtrip_budget(limit):
+    """
+    Declare the maximum number of database round trips for a view.
+
+    Requests that exceed it are logged; the response is unaffected. Pool
+    pre-pings (direct profile only) are not counted against the budget.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g._db_budget = limit
+            return view(*args, **kwargs)
+        wrapper.roundtrip_budget = limit
+        return wrapper
+    return decorator
+
+
+def current_request_stats():
+    """Snapshot of the counters for the current request"""
+    stats = _stats() or {'queries': 0, 'round_trips': 0, 'db_time': 0.0}
+    return {
+        'queries': stats['queries'],
+        'round_trips': stats['round_trips'],
+        'db_time_ms': round(stats['db_time'] * 1000, 2),
+    }
+
+
+def endpoint_totals():
+    """Per-endpoint round-trip totals since process start"""
+    with _totals_lock:
+        return {
+            endpoint: {
+                'requests': values[0],
+                'avg_round_trips': round(values[1] / values[0], 2) if values[0] else 0,
+                'max_round_trips': values[2],
+                'over_budget': values[3],
+            }
+            for endpoint, values in sorted(_endpoint_totals.items())
+        }
+
+
+def init_query_stats(app, db):
+    """Register request hooks and engine listeners on the Flask app"""
+    with app.app_context():
+        attach_engine_listeners(db.engine)
+        # Budgets describe network round trips; a local SQLite file has none
+        enforce_budgets = db.engine.dialect.name != 'sqlite'
+
+    @app.before_request
+    def _start_db_stats():
+        g._db_stats = {'queries': 0, 'round_trips': 0, 'pings': 0, 'db_time': 0.0}
+
+    @app.after_request
+    def _report_db_stats(response):
+        stats = _stats()
+        if stats is None:
+            return response
+
+        db_ms = stats['db_time'] * 1000
+        response.headers['X-DB-Queries'] = str(stats['queries'])
+        response.headers['X-DB-Round-Trips'] = str(stats['round_trips'])
+        response.headers['Server-Timing'] = f"db;dur={db_ms:.1f}"
+
+        endpoint = request.endpoint or 'unknown'
+        budget = g.get('_db_budget')
+        over = (enforce_budgets and budget is not None
+                and stats['round_trips'] - stats['pings'] > budget)
+        if over:
+            logger.warning("⚠️ %s: %d DB round trips (budget %d)", endpoint, stats['round_trips'], budget)
+
+        with _totals_lock:
+            totals = _endpoint_totals.setdefault(endpoint, [0, 0, 0, 0])
+            totals[0] += 1
+            totals[1] += stats['round_trips']
+            totals[2] = max(totals[2], stats['round_trips'])
+            totals[3] += 1 if over else 0
+        return response
+
+    @app.route('/admin/roundtrip-stats')
+    def admin_roundtrip_stats():
+        """Database round trips per endpoint since process start"""
+        if not session.get('admin_logged_in'):
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+        return jsonify({'success': True, 'endpoints': endpoint_totals()})
@@ -0,0 +1,409 @@
+"""
+Precomputed reporting relations for the Attendance System
+Monthly and fiscal-year aggregates are computed once per refresh instead of
+on every admin click:
+
+- PostgreSQL: materialized views, refreshed CONCURRENTLY so readers are
+  never blocked
+- SQLite: ordinary summary tables rebuilt by the app in one transaction
+
+Both backends expose the same relation names and columns, so the report
+routes query them the same way:
+
+    report_monthly_attendance (staff_id, month_start, days_present, late_days, leave_days)
+    report_fiscal_year_summary (staff_id, fiscal_year, days_present,
+                                annual_leave_taken, sick_leave_taken, absent_days)
+
+Both are aggregations over the attendance_daily fact table
+(attendance_facts.py), which also covers archived fiscal years, so totals
+are unchanged by archival. Each refresh first brings the facts up to date.
+
+Refreshes run on a background thread every REPORT_REFRESH_SECONDS and,
+debounced, shortly after bulk writes (leave approval, historical leave,
+leave reset) via request_refresh(). With the job scheduler enabled
+(scheduler.py) the periodic refresh runs once per cluster as the
+refresh_reports job and this thread only serves requested refreshes.
+
+Report results for closed periods (ended more than FACT_RECOMPUTE_DAYS
+ago) are kept in the report_cache table, shared by all workers. An entry
+is dropped when a refresh recomputes facts overlapping its period (e.g.
+back-dated leave) and when the facts are rebuilt.
+"""
+
+import json
+import logging
+import os
+import threading
+import time as _time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import (Column, Date, DateTime, Float, Integer, MetaData, String, Table, Text,
+                        and_, delete, or_, select, text)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from archive import ensure_archive_tables, fiscal_year_sql, month_start_sql
+from attendance_facts import FACT_RECOMPUTE_DAYS, ensure_fact_table, rebuild_facts, sync_facts
+
+logger = logging.getLogger(__name__)
+
+REPORT_REFRESH_SECONDS = int(os.getenv('REPORT_REFRESH_SECONDS', '300'))
+REPORT_REFRESH_DEBOUNCE_SECONDS = float(os.getenv('REPORT_REFRESH_DEBOUNCE_SECONDS', '5'))
+
+# Kept out of db.metadata so db.create_all() never creates a table over a
+# PostgreSQL materialized view of the same name
+reporting_metadata = MetaData()
+
+report_monthly_attendance = Table(
+    'report_monthly_attendance', reporting_metadata,
+    Column('staff_id', Integer, primary_key=True),
+    Column('month_start', Date, primary_key=True),
+    Column('days_present', Integer, nullable=False),
+    Column('late_days', Integer, nullable=False),
+    Column('leave_days', Integer, nullable=False),
+)
+
+report_fiscal_year_summary = Table(
+    'report_fiscal_year_summary', reporting_metadata,
+    Column('staff_id', Integer, primary_key=True),
+    Column('fiscal_year', Integer, primary_key=True),
+    Column('days_present', Integer, nullable=False),
+    Column('annual_leave_taken', Float, nullable=False),
+    Column('sick_leave_taken', Float, nullable=False),
+    Column('absent_days', Float, nullable=False),
+)
+
+# Closed-period results; an ordinary table on both backends
+cache_metadata = MetaData()
+
+report_cache = Table(
+    'report_cache', cache_metadata,
+    Column('cache_key', String(255), primary_key=True),
+    Column('report', String(50), nullable=False),
+    Column('period_start', Date, nullable=False),
+    Column('period_end', Date, nullable=False),
+    Column('payload', Text, nullable=False),
+    Column('created_at', DateTime, nullable=False),
+)
+
+
+# =====================================================
+# SQL DEFINITIONS
+# =====================================================
+# Both relations aggregate attendance_daily (see attendance_facts.py), which
+# already covers archived fiscal years. days_present counts worked days
+# (present or late); leave_days counts working days on leave; absent_days
+# weighs unexplained absences (Saturday 0.5). Counts are cast so PostgreSQL
+# returns integers.
+
+_MONTHLY_SELECT = """
+    SELECT staff_id,
+           {month_start} AS month_start,
+           CAST(SUM(CASE WHEN status IN ('present', 'late') THEN 1 ELSE 0 END) AS INTEGER) AS days_present,
+           CAST(SUM(CASE WHEN status = 'late' THEN 1 ELSE 0 END) AS INTEGER) AS late_days,
+           CAST(SUM(CASE WHEN status = 'leave' THEN 1 ELSE 0 END) AS INTEGER) AS leave_days
+    FROM attendance_daily
+    GROUP BY staff_id, {month_start}
+"""
+
+_FISCAL_SELECT = """
+    WITH att AS (
+        SELECT staff_id, fiscal_year,
+               CAST(SUM(CASE WHEN status IN ('present', 'late') THEN 1 ELSE 0 END) AS INTEGER) AS days_present,
+               SUM(CASE WHEN status = 'absent' THEN weight ELSE 0 END) AS absent_days
+        FROM attendance_daily
+        GROUP BY staff_id, fiscal_year
+    ),
+    lv AS (
+        SELECT staff_id, {leave_fy} AS fiscal_year,
+               SUM(CASE WHEN leave_type = 'Annual' THEN total_days ELSE 0 END) AS annual_leave_taken,
+               SUM(CASE WHEN leave_type = 'Sick' THEN total_days ELSE 0 END) AS sick_leave_taken
+        FROM leave_requests
+        WHERE status = 'Approved'
+        GROUP BY staff_id, {leave_fy}
+    ),
+    keys AS (
+        SELECT staff_id, fiscal_year FROM att
+        UNION
+        SELECT staff_id, fiscal_year FROM lv
+    )
+    SELECT k.staff_id,
+           k.fiscal_year,
+           COALESCE(att.days_present, 0) AS days_present,
+           COALESCE(lv.annual_leave_taken, 0) AS annual_leave_taken,
+           COALESCE(lv.sick_leave_taken, 0) AS sick_leave_taken,
+           COALESCE(att.absent_days, 0) AS absent_days
+    FROM keys k
+    LEFT JOIN att ON att.staff_id = k.staff_id AND att.fiscal_year = k.fiscal_year
+    LEFT JOIN lv ON lv.staff_id = k.staff_id AND lv.fiscal_year = k.fiscal_year
+"""
+
+
+def _monthly_sql(dialect):
+    return _MONTHLY_SELECT.format(month_start=month_start_sql('work_date', dialect))
+
+
+def _fiscal_sql(dialect):
+    return _FISCAL_SELECT.format(leave_fy=fiscal_year_sql('start_date', dialect))
+
+
+_VIEW_VERSION = 'reporting v4'
+
+_RELATIONS = (
+    ('report_monthly_attendance', _monthly_sql, ('staff_id', 'month_start')),
+    ('report_fiscal_year_summary', _fiscal_sql, ('staff_id', 'fiscal_year')),
+)
+
+
+# =====================================================
+# CREATE / REFRESH
+# =====================================================
+
+def ensure_reporting_views(db):
+    """Create the reporting relations if missing (safe to call repeatedly)"""
+    ensure_archive_tables(db)
+    ensure_fact_table(db)
+    cache_metadata.create_all(db.engine)
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        with db.engine.begin() as conn:
+            for name, sql, key in _RELATIONS:
+                # The view comment records the definition version; views from
+                # an older version are rebuilt
+                current = conn.execute(
+                    text("SELECT obj_description(to_regclass(:name), 'pg_class')"), {'name': name}
+                ).scalar()
+                if current == _VIEW_VERSION:
+                    continue
+                conn.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {name}"))
+                conn.execute(text(f"CREATE MATERIALIZED VIEW {name} AS {sql(dialect)} WITH DATA"))
+                # A unique index is required for REFRESH ... CONCURRENTLY
+                conn.execute(text(f"CREATE UNIQUE INDEX ux_{name} ON {name} ({', '.join(key)})"))
+                conn.execute(text(f"COMMENT ON MATERIALIZED VIEW {name} IS '{_VIEW_VERSION}'"))
+    else:
+        with db.engine.begin() as conn:
+            for table in reporting_metadata.sorted_tables:
+                # Summary tables from an older version are rebuilt
+                columns = [row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table.name})")]
+                if columns and columns != [c.name for c in table.columns]:
+                    table.drop(conn)
+        reporting_metadata.create_all(db.engine)
+        refresh_reporting_views(db, concurrently=False)
+
+
+def refresh_reporting_views(db, concurrently=True):
+    """
+    Recompute all reporting relations.
+
+    Args:
+        db: Flask-SQLAlchemy instance (call inside an app context)
+        concurrently: PostgreSQL only - refresh without blocking readers
+
+    Returns:
+        float: refresh duration in seconds (including the fact sync)
+    """
+    started = _time.perf_counter()
+    changed = sync_facts(db)
+    dialect = db.engine.dialect.name
+    with db.engine.begin() as conn:
+        for name, sql, _key in _RELATIONS:
+            if dialect == 'postgresql':
+                mode = 'CONCURRENTLY ' if concurrently else ''
+                conn.execute(text(f"REFRESH MATERIALIZED VIEW {mode}{name}"))
+            else:
+                conn.execute(text(f"DELETE FROM {name}"))
+                conn.execute(text(f"INSERT INTO {name} {sql(dialect)}"))
+    # Only after the relations are refreshed, so a concurrent request
+    # cannot re-cache the old totals
+    invalidate_cached_reports(db, changed)
+    _state['last_refresh'] = _time.time()
+    return _time.perf_counter() - started
+
+
+def rebuild_reports(db):
+    """Rebuild facts, reporting relations and cache after a bulk load"""
+    rebuild_facts(db)
+    ensure_reporting_views(db)
+    refresh_reporting_views(db, concurrently=False)
+    clear_report_cache(db)
+
+
+# =====================================================
+# CLOSED-PERIOD CACHE
+# =====================================================
+
+def period_closed(period_end, today=None):
+    """True once no refresh recomputes the period's facts any more"""
+    today = today or date.today()
+    return period_end < today - timedelta(days=FACT_RECOMPUTE_DAYS)
+
+
+def report_cache_key(report, params):
+    """Cache key for a report and its parameters (includes the view version)"""
+    return f"{report}|{json.dumps(params, sort_keys=True, default=str)}|{_VIEW_VERSION}"
+
+
+def _cache_connection(db, read_only):
+    if read_only:
+        return db.engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+    return db.engine.begin()
+
+
+def _run_cache(db, fn, read_only=False):
+    """Run fn(conn) on report_cache, creating the table the first time"""
+    try:
+        with _cache_connection(db, read_only) as conn:
+            return fn(conn)
+    except (ProgrammingError, OperationalError) as e:
+        if 'report_cache' not in str(e):
+            raise
+    cache_metadata.create_all(db.engine)
+    with _cache_connection(db, read_only) as conn:
+        return fn(conn)
+
+
+def get_cached_reports(db, keys):
+    """
+    Look up cached results (one query).
+
+    Returns:
+        dict: cache_key -> decoded payload, for the keys that are cached
+    """
+    if not keys:
+        return {}
+    stmt = select(report_cache.c.cache_key, report_cache.c.payload).where(
+        report_cache.c.cache_key.in_(list(keys)))
+    rows = _run_cache(db, lambda conn: conn.execute(stmt).all(), read_only=True)
+    return {row.cache_key: json.loads(row.payload) for row in rows}
+
+
+def store_cached_reports(db, entries):
+    """
+    Cache results of closed periods; existing entries are kept.
+
+    Args:
+        entries: iterable of (cache_key, report, period_start, period_end, payload)
+    """
+    rows = [{'cache_key': key, 'report': report, 'period_start': start, 'period_end': end,
+             'payload': json.dumps(payload, default=str), 'created_at': datetime.utcnow()}
+            for key, report, start, end, payload in entries]
+    if not rows:
+        return
+    dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    stmt = dialect.insert(report_cache).on_conflict_do_nothing(index_elements=['cache_key'])
+    _run_cache(db, lambda conn: conn.execute(stmt, rows))
+
+
+def invalidate_cached_reports(db, ranges):
+    """Drop cached results whose period overlaps any (start, end) range"""
+    if not ranges:
+        return 0
+    stmt = delete(report_cache).where(or_(*[
+        and_(report_cache.c.period_start <= end, report_cache.c.period_end >= start)
+        for start, end in ranges
+    ]))
+    return _run_cache(db, lambda conn: conn.execute(stmt).rowcount)
+
+
+def clear_report_cache(db):
+    """Drop every cached result"""
+    return _run_cache(db, lambda conn: conn.execute(delete(report_cache)).rowcount)
+
+
+# =====================================================
+# BACKGROUND REFRESH
+# =====================================================
+
+_state = {'last_refresh': None, 'thread': None, 'periodic': True}
+_refresh_requested = threading.Event()
+_start_lock = threading.Lock()
+
+
+def request_refresh():
+    """Ask for a refresh soon (debounced); call after bulk writes"""
+    _refresh_requested.set()
+
+
+def disable_periodic_refresh():
+    """Only run requested refreshes here; the scheduler owns the periodic one"""
+    _state['periodic'] = False
+
+
+def refresh_pending():
+    """True while a requested refresh has not run yet"""
+    return _refresh_requested.is_set()
+
+
+def last_refresh_time():
+    """Unix time of the last completed refresh in this process, or None"""
+    return _state['last_refresh']
+
+
+def reporting_backlog():
+    """Pending refresh work for /readyz"""
+    last = _state['last_refresh']
+    return {
+        'report_refresh_pending': _refresh_requested.is_set(),
+        'seconds_since_report_refresh': round(_time.time() - last, 1) if last else None,
+    }
+
+
+def query_reporting(db, stmt):
+    """
+    Run a query against the reporting relations, creating them first if this
+    database has never had them (e.g. the first request after a deploy).
+    """
+    try:
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            return conn.execute(stmt).all()
+    except (ProgrammingError, OperationalError) as e:
+        if 'report_' not in str(e):
+            raise
+    ensure_reporting_views(db)
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        return conn.execute(stmt).all()
+
+
+def _refresh_loop(app, db):
+    try:
+        with app.app_context():
+            ensure_reporting_views(db)
+    except Exception as e:
+        logger.warning("⚠️ Could not create reporting views: %s", e)
+    while True:
+        requested = _refresh_requested.wait(
+            timeout=REPORT_REFRESH_SECONDS if _state['periodic'] else None)
+        if requested:
+            # Coalesce bursts of writes (e.g. an approval creating many rows)
+            _time.sleep(REPORT_REFRESH_DEBOUNCE_SECONDS)
+        _refresh_requested.clear()
+        try:
+            with app.app_context():
+                duration = refresh_reporting_views(db)
+            logger.info("📊 Reporting views refreshed in %.0f ms", duration * 1000)
+        except Exception as e:
+            logger.exception("⚠️ Reporting view refresh failed: %s", e)
+
+
+def start_refresher(app, db):
+    """Start the background refresh thread once per process"""
+    if REPORT_REFRESH_SECONDS <= 0:
+        return None
+    with _start_lock:
+        thread = _state['thread']
+        if thread is not None and thread.is_alive():
+            return thread
+        thread = threading.Thread(target=_refresh_loop, args=(app, db),
+                                  name='report-refresher', daemon=True)
+        thread.start()
+        _state['thread'] = thread
+        return thread
+
+
+def init_reporting(app, db):
+    """Start the refresher on the first request served by this process"""
+    @app.before_request
+    def _ensure_refresher():
+        thread = _state['thread']
+        if thread is None or not thread.is_alive():
+            start_refresher(app, db)
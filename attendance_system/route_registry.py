@@ -0,0 +1,39 @@
+"""
+Deferred route registration for the Attendance System
+Views are collected with @routes.route(...) when app.py is imported and
+installed on an application by create_app(). Endpoint names stay the plain
+function names (no blueprint prefix), so url_for('admin_login') etc. in the
+templates keep working.
+"""
+
+
+class RouteRegistry:
+    """Collects routes and request hooks until an app is created"""
+
+    def __init__(self):
+        self._routes = []
+        self._after_request = []
+
+    def route(self, rule, **options):
+        """Same signature as Flask.route()"""
+        def decorator(view):
+            self._routes.append((rule, options, view))
+            return view
+        return decorator
+
+    def after_request(self, hook):
+        self._after_request.append(hook)
+        return hook
+
+    def register(self, app):
+        """Install every collected route and hook on `app`"""
+        for rule, options, view in self._routes:
+            options = dict(options)
+            endpoint = options.pop('endpoint', view.__name__)
+            app.add_url_rule(rule, endpoint, view, **options)
+        for hook in self._after_request:
+            app.after_request(hook)
+        return app
+
+    def __len__(self):
+        return len(self._routes)
@@ -5,6 +5,7 @@ These routes are enabled when running on Render (RENDER env var is set)
 from flask import Blueprint, request, jsonify, render_template, redirect, url_for, session, make_response
 from datetime import datetime, date, timedelta
 from functools import wraps
+import logging
 import time
 import sys
 import os
@@ -185,7 +186,7 @@ def retry_on_db_error(max_retries=3, delay=0.1):
                     return func(*args, **kwargs)
                 except Exception as e:
                     last_exception = e
-                    print(f"Attempt {attempt + 1} failed: {str(e)}")
+                    logger.warning("Attempt %d failed: %s", attempt + 1, e)
                     if attempt < max_retries - 1:
                         time.sleep(delay)
                     continue
@@ -198,6 +199,8 @@ def retry_on_db_error(max_retries=3, delay=0.1):
 # ADMIN BLUEPRINT
 # =====================================================
 
+logger = logging.getLogger(__name__)
+
 admin_bp = Blueprint('admin', __name__)
 
 
@@ -268,9 +271,8 @@ def add_manual_leave():
         actual_days = calculate_leave_with_rate_multiplier(start_date, end_date, multiplier)
         
         # DEBUG: Print the actual days calculation
-        print(f"DEBUG: Start date: {start_date}, End date: {end_date}")
-        print(f"DEBUG: Multiplier: {multiplier}")
-        print(f"DEBUG: Calculated actual_days: {actual_days}")
+        logger.debug("Manual leave: %s to %s multiplier=%s actual_days=%s",
+                     start_date, end_date, multiplier, actual_days)
         
         # Calculate fiscal year using October 1st logic
         if start_date.month >= 10:
@@ -316,8 +318,7 @@ def add_manual_leave():
                             success=f'Successfully added leave for {staff_member.first_name} {staff_member.last_name}. Duration: {actual_days} days (Fiscal Year: {fiscal_year})')
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ ERROR adding manual leave: %s", e)
         return render_template('admin/add_manual_leave.html', 
                             employees=Staff.query.filter_by(is_active=True).order_by(Staff.employee_code.asc()).all(),
                             error=f'Error: {str(e)}')
@@ -2,17 +2,15 @@
 Staff Routes for the Attendance System
 These routes are enabled when running locally (no RENDER env var)
 """
-import pytz
 from flask import Blueprint, request, jsonify, render_template, session
 from datetime import datetime, date, timezone, timedelta
 from functools import wraps
-
-# Nairobi timezone (Africa/Nairobi - UTC+3)
-NAIROBI_TIMEZONE = pytz.timezone('Africa/Nairobi')
+import logging
 
 def get_nairobi_now():
-    """Get current datetime in Nairobi timezone"""
-    return datetime.now(NAIROBI_TIMEZONE)
+    """Get current datetime in Nairobi timezone (Africa/Nairobi - UTC+3)"""
+    import pytz
+    return datetime.now(pytz.timezone('Africa/Nairobi'))
 
 def get_nairobi_today():
     """Get today's date in Nairobi timezone"""
@@ -22,6 +20,8 @@ def get_nairobi_today():
 # STAFF BLUEPRINT
 # =====================================================
 
+logger = logging.getLogger(__name__)
+
 staff_bp = Blueprint('staff', __name__)
 
 # =====================================================
@@ -186,8 +186,7 @@ def get_today_attendance():
     
     try:
         # Use Nairobi timezone for today's date (staff is in Nairobi, server is in Oregon)
-        nairobi_tz = pytz.timezone('Africa/Nairobi')
-        now_nairobi = datetime.now(nairobi_tz)
+        now_nairobi = get_nairobi_now()
         today = now_nairobi.date()
         
         employees = Employee.query.filter_by(IsActive=True).all()
@@ -236,7 +235,7 @@ def get_today_attendance():
                 if att.ClockIn and not att.ClockOut:
                     # Combine work date with clock in time
                     clock_in_datetime = datetime.combine(att.WorkDate, att.ClockIn)
-                    clock_in_datetime = nairobi_tz.localize(clock_in_datetime)
+                    clock_in_datetime = now_nairobi.tzinfo.localize(clock_in_datetime)
                     hours_since_clock_in = (now_nairobi - clock_in_datetime).total_seconds() / 3600
                     
                     if hours_since_clock_in <= 14:
@@ -357,7 +356,8 @@ def create_leave_request():
         # Step 2: Apply the multiplier from the dropdown
         total_days = calendar_days * multiplier
         
-        print(f"DEBUG Leave: Start={start_date}, End={end_date}, Calendar Days={calendar_days}, Multiplier={multiplier}, Final Days={total_days}")
+        logger.debug("Leave: start=%s end=%s calendar_days=%s multiplier=%s final_days=%s",
+                     start_date, end_date, calendar_days, multiplier, total_days)
 
         if leave_type in ['Annual', 'Sick']:
             fiscal_year = get_fiscal_year_python(start_date)
@@ -0,0 +1,598 @@
+"""
+Background job scheduler for the Attendance System
+Periodic maintenance runs inside the app instead of cron. Every process
+(each gunicorn worker) starts a scheduler thread, but only the elected
+leader runs jobs, so each job runs once per cluster:
+
+- PostgreSQL, direct connections: session advisory lock held on a
+  dedicated connection; when the leader dies its connection closes and the
+  lock passes to another process on its next tick
+- SQLite, or PostgreSQL behind the transaction pooler (session locks do not
+  survive there): a lease row in scheduler_leader, renewed every tick and
+  taken over once it is SCHEDULER_LEASE_SECONDS old
+
+Jobs:
+
+    refresh_reports       REPORT_REFRESH_SECONDS   facts and reporting views
+    warm_report_cache     6 h                      newly closed report periods
+    drain_outbox          OUTBOX_DRAIN_SECONDS     queued emails (outbox.py)
+    backup                SCHEDULER_BACKUP_HOURS   backup.py
+    fiscal_year_rollover  1 h                      new fiscal year: reset annual
+                                                   leave, archive closed years
+    close_stale_shifts    1 h                      casual shifts nobody can
+                                                   clock out any more
+    prune_job_history     24 h                     old scheduler_runs rows
+
+A job is due when its last run in scheduler_runs started longer ago than
+its interval, so a new leader carries on the schedule instead of running
+everything again. Jobs run on their own threads (a long backup never
+delays the outbox) and never overlap themselves. Every run is recorded
+with its duration, outcome and result:
+
+    GET  /admin/jobs              jobs, last run, durations, next due, outbox
+    GET  /admin/jobs/history      ?job=backup&limit=50
+    POST /admin/jobs/<name>/run   run on the leader's next tick
+
+With the scheduler enabled, workers no longer refresh the reporting views
+on their own timer (reporting.py) and approval emails go through the
+outbox.
+
+Environment:
+    SCHEDULER_ENABLED          1 (default) or 0
+    SCHEDULER_TICK_SECONDS     leader check / due-job scan interval (default 30)
+    SCHEDULER_LEASE_SECONDS    lease row expiry (default 90)
+    SCHEDULER_BACKUP_HOURS     hours between backups (default 0 = off: backup.py
+                               runs from cron / a GitHub Action); opting in
+                               also needs BACKUP_DIR (backup.py), so dumps
+                               never land in the app directory
+    SCHEDULER_HISTORY_DAYS     days of job history kept (default 30)
+    OUTBOX_DRAIN_SECONDS       outbox drain interval (default 60)
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time as _time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from flask import jsonify, request, session
+from sqlalchemy import (Column, DateTime, Index, Integer, MetaData, String, Table, Text, case,
+                        delete, func, or_, select, text)
+from sqlalchemy.dialects import postgresql, sqlite
+
+from archive import archive_closed_fiscal_years, fiscal_year_of
+from casual_workers import close_stale_shifts
+from db_pool import resolve_profile
+from historical_reports import warm_report_cache
+from outbox import drain_outbox, outbox_status
+from reporting import (REPORT_REFRESH_SECONDS, disable_periodic_refresh, ensure_reporting_views,
+                       refresh_reporting_views)
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', '1') == '1'
+SCHEDULER_TICK_SECONDS = float(os.getenv('SCHEDULER_TICK_SECONDS', '30'))
+SCHEDULER_LEASE_SECONDS = int(os.getenv('SCHEDULER_LEASE_SECONDS', '90'))
+SCHEDULER_BACKUP_HOURS = float(os.getenv('SCHEDULER_BACKUP_HOURS', '0'))
+SCHEDULER_HISTORY_DAYS = int(os.getenv('SCHEDULER_HISTORY_DAYS', '30'))
+OUTBOX_DRAIN_SECONDS = int(os.getenv('OUTBOX_DRAIN_SECONDS', '60'))
+
+# Arbitrary application-wide key for pg_try_advisory_lock
+SCHEDULER_LOCK_KEY = 0x41545444
+
+
+def process_name():
+    """Identifies this process in scheduler_runs and the lease row (read
+    per call: under gunicorn --preload this module is imported before fork)"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# Created by ensure_scheduler_tables(), like the archive tables
+scheduler_metadata = MetaData()
+
+scheduler_runs = Table(
+    'scheduler_runs', scheduler_metadata,
+    Column('id', Integer, primary_key=True),
+    Column('job', String(50), nullable=False),
+    # queued (run requested) / running / ok / failed / abandoned
+    Column('status', String(10), nullable=False),
+    Column('started_at', DateTime),
+    Column('finished_at', DateTime),
+    Column('duration_ms', Integer),
+    Column('detail', Text),
+    Column('error', Text),
+    Column('holder', String(100)),
+    Index('ix_scheduler_runs_job_started', 'job', 'started_at'),
+)
+
+scheduler_leader = Table(
+    'scheduler_leader', scheduler_metadata,
+    Column('name', String(50), primary_key=True),
+    Column('holder', String(100), nullable=False),
+    Column('expires_at', DateTime, nullable=False),
+)
+
+
+def ensure_scheduler_tables(db):
+    """Create scheduler_runs and scheduler_leader if missing"""
+    scheduler_metadata.create_all(db.engine)
+
+
+# =====================================================
+# LEADER ELECTION
+# =====================================================
+
+class AdvisoryLockLeader:
+    """PostgreSQL session advisory lock on a connection kept out of the pool"""
+
+    election = 'advisory_lock'
+
+    def __init__(self, db):
+        self.db = db
+        self.conn = None
+
+    def acquire(self):
+        if self.conn is not None:
+            try:
+                self.conn.execute(text('SELECT 1'))
+                return True
+            except Exception as e:
+                # The lock went with the connection
+                logger.warning("⚠️ Scheduler lock connection lost: %s", e)
+                self.release()
+        conn = self.db.engine.connect()
+        try:
+            # No transaction stays open while the lock is held; the connection
+            # is kept for the leader's lifetime, so the pool opens a replacement
+            conn.execution_options(isolation_level='AUTOCOMMIT')
+            conn.detach()
+            locked = conn.execute(text('SELECT pg_try_advisory_lock(:key)'),
+                                  {'key': SCHEDULER_LOCK_KEY}).scalar()
+        except Exception:
+            conn.close()
+            raise
+        if locked:
+            self.conn = conn
+            return True
+        conn.close()
+        return False
+
+    def release(self):
+        if self.conn is not None:
+            try:
+                # Ending the session releases the lock
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+
+
+class LeaseLeader:
+    """Lease row in scheduler_leader, renewed by the holder on every tick"""
+
+    election = 'lease'
+
+    def __init__(self, db, name='scheduler'):
+        self.db = db
+        self.name = name
+
+    def acquire(self):
+        now = datetime.utcnow()
+        values = {'holder': process_name(), 'expires_at': now + timedelta(seconds=SCHEDULER_LEASE_SECONDS)}
+        dialect = postgresql if self.db.engine.dialect.name == 'postgresql' else sqlite
+        with self.db.engine.begin() as conn:
+            claimed = conn.execute(
+                scheduler_leader.update().where(
+                    scheduler_leader.c.name == self.name,
+                    or_(scheduler_leader.c.holder == process_name(), scheduler_leader.c.expires_at < now),
+                ).values(**values)
+            ).rowcount
+            if not claimed:
+                claimed = conn.execute(
+                    dialect.insert(scheduler_leader).values(name=self.name, **values)
+                    .on_conflict_do_nothing(index_elements=['name'])
+                ).rowcount
+        return claimed > 0
+
+    def release(self):
+        with self.db.engine.begin() as conn:
+            conn.execute(scheduler_leader.update().where(
+                scheduler_leader.c.name == self.name, scheduler_leader.c.holder == process_name(),
+            ).values(expires_at=datetime.utcnow()))
+
+
+def make_leader(db):
+    """Advisory lock on direct PostgreSQL connections, lease row otherwise"""
+    if resolve_profile(str(db.engine.url)) == 'direct':
+        return AdvisoryLockLeader(db)
+    return LeaseLeader(db)
+
+
+# =====================================================
+# JOBS
+# =====================================================
+# Each job takes the db and returns a JSON-compatible result (or None),
+# stored in scheduler_runs.detail; raising marks the run failed.
+
+def refresh_reports_job(db):
+    if not _state['views_ready']:
+        # Normally created by the first worker's refresher; not on a fresh database
+        ensure_reporting_views(db)
+        _state['views_ready'] = True
+    return {'refresh_ms': round(refresh_reporting_views(db) * 1000)}
+
+
+def warm_report_cache_job(db):
+    return warm_report_cache(db)
+
+
+def drain_outbox_job(db):
+    from app import deliver_email
+    return drain_outbox(db, deliver_email)
+
+
+def backup_job(db):
+    if not os.getenv('BACKUP_DIR'):
+        raise RuntimeError('SCHEDULER_BACKUP_HOURS is set but BACKUP_DIR is not: '
+                           'point it at a volume outside the app directory')
+    import backup
+    if not backup.create_backup_directory() or not backup.perform_backup():
+        raise RuntimeError(f'backup failed (see {backup.METRICS_PATH})')
+
+
+def fiscal_year_rollover_job(db, today=None):
+    """
+    Start a new fiscal year once: reset annual leave to 21 days for active
+    staff, archive closed fiscal years and cache the year that just closed.
+
+    The fiscal year handled last is kept in the run's detail. The very first
+    run only records the current year, so deploying the scheduler never
+    resets balances mid-year.
+    """
+    today = today or date.today()
+    current = fiscal_year_of(today)
+    with db.engine.connect() as conn:
+        last = conn.execute(
+            select(scheduler_runs.c.detail)
+            .where(scheduler_runs.c.job == 'fiscal_year_rollover', scheduler_runs.c.status == 'ok')
+            .order_by(scheduler_runs.c.started_at.desc()).limit(1)
+        ).scalar()
+    previous = json.loads(last).get('fiscal_year') if last else None
+    if previous is None:
+        return {'fiscal_year': current, 'baseline': True}
+    if current <= previous:
+        return {'fiscal_year': previous}
+
+    with db.engine.begin() as conn:
+        reset = conn.execute(text("UPDATE staff SET leave_balance = 21 WHERE is_active = :active"),
+                             {'active': True}).rowcount
+    logger.info("🗓️ FY%d started: annual leave reset to 21 days for %d employee(s)", current, reset)
+    archived = archive_closed_fiscal_years(db, today)
+    warmed = warm_report_cache(db, today)
+    return {'fiscal_year': current, 'leave_reset': reset,
+            'archived': archived['archived'], 'warmed': warmed}
+
+
+def close_stale_shifts_job(db):
+    return {'closed': close_stale_shifts(db)}
+
+
+def prune_job_history_job(db):
+    cutoff = datetime.utcnow() - timedelta(days=SCHEDULER_HISTORY_DAYS)
+    with db.engine.begin() as conn:
+        pruned = conn.execute(delete(scheduler_runs).where(scheduler_runs.c.started_at < cutoff)).rowcount
+    return {'pruned': pruned}
+
+
+Job = namedtuple('Job', 'name interval fn')
+
+# interval in seconds; 0 disables a job
+JOBS = {job.name: job for job in (
+    Job('refresh_reports', REPORT_REFRESH_SECONDS, refresh_reports_job),
+    Job('warm_report_cache', 6 * 3600, warm_report_cache_job),
+    Job('drain_outbox', OUTBOX_DRAIN_SECONDS, drain_outbox_job),
+    Job('backup', int(SCHEDULER_BACKUP_HOURS * 3600), backup_job),
+    Job('fiscal_year_rollover', 3600, fiscal_year_rollover_job),
+    Job('close_stale_shifts', 3600, close_stale_shifts_job),
+    Job('prune_job_history', 24 * 3600, prune_job_history_job),
+)}
+
+
+# =====================================================
+# RUNNER
+# =====================================================
+
+_state = {'thread': None, 'leader': False, 'election': None, 'views_ready': False}
+_running = set()
+_running_lock = threading.Lock()
+_start_lock = threading.Lock()
+
+
+def _job_overview(conn):
+    """job -> last start, queued run id, run count, failures, avg / max duration"""
+    finished = scheduler_runs.c.status.in_(('ok', 'failed'))
+    rows = conn.execute(
+        select(
+            scheduler_runs.c.job,
+            func.max(scheduler_runs.c.started_at).label('last_started'),
+            func.min(case((scheduler_runs.c.status == 'queued', scheduler_runs.c.id))).label('queued_id'),
+            func.count(case((finished, 1))).label('runs'),
+            func.count(case((scheduler_runs.c.status == 'failed', 1))).label('failures'),
+            func.avg(case((finished, scheduler_runs.c.duration_ms))).label('avg_ms'),
+            func.max(case((finished, scheduler_runs.c.duration_ms))).label('max_ms'),
+        ).group_by(scheduler_runs.c.job)
+    ).all()
+    return {row.job: row for row in rows}
+
+
+def due_jobs(db, now=None):
+    """[(job, queued run id or None)] of jobs to start now"""
+    now = now or datetime.utcnow()
+    with db.engine.connect() as conn:
+        overview = _job_overview(conn)
+    due = []
+    for job in JOBS.values():
+        row = overview.get(job.name)
+        if row is not None and row.queued_id is not None:
+            due.append((job, row.queued_id))
+        elif job.interval > 0 and (row is None or row.last_started is None
+                                   or row.last_started <= now - timedelta(seconds=job.interval)):
+            due.append((job, None))
+    return due
+
+
+def run_job(app, db, job, queued_id=None):
+    """Run one job in an app context and record the run; returns the run row id"""
+    started = datetime.utcnow()
+    with app.app_context():
+        with db.engine.begin() as conn:
+            values = {'status': 'running', 'started_at': started, 'holder': process_name()}
+            if queued_id is not None:
+                conn.execute(scheduler_runs.update().where(scheduler_runs.c.id == queued_id).values(**values))
+                run_id = queued_id
+            else:
+                run_id = conn.execute(scheduler_runs.insert().values(job=job.name, **values)).inserted_primary_key[0]
+
+        clock = _time.perf_counter()
+        status, detail, error = 'ok', None, None
+        try:
+            result = job.fn(db)
+            detail = json.dumps(result, default=str) if result is not None else None
+        except Exception as e:
+            logger.exception("❌ Job %s failed: %s", job.name, e)
+            status, error = 'failed', str(e)[:2000]
+        duration_ms = round((_time.perf_counter() - clock) * 1000)
+
+        with db.engine.begin() as conn:
+            conn.execute(scheduler_runs.update().where(scheduler_runs.c.id == run_id).values(
+                status=status, finished_at=datetime.utcnow(), duration_ms=duration_ms,
+                detail=detail, error=error))
+    logger.info("⏱️ Job %s %s in %d ms", job.name, status, duration_ms)
+    return run_id
+
+
+def _job_thread(app, db, job, queued_id):
+    try:
+        run_job(app, db, job, queued_id)
+    except Exception as e:
+        logger.warning("⚠️ Could not record job %s: %s", job.name, e)
+    finally:
+        with _running_lock:
+            _running.discard(job.name)
+
+
+def _start_due_jobs(app, db):
+    for job, queued_id in due_jobs(db):
+        with _running_lock:
+            if job.name in _running:
+                continue
+            _running.add(job.name)
+        threading.Thread(target=_job_thread, args=(app, db, job, queued_id),
+                         name=f'job-{job.name}', daemon=True).start()
+
+
+def _abandon_runs(db):
+    """Close runs a previous leader left in 'running'"""
+    with db.engine.begin() as conn:
+        abandoned = conn.execute(scheduler_runs.update().where(
+            scheduler_runs.c.status == 'running', scheduler_runs.c.holder != process_name(),
+        ).values(status='abandoned', finished_at=datetime.utcnow())).rowcount
+    if abandoned:
+        logger.warning("⚠️ Marked %d job run(s) of a previous leader as abandoned", abandoned)
+
+
+def _scheduler_loop(app, db):
+    leader = None
+    while True:
+        try:
+            with app.app_context():
+                if leader is None:
+                    ensure_scheduler_tables(db)
+                    leader = make_leader(db)
+                    _state['election'] = leader.election
+                is_leader = leader.acquire()
+                if is_leader and not _state['leader']:
+                    logger.info("👑 Scheduler leader: %s (%s)", process_name(), leader.election)
+                    _abandon_runs(db)
+                elif _state['leader'] and not is_leader:
+                    logger.warning("⚠️ Scheduler leadership lost: %s", process_name())
+                _state['leader'] = is_leader
+                if is_leader:
+                    _start_due_jobs(app, db)
+        except Exception as e:
+            logger.warning("⚠️ Scheduler tick failed: %s", e)
+            _state['leader'] = False
+        _time.sleep(SCHEDULER_TICK_SECONDS)
+
+
+def start_scheduler(app, db):
+    """Start the scheduler thread once per process"""
+    if not SCHEDULER_ENABLED:
+        return None
+    with _start_lock:
+        thread = _state['thread']
+        if thread is not None and thread.is_alive():
+            return thread
+        thread = threading.Thread(target=_scheduler_loop, args=(app, db),
+                                  name='job-scheduler', daemon=True)
+        thread.start()
+        _state['thread'] = thread
+        return thread
+
+
+# =====================================================
+# STATUS
+# =====================================================
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _run_dict(row):
+    return {
+        'id': row.id,
+        'job': row.job,
+        'status': row.status,
+        'started_at': _iso(row.started_at),
+        'finished_at': _iso(row.finished_at),
+        'duration_ms': row.duration_ms,
+        'detail': json.loads(row.detail) if row.detail else None,
+        'error': row.error,
+        'holder': row.holder,
+    }
+
+
+def scheduler_status(db):
+    """Per-job schedule, last run and duration figures, plus the leader"""
+    ensure_scheduler_tables(db)
+    with db.engine.connect() as conn:
+        overview = _job_overview(conn)
+        last_runs = {row.job: row for row in conn.execute(
+            select(scheduler_runs).where(scheduler_runs.c.id.in_(
+                select(func.max(scheduler_runs.c.id))
+                .where(scheduler_runs.c.started_at.is_not(None))
+                .group_by(scheduler_runs.c.job)
+            ))
+        )}
+        leader = conn.execute(select(scheduler_runs.c.holder)
+                              .where(scheduler_runs.c.started_at.is_not(None))
+                              .order_by(scheduler_runs.c.id.desc()).limit(1)).scalar()
+
+    jobs = []
+    for job in JOBS.values():
+        row = overview.get(job.name)
+        last = last_runs.get(job.name)
+        next_due = None
+        if job.interval > 0:
+            next_due = (row.last_started + timedelta(seconds=job.interval)
+                        if row is not None and row.last_started else datetime.utcnow())
+        jobs.append({
+            'name': job.name,
+            'interval_seconds': job.interval,
+            'enabled': job.interval > 0,
+            'queued': row is not None and row.queued_id is not None,
+            'next_due_at': _iso(next_due),
+            'runs': row.runs if row is not None else 0,
+            'failures': row.failures if row is not None else 0,
+            'avg_duration_ms': round(float(row.avg_ms)) if row is not None and row.avg_ms is not None else None,
+            'max_duration_ms': row.max_ms if row is not None else None,
+            'last_run': _run_dict(last) if last is not None else None,
+        })
+    return {
+        'enabled': SCHEDULER_ENABLED,
+        'election': _state['election'],
+        'this_process': process_name(),
+        'this_process_is_leader': _state['leader'],
+        'last_leader': leader,
+        'jobs': jobs,
+    }
+
+
+def job_history(db, job=None, limit=50):
+    """Most recent runs, newest first"""
+    ensure_scheduler_tables(db)
+    stmt = select(scheduler_runs).order_by(scheduler_runs.c.id.desc()).limit(limit)
+    if job:
+        stmt = stmt.where(scheduler_runs.c.job == job)
+    with db.engine.connect() as conn:
+        return [_run_dict(row) for row in conn.execute(stmt)]
+
+
+def queue_job(db, name):
+    """Ask the leader to run a job on its next tick; returns the run id"""
+    ensure_scheduler_tables(db)
+    with db.engine.begin() as conn:
+        queued = conn.execute(select(scheduler_runs.c.id).where(
+            scheduler_runs.c.job == name, scheduler_runs.c.status == 'queued')).scalar()
+        if queued is not None:
+            return queued
+        return conn.execute(scheduler_runs.insert().values(
+            job=name, status='queued', holder=process_name())).inserted_primary_key[0]
+
+
+# =====================================================
+# ADMIN ROUTES
+# =====================================================
+
+def init_scheduler(app, db):
+    """Start the scheduler on the first request served by this process and
+    register the admin job routes"""
+    if SCHEDULER_ENABLED:
+        disable_periodic_refresh()
+
+        @app.before_request
+        def _ensure_scheduler():
+            thread = _state['thread']
+            if thread is None or not thread.is_alive():
+                start_scheduler(app, db)
+
+    @app.route('/admin/jobs')
+    def admin_jobs():
+        """Job schedule, last runs and durations, leader and outbox backlog"""
+        if not session.get('admin_logged_in'):
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+        try:
+            return jsonify({'success': True, **scheduler_status(db), 'outbox': outbox_status(db)})
+        except Exception as e:
+            logger.exception("❌ ERROR loading job status: %s", e)
+            return jsonify({'success': False, 'error': f'Database error: {str(e)}'}), 500
+
+    @app.route('/admin/jobs/history')
+    def admin_job_history():
+        """Recent job runs (?job=<name>&limit=<n>, at most 500)"""
+        if not session.get('admin_logged_in'):
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+        job = request.args.get('job') or None
+        if job is not None and job not in JOBS:
+            return jsonify({'success': False, 'error': f'Unknown job: {job}'}), 400
+        try:
+            limit = int(request.args.get('limit', 50))
+        except ValueError:
+            return jsonify({'success': False, 'error': 'limit must be a number'}), 400
+        if not 1 <= limit <= 500:
+            return jsonify({'success': False, 'error': 'limit must be between 1 and 500'}), 400
+        try:
+            return jsonify({'success': True, 'runs': job_history(db, job, limit)})
+        except Exception as e:
+            logger.exception("❌ ERROR loading job history: %s", e)
+            return jsonify({'success': False, 'error': f'Database error: {str(e)}'}), 500
+
+    @app.route('/admin/jobs/<name>/run', methods=['POST'])
+    def admin_run_job(name):
+        """Queue a job for the leader's next tick"""
+        if not session.get('admin_logged_in'):
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+        if name not in JOBS:
+            return jsonify({'success': False, 'error': f'Unknown job: {name}'}), 404
+        if not SCHEDULER_ENABLED:
+            return jsonify({'success': False, 'error': 'Scheduler is disabled (SCHEDULER_ENABLED=0)'}), 409
+        try:
+            run_id = queue_job(db, name)
+            logger.info("⏱️ Job %s queued by admin (run %s)", name, run_id)
+            return jsonify({'success': True, 'run_id': run_id, 'job': name}), 202
+        except Exception as e:
+            logger.exception("❌ ERROR queueing job %s: %s", name, e)
+            return jsonify({'success': False, 'error': f'Database error: {str(e)}'}), 500
@@ -0,0 +1,251 @@
+"""
+Slow-query log for the Attendance System
+Times every SQL statement with engine events and groups them by
+fingerprint: the statement with literals, bind parameters and IN-lists
+replaced by `?`, so `WHERE staff_id = 7` and `WHERE staff_id = 12` count as
+one query. The admin page lists the top fingerprints by total time, which
+is where indexing and caching work pays off.
+
+Statements slower than SLOW_QUERY_MS are sampled (SLOW_QUERY_SAMPLE_RATE):
+the sample keeps the duration, row count, calling endpoint and the line of
+our code that issued it, and is logged as a 🐢 warning.
+
+    GET /admin/slow-queries        - admin page (top N by total time)
+    GET /admin/slow-queries.json   - the same data as JSON
+
+Totals roll over every SLOW_QUERY_WINDOW_SECONDS; the page shows the
+current and the previous window.
+
+Environment:
+    SLOW_QUERY_MS               sample statements slower than this (default 200)
+    SLOW_QUERY_SAMPLE_RATE      fraction of slow statements sampled (default 1.0)
+    SLOW_QUERY_TOP_N            fingerprints listed (default 25)
+    SLOW_QUERY_WINDOW_SECONDS   rolling window (default 3600)
+"""
+
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time as _time
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+
+from flask import has_request_context, jsonify, render_template, request, session
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv('SLOW_QUERY_SAMPLE_RATE', '1.0'))
+SLOW_QUERY_TOP_N = int(os.getenv('SLOW_QUERY_TOP_N', '25'))
+SLOW_QUERY_WINDOW_SECONDS = int(os.getenv('SLOW_QUERY_WINDOW_SECONDS', '3600'))
+
+# Fingerprints kept per window; the cheapest are dropped beyond this
+_MAX_FINGERPRINTS = 1000
+_SAMPLES_PER_FINGERPRINT = 5
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# =====================================================
+# FINGERPRINTS
+# =====================================================
+
+_COMMENTS = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+# %(name)s / %s (psycopg2), :name (but not ::casts), ? (sqlite), $1 (asyncpg)
+_BINDS = re.compile(r'%\(\w+\)s|%s|(?<!:):\w+|\$\d+')
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_ROWS = re.compile(r'\(\?\)(?:\s*,\s*\(\?\))+')
+_SPACES = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement):
+    """
+    Statement text with literals and bind parameters replaced by `?`.
+
+    Args:
+        statement: SQL as sent to the driver
+
+    Returns:
+        str: normalized statement (IN-lists and VALUES rows collapse to `(?)`)
+    """
+    text = _COMMENTS.sub(' ', statement)
+    text = _STRINGS.sub('?', text)
+    text = _BINDS.sub('?', text)
+    text = _NUMBERS.sub('?', text)
+    text = _LISTS.sub('(?)', text)
+    text = _ROWS.sub('(?)', text)
+    return _SPACES.sub(' ', text).strip()
+
+
+def caller_location():
+    """`file.py:line in function` of the innermost frame in this repo"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(HERE) and filename != __file__
+                and 'site-packages' not in filename):
+            return f"{os.path.relpath(filename, HERE)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+# =====================================================
+# ROLLING AGGREGATES
+# =====================================================
+
+class SlowQueryLog:
+    """Per-fingerprint totals for the current and previous window"""
+
+    def __init__(self, threshold_ms=None, sample_rate=None, window_seconds=None):
+        self.threshold_ms = SLOW_QUERY_MS if threshold_ms is None else threshold_ms
+        self.sample_rate = SLOW_QUERY_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.window_seconds = SLOW_QUERY_WINDOW_SECONDS if window_seconds is None else window_seconds
+        self._lock = threading.Lock()
+        self._current = {}
+        self._previous = {}
+        self._window_started = _time.time()
+
+    def record(self, statement, duration_ms, rows=None):
+        """
+        Add one executed statement; returns the sample dict if it was
+        slow and sampled, else None.
+        """
+        fp = fingerprint(statement)
+        sample = None
+        if duration_ms >= self.threshold_ms and random.random() < self.sample_rate:
+            sample = {
+                'at': datetime.utcnow().isoformat(),
+                'duration_ms': round(duration_ms, 2),
+                'rows': rows,
+                'endpoint': request.endpoint if has_request_context() else None,
+                'location': caller_location(),
+            }
+
+        with self._lock:
+            self._rotate()
+            entry = self._current.get(fp)
+            if entry is None:
+                if len(self._current) >= _MAX_FINGERPRINTS:
+                    cheapest = min(self._current, key=lambda k: self._current[k]['total_ms'])
+                    del self._current[cheapest]
+                entry = self._current[fp] = {
+                    'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'slow_calls': 0,
+                    'example': statement[:1000],
+                    'samples': deque(maxlen=_SAMPLES_PER_FINGERPRINT),
+                }
+            entry['calls'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            entry['rows'] += rows or 0
+            if duration_ms >= self.threshold_ms:
+                entry['slow_calls'] += 1
+            if sample is not None:
+                entry['samples'].append(sample)
+        return sample
+
+    def _rotate(self):
+        if _time.time() - self._window_started >= self.window_seconds:
+            self._previous = self._current
+            self._current = {}
+            self._window_started = _time.time()
+
+    def top(self, limit=None):
+        """
+        Fingerprints by total time over the current and previous window.
+
+        Returns:
+            list of dict: fingerprint, calls, total_ms, avg_ms, max_ms,
+                          rows, slow_calls, example, samples
+        """
+        limit = SLOW_QUERY_TOP_N if limit is None else limit
+        with self._lock:
+            self._rotate()
+            merged = {}
+            for window in (self._previous, self._current):
+                for fp, entry in window.items():
+                    row = merged.setdefault(fp, {
+                        'fingerprint': fp, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                        'rows': 0, 'slow_calls': 0, 'example': entry['example'], 'samples': [],
+                    })
+                    for key in ('calls', 'total_ms', 'rows', 'slow_calls'):
+                        row[key] += entry[key]
+                    row['max_ms'] = max(row['max_ms'], entry['max_ms'])
+                    row['samples'].extend(entry['samples'])
+
+        rows = sorted(merged.values(), key=lambda r: r['total_ms'], reverse=True)[:limit]
+        for row in rows:
+            row['avg_ms'] = round(row['total_ms'] / row['calls'], 2)
+            row['total_ms'] = round(row['total_ms'], 2)
+            row['max_ms'] = round(row['max_ms'], 2)
+            row['samples'] = row['samples'][-_SAMPLES_PER_FINGERPRINT:]
+        return rows
+
+    def snapshot(self, limit=None):
+        """JSON-ready dump of the log"""
+        return {
+            'threshold_ms': self.threshold_ms,
+            'sample_rate': self.sample_rate,
+            'window_seconds': self.window_seconds,
+            'window_started': datetime.utcfromtimestamp(self._window_started).isoformat(),
+            'queries': self.top(limit),
+        }
+
+
+slow_query_log = SlowQueryLog()
+
+
+def attach_slow_query_listeners(engine, log=None):
+    """Time every statement on `engine` into the slow-query log (idempotent)"""
+    log = slow_query_log if log is None else log
+    if getattr(engine, '_attendance_slow_query_log', False):
+        return
+    engine._attendance_slow_query_log = True
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_slow_query_started', []).append(_time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['_slow_query_started'].pop()
+        duration_ms = (_time.perf_counter() - started) * 1000
+        rows = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None
+        sample = log.record(statement, duration_ms, rows)
+        if sample is not None:
+            logger.warning("🐢 %.0f ms %s", sample['duration_ms'], fingerprint(statement)[:200],
+                           extra={'location': sample['location'], 'rows': sample['rows']})
+
+    @event.listens_for(engine, 'handle_error')
+    def _failed(context):
+        conn = context.connection
+        if conn is not None and conn.info.get('_slow_query_started'):
+            conn.info['_slow_query_started'].pop()
+
+
+def init_slow_query_log(app, db):
+    """Attach the engine listeners and register the admin pages"""
+    with app.app_context():
+        attach_slow_query_listeners(db.engine)
+
+    @app.route('/admin/slow-queries')
+    def admin_slow_queries():
+        """Top statements by total database time"""
+        if not session.get('admin_logged_in'):
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+        return render_template('admin/slow_queries.html', log=slow_query_log.snapshot())
+
+    @app.route('/admin/slow-queries.json')
+    def admin_slow_queries_json():
+        """Slow-query log as JSON (for saving or diffing)"""
+        if not session.get('admin_logged_in'):
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+        limit = request.args.get('limit', type=int)
+        return jsonify({'success': True, **slow_query_log.snapshot(limit)})
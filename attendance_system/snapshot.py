@@ -0,0 +1,361 @@
+"""
+Database Snapshots: Export / Import for Fast Environment Seeding
+----------------------------------------------------------------
+Exports every table to one compressed, schema-versioned bundle and loads it
+back into any configured database (SQLite or PostgreSQL), so a developer
+machine or the kiosk box can be seeded with a production-sized dataset in
+seconds instead of running sample_data.sql, seed_local_data.py or a full
+migration.
+
+Bundle (an uncompressed tar of compressed members):
+
+    manifest.json              format, schema_version, created_at, source
+                               dialect and, per table, its columns and rows
+    tables/<table>.ndjson.gz   one JSON array per row in column order (dates,
+                               times and timestamps as ISO strings)
+
+schema_version is a hash of the app's tables and columns. Importing a
+bundle from another schema version copies the columns both sides have and
+warns; tables missing a required column are skipped.
+
+Export reads each table in primary-key order through a server-side cursor
+(stream_results), so memory stays flat. Import creates the schema, then in
+one transaction drops the secondary indexes (and, on PostgreSQL, the foreign
+keys), bulk-loads every table (COPY on PostgreSQL, large executemany
+batches on SQLite), rebuilds the indexes, re-adds the foreign keys (each
+validated in one pass), moves the id sequences past the loaded ids and
+finally refreshes the reporting views.
+
+Usage:
+    python snapshot.py export                        # snapshot_YYYYMMDD_HHMMSS.tar
+    python snapshot.py export prod.tar
+    python snapshot.py import prod.tar --reset       # replace the local data
+    DATABASE_URL=postgresql://... python snapshot.py import prod.tar --reset
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import sys
+import tarfile
+import tempfile
+import time as _time
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from sqlalchemy import Boolean, Date, DateTime, Time, inspect, select, text
+
+SNAPSHOT_FORMAT = 1
+
+BATCH_SIZE = 20000
+
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+# =====================================================
+# SCHEMA
+# =====================================================
+
+def snapshot_tables():
+    """The app's tables plus the archive tables, referenced tables first"""
+    from app import db
+    from archive import archive_metadata
+
+    return list(db.metadata.sorted_tables) + list(archive_metadata.sorted_tables)
+
+
+def schema_version(tables):
+    """Short hash of every table's column names and types"""
+    spec = [[t.name, [[c.name, str(c.type)] for c in t.columns]] for t in tables]
+    return hashlib.sha256(json.dumps(spec).encode('utf-8')).hexdigest()[:12]
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot snapshot {type(value).__name__} values")
+
+
+# =====================================================
+# EXPORT
+# =====================================================
+
+def export_snapshot(db, path):
+    """
+    Write every table to the bundle at `path` (inside an app context).
+
+    Returns:
+        dict: the manifest
+    """
+    tables = snapshot_tables()
+    manifest = {
+        'format': SNAPSHOT_FORMAT,
+        'schema_version': schema_version(tables),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'dialect': db.engine.dialect.name,
+        'tables': [],
+    }
+    existing = set(inspect(db.engine).get_table_names())
+
+    with tarfile.open(path, 'w') as bundle:
+        for table in tables:
+            if table.name not in existing:
+                continue
+            started = _time.perf_counter()
+            columns = [c.name for c in table.columns]
+            rows = 0
+            with tempfile.TemporaryFile() as member:
+                with gzip.GzipFile(fileobj=member, mode='wb', compresslevel=6) as out:
+                    writer = io.TextIOWrapper(out, encoding='utf-8')
+                    with db.engine.connect().execution_options(stream_results=True, yield_per=BATCH_SIZE) as conn:
+                        result = conn.execute(select(table).order_by(*table.primary_key.columns))
+                        for row in result:
+                            writer.write(json.dumps(list(row), default=_json_default, separators=(',', ':')))
+                            writer.write('\n')
+                            rows += 1
+                    writer.flush()
+                    writer.detach()
+                info = tarfile.TarInfo(f"tables/{table.name}.ndjson.gz")
+                info.size = member.tell()
+                info.mtime = int(_time.time())
+                member.seek(0)
+                bundle.addfile(info, member)
+            manifest['tables'].append({'name': table.name, 'columns': columns, 'rows': rows})
+            print(f"   {table.name:<28} {rows:>10,} rows  {_time.perf_counter() - started:6.1f} s")
+
+        data = json.dumps(manifest, indent=2).encode('utf-8')
+        info = tarfile.TarInfo('manifest.json')
+        info.size = len(data)
+        info.mtime = int(_time.time())
+        bundle.addfile(info, io.BytesIO(data))
+    return manifest
+
+
+# =====================================================
+# IMPORT
+# =====================================================
+
+def read_manifest(bundle):
+    manifest = json.load(bundle.extractfile('manifest.json'))
+    if manifest.get('format') != SNAPSHOT_FORMAT:
+        raise SystemExit(f"❌ Unsupported snapshot format: {manifest.get('format')}")
+    return manifest
+
+
+def _bundle_rows(bundle, name):
+    """Rows of one table member, decoded as they are read"""
+    with gzip.GzipFile(fileobj=bundle.extractfile(f"tables/{name}.ndjson.gz")) as member:
+        for line in io.TextIOWrapper(member, encoding='utf-8'):
+            yield json.loads(line)
+
+
+def _batches(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _copy_field(value):
+    """One field in COPY text format"""
+    if value is None:
+        return '\\N'
+    if value is True or value is False:
+        return 't' if value else 'f'
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def _converter(column):
+    """ISO string -> Python value for SQLite inserts (SQLAlchemy stores its own format)"""
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat
+    if isinstance(column.type, Date):
+        return date.fromisoformat
+    if isinstance(column.type, Time):
+        return time.fromisoformat
+    if isinstance(column.type, Boolean):
+        return bool
+    return None
+
+
+def _load_table(conn, table, columns, rows):
+    """Bulk-load one table; returns rows loaded"""
+    total = 0
+    if conn.dialect.name == 'postgresql':
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            for batch in _batches(rows):
+                buffer = io.StringIO()
+                for row in batch:
+                    buffer.write('\t'.join(_copy_field(v) for v in row))
+                    buffer.write('\n')
+                buffer.seek(0)
+                cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN", buffer)
+                total += len(batch)
+        finally:
+            cursor.close()
+        return total
+
+    converters = [_converter(table.columns[name]) for name in columns]
+    for batch in _batches(rows):
+        conn.execute(table.insert(), [
+            {name: (convert(value) if convert and value is not None else value)
+             for name, convert, value in zip(columns, converters, row)}
+            for row in batch
+        ])
+        total += len(batch)
+    return total
+
+
+def _drop_secondary_objects(conn, tables):
+    """
+    Drop secondary indexes (and PostgreSQL foreign keys) of `tables`.
+
+    Returns:
+        list: SQL statements that recreate them
+    """
+    recreate = []
+    if conn.dialect.name == 'postgresql':
+        fks = []
+        for table in tables:
+            for name, definition in conn.execute(text("""
+                SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+                WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'
+            """), {'table': table.name}).all():
+                conn.exec_driver_sql(f'ALTER TABLE {table.name} DROP CONSTRAINT "{name}"')
+                fks.append(f'ALTER TABLE {table.name} ADD CONSTRAINT "{name}" {definition}')
+            for name, definition in conn.execute(text("""
+                SELECT indexname, indexdef FROM pg_indexes
+                WHERE schemaname = current_schema() AND tablename = :table
+                  AND indexname NOT IN (SELECT conname FROM pg_constraint
+                                        WHERE conrelid = CAST(:table AS regclass))
+            """), {'table': table.name}).all():
+                conn.exec_driver_sql(f'DROP INDEX "{name}"')
+                recreate.append(definition)
+        return recreate + fks
+
+    for table in tables:
+        for name, sql in conn.execute(text(
+                "SELECT name, sql FROM sqlite_master "
+                "WHERE type = 'index' AND tbl_name = :table AND sql IS NOT NULL"),
+                {'table': table.name}).all():
+            conn.exec_driver_sql(f'DROP INDEX "{name}"')
+            recreate.append(sql)
+    return recreate
+
+
+def import_snapshot(db, path, reset=False):
+    """
+    Load the bundle at `path` into `db` (inside an app context).
+
+    Returns:
+        dict: table name -> rows loaded
+    """
+    from app import ensure_indexes
+    from archive import ensure_archive_tables
+    from generate_dataset import reset_tables, sync_sequences
+
+    db.create_all()
+    ensure_indexes()
+    ensure_archive_tables(db)
+    tables = {t.name: t for t in snapshot_tables()}
+
+    counts = {}
+    with tarfile.open(path, 'r') as bundle:
+        manifest = read_manifest(bundle)
+        if manifest['schema_version'] != schema_version(list(tables.values())):
+            print(f"⚠️  Snapshot schema {manifest['schema_version']} differs from this app's "
+                  f"{schema_version(list(tables.values()))}; copying matching columns only")
+
+        plan = []
+        for entry in manifest['tables']:
+            table = tables.get(entry['name'])
+            if table is None:
+                print(f"⚠️  {entry['name']}: not in this app, skipped")
+                continue
+            shared = [c for c in entry['columns'] if c in table.columns]
+            missing = [c.name for c in table.columns
+                       if c.name not in shared and not c.nullable and c.default is None
+                       and c.server_default is None and not c.primary_key]
+            if missing:
+                print(f"⚠️  {entry['name']}: snapshot has no {', '.join(missing)}, skipped")
+                continue
+            plan.append((table, entry['columns'], shared))
+
+        loaded = [table for table, _columns, _shared in plan]
+        with db.engine.begin() as conn:
+            if reset:
+                reset_tables(conn, loaded)
+            else:
+                for table in loaded:
+                    if conn.execute(select(table).limit(1)).first():
+                        raise SystemExit(f"❌ {table.name} is not empty; run with --reset to replace the data")
+
+            recreate = _drop_secondary_objects(conn, loaded)
+
+            for table, columns, shared in plan:
+                started = _time.perf_counter()
+                index = [columns.index(c) for c in shared]
+                rows = _bundle_rows(bundle, table.name)
+                if len(shared) != len(columns):
+                    rows = ([row[i] for i in index] for row in rows)
+                counts[table.name] = _load_table(conn, table, shared, rows)
+                print(f"   {table.name:<28} {counts[table.name]:>10,} rows  "
+                      f"{_time.perf_counter() - started:6.1f} s")
+
+            started = _time.perf_counter()
+            for statement in recreate:
+                conn.exec_driver_sql(statement)
+            print(f"   indexes and constraints rebuilt in {_time.perf_counter() - started:.1f} s")
+            sync_sequences(conn, [t for t in loaded if 'id' in t.columns])
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export / import a database snapshot bundle')
+    sub = parser.add_subparsers(dest='command', required=True)
+    export_cmd = sub.add_parser('export', help='write all tables to a bundle')
+    export_cmd.add_argument('path', nargs='?', default=None)
+    import_cmd = sub.add_parser('import', help='load a bundle into the configured database')
+    import_cmd.add_argument('path')
+    import_cmd.add_argument('--reset', action='store_true', help='empty the tables first')
+    args = parser.parse_args()
+
+    from app import get_app, db
+    from reporting import rebuild_reports
+
+    started = _time.perf_counter()
+    with get_app().app_context():
+        if args.command == 'export':
+            path = args.path or f"snapshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.tar"
+            print(f"📦 Exporting {db.engine.url.render_as_string(hide_password=True)} to {path}")
+            manifest = export_snapshot(db, path)
+            total = sum(t['rows'] for t in manifest['tables'])
+            print(f"✅ {total:,} rows, {os.path.getsize(path) / (1024 * 1024):.1f} MB, "
+                  f"schema {manifest['schema_version']}, {_time.perf_counter() - started:.1f} s")
+        else:
+            if not os.path.exists(args.path):
+                print(f"❌ Snapshot not found: {args.path}")
+                return 1
+            print(f"📥 Importing {args.path} into {db.engine.url.render_as_string(hide_password=True)}")
+            counts = import_snapshot(db, args.path, reset=args.reset)
+            rebuild_reports(db)
+            total = sum(counts.values())
+            elapsed = _time.perf_counter() - started
+            print(f"✅ Loaded {total:,} rows in {elapsed:.1f} s ({total / elapsed:,.0f} rows/s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,6 +11,7 @@ Admin Dashboard stays on Render: https://aisl-cimr.onrender.com/admin-login
 Both connect to the SAME Supabase database.
 """
 
+import logging
 import os
 import smtplib
 from email.mime.text import MIMEText
@@ -52,26 +53,34 @@ DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///attendance.db')
 if DATABASE_URL and DATABASE_URL.startswith('postgres://'):
     DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
 
-print(f"📊 Database URL: {DATABASE_URL[:50]}...")
+from logging_setup import setup_logging
 
-# SSL for Supabase
-if DATABASE_URL and 'postgresql' in DATABASE_URL:
-    app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-        'pool_pre_ping': True,
-        'pool_recycle': 300,
-        'connect_args': {'sslmode': 'require', 'connect_timeout': 10}
-    }
-else:
-    app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+setup_logging()
+logger = logging.getLogger('staff_portal')
+
+logger.info("📊 Database URL: %s...", DATABASE_URL[:50])
+
+# SSL for Supabase - connection profile (direct vs pooler) from db_pool.py
+from db_pool import build_engine_options, resolve_profile, warm_pool_in_background, DB_POOL_WARMUP
+
+DB_PROFILE = resolve_profile(DATABASE_URL)
+
+app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+if DB_PROFILE != 'sqlite':
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(DATABASE_URL, DB_PROFILE)
 
 db = SQLAlchemy(app)
 
+if DB_POOL_WARMUP > 0:
+    warm_pool_in_background(app, db)
+
 # Late threshold (08:15 AM)
 LATE_THRESHOLD = time(8, 15)
 
+# Casual workers are shared with the main app (see casual_workers.py)
+from casual_workers import migrate_casual_history, normalize_phone
+
 # Email config
 EMAIL_ENABLED = os.getenv('EMAIL_ENABLED', 'false').lower() == 'true'
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
@@ -215,22 +224,32 @@ class LeaveRequest(db.Model):
         }
 
 
+class CasualWorker(db.Model):
+    __tablename__ = 'casual_workers'
+    id = db.Column(db.Integer, primary_key=True)
+    phone_number = db.Column(db.String(20), unique=True, nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    default_work_type = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class CasualAttendance(db.Model):
     __tablename__ = 'casual_attendance'
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
-    phone_number = db.Column(db.String(20), nullable=False)
+    worker_id = db.Column(db.Integer, db.ForeignKey('casual_workers.id'), nullable=False)
     work_type = db.Column(db.String(50), nullable=False)
     clock_in = db.Column(db.Time, nullable=False)
     clock_out = db.Column(db.Time)
     work_date = db.Column(db.Date, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    worker = db.relationship('CasualWorker', lazy='joined', innerjoin=True)
     
     def to_dict(self):
         return {
             'id': self.id,
-            'name': self.name,
-            'phone_number': self.phone_number,
+            'worker_id': self.worker_id,
+            'name': self.worker.name,
+            'phone_number': self.worker.phone_number,
             'work_type': self.work_type,
             'clock_in': self.clock_in.strftime('%H:%M') if self.clock_in else None,
             'clock_out': self.clock_out.strftime('%H:%M') if self.clock_out else None,
@@ -285,7 +304,7 @@ def index():
         return render_template('staff/index.html', 
                               staff=staff_members, today=today, attendance=attendance_dict)
     except Exception as e:
-        print(f"ERROR: {str(e)}")
+        logger.exception("❌ ERROR: %s", e)
         return render_template('staff/index.html', staff=[], today=date.today(), attendance={}, error=str(e))
 
 
@@ -320,7 +339,7 @@ def get_employees():
         
         return jsonify({'success': True, 'employees': result})
     except Exception as e:
-        print(f"ERROR: {str(e)}")
+        logger.exception("❌ ERROR: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -375,7 +394,7 @@ def get_today_attendance():
         
         return jsonify({'success': True, 'date': today.isoformat(), 'employees': result})
     except Exception as e:
-        print(f"ERROR: {str(e)}")
+        logger.exception("❌ ERROR: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -423,7 +442,7 @@ def create_attendance():
             'is_late': is_late
         })
     except Exception as e:
-        print(f"ERROR: {str(e)}")
+        logger.exception("❌ ERROR: %s", e)
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -495,7 +514,7 @@ def leave_requests():
             'leave_request': leave_request.to_dict()
         })
     except Exception as e:
-        print(f"ERROR: {str(e)}")
+        logger.exception("❌ ERROR: %s", e)
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -526,8 +545,8 @@ def get_leave_balance(staff_id):
 def casual_clock_in():
     """Casual worker clock in"""
     data = request.get_json()
-    name = data.get('name')
-    phone_number = data.get('phone_number')
+    name = (data.get('name') or '').strip()
+    phone_number = normalize_phone(data.get('phone_number'))
     work_type = data.get('work_type')
     
     if not name or not phone_number or not work_type:
@@ -537,9 +556,14 @@ def casual_clock_in():
     now = datetime.now().time()
     
     try:
+        worker = CasualWorker.query.filter_by(phone_number=phone_number).first()
+        if worker is None:
+            worker = CasualWorker(phone_number=phone_number)
+            db.session.add(worker)
+        worker.name = name
+        worker.default_work_type = work_type
         casual = CasualAttendance(
-            name=name,
-            phone_number=phone_number,
+            worker=worker,
             work_type=work_type,
             clock_in=now,
             work_date=today
@@ -553,7 +577,7 @@ def casual_clock_in():
             'casual': casual.to_dict()
         })
     except Exception as e:
-        print(f"ERROR: {str(e)}")
+        logger.exception("❌ ERROR: %s", e)
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -562,7 +586,7 @@ def casual_clock_in():
 def casual_clock_out():
     """Casual worker clock out"""
     data = request.get_json()
-    phone_number = data.get('phone_number')
+    phone_number = normalize_phone(data.get('phone_number'))
     
     if not phone_number:
         return jsonify({'success': False, 'error': 'Phone number is required'}), 400
@@ -571,8 +595,8 @@ def casual_clock_out():
     now = datetime.now().time()
     
     try:
-        latest = CasualAttendance.query.filter(
-            CasualAttendance.phone_number == phone_number,
+        latest = CasualAttendance.query.join(CasualAttendance.worker).filter(
+            CasualWorker.phone_number == phone_number,
             CasualAttendance.work_date == today,
             CasualAttendance.clock_out == None
         ).order_by(CasualAttendance.clock_in.desc()).first()
@@ -589,7 +613,7 @@ def casual_clock_out():
             'casual': latest.to_dict()
         })
     except Exception as e:
-        print(f"ERROR: {str(e)}")
+        logger.exception("❌ ERROR: %s", e)
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -610,19 +634,9 @@ def casual_today():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@app.route('/health')
-def health_check():
-    """Health check"""
-    try:
-        staff_count = Staff.query.count()
-        return jsonify({
-            'status': 'healthy',
-            'database': 'connected',
-            'staff_count': staff_count,
-            'timestamp': datetime.utcnow().isoformat()
-        }), 200
-    except Exception as e:
-        return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
+# /livez, /readyz and /health (cached database probe, see health.py)
+from health import init_health
+init_health(app, db)
 
 
 # =====================================================
@@ -643,6 +657,7 @@ if __name__ == '__main__':
     with app.app_context():
         try:
             db.create_all()
+            migrate_casual_history(db)
             print("✅ Database tables created")
         except Exception as e:
             print(f"⚠️ Database warning: {e}")
@@ -0,0 +1,493 @@
+"""
+Checksum diff and incremental sync between a SQLite kiosk database and PostgreSQL
+--------------------------------------------------------------------------------
+Compares the two databases table by table with a three-level hash tree and
+transfers only the rows that differ.
+
+Rows are matched on their natural keys (migrate_to_supabase.NATURAL_KEYS:
+staff by employee_code, casual workers by phone number, attendance by staff
+and day, ...), never on ids, which are local to each database: ids are left
+out of the hashes and foreign keys hash as the referenced row's natural key.
+A kiosk's staff #12 is compared with the central row of the same
+employee_code, whatever its id there.
+
+1. table hash    - one md5 per table; equal tables cost one row from the server
+2. chunk hashes  - one md5 per chunk of rows whose natural-key md5 starts
+                   with the same SYNC_BUCKET_DIGITS hex digits (4096 chunks
+                   by default), fetched only for tables whose hash differs
+3. row hashes    - (natural-key md5, row md5) of the rows in differing chunks only
+
+PostgreSQL hashes its rows server-side; the SQLite side is hashed locally.
+Both sides hash the same canonical text of each row (dates as YYYY-MM-DD,
+times and timestamps with microseconds, floats to 6 decimals, booleans as
+0/1), so a clock_in stored as "08:05" in SQLite matches 08:05:00 in
+PostgreSQL. Bandwidth grows with the number of differences, not with table
+size.
+
+Directions:
+    push   local rows win: missing / changed rows are upserted into PostgreSQL
+           (COPY into a staging table, as migrate_to_supabase.py does)
+    pull   PostgreSQL rows win: missing / changed rows are upserted into SQLite
+Rows that exist only on the receiving side are reported. --delete removes
+them on a pull only: PostgreSQL holds every kiosk's rows and the web app's,
+and nothing records which source a row came from, so a push cannot tell a
+row this kiosk deleted from a row it never had.
+
+Usage:
+    python sync_db.py --source attendance_system.db --check    # verify only
+    python sync_db.py --source attendance_system.db            # push
+    python sync_db.py --source attendance_system.db --pull --delete
+
+Environment:
+    MIGRATION_TARGET_URL   PostgreSQL database (default DATABASE_URL)
+    SYNC_BUCKET_DIGITS     natural-key hash digits per chunk (default 3)
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import time as _time
+from datetime import date, datetime, time
+from decimal import Decimal
+
+import psycopg2
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, Numeric, String, Time
+
+from migrate_to_supabase import (ID_SEQUENCES, REFERENCES, SUPABASE_URL, copy_upsert, plan_tables,
+                                 prepare_target, reference_joins, refresh_reports, source_select)
+
+BUCKET_DIGITS = int(os.getenv('SYNC_BUCKET_DIGITS', '3'))
+
+# Rows fetched per query by primary key / natural-key hash
+_ROWS_PER_QUERY = 400
+
+# Field separator and NULL marker of the canonical row text
+_SEP = '\x1f'
+_NULL = '\x1e'
+
+
+# =====================================================
+# CANONICAL ROW TEXT
+# =====================================================
+
+def _canonical_sql(type_, expr):
+    """PostgreSQL expression for the canonical text of `expr` (a column of type `type_`)"""
+    if isinstance(type_, Boolean):
+        expr = f"CASE {expr} WHEN TRUE THEN '1' WHEN FALSE THEN '0' END"
+    elif isinstance(type_, DateTime):
+        expr = f"to_char({expr}, 'YYYY-MM-DD HH24:MI:SS.US')"
+    elif isinstance(type_, Date):
+        expr = f"to_char({expr}, 'YYYY-MM-DD')"
+    elif isinstance(type_, Time):
+        expr = f"to_char({expr}, 'HH24:MI:SS.US')"
+    elif isinstance(type_, (Float, Numeric)):
+        expr = f"round({expr}::numeric, 6)::text"
+    else:
+        expr = f"{expr}::text"
+    # NULL and '' must hash differently
+    return f"COALESCE({expr}, chr({ord(_NULL)}))"
+
+
+def _canonical_value(type_, value):
+    """Python twin of _canonical_sql() for a SQLite (or psycopg2) value"""
+    if value is None:
+        return _NULL
+    if isinstance(type_, Boolean):
+        return '1' if value not in (0, '0', False) else '0'
+    if isinstance(type_, DateTime):
+        if not isinstance(value, datetime):
+            value = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        return value.replace(tzinfo=None).strftime('%Y-%m-%d %H:%M:%S.%f')
+    if isinstance(type_, Date):
+        if not isinstance(value, date):
+            value = date.fromisoformat(str(value)[:10])
+        return value.isoformat()
+    if isinstance(type_, Time):
+        if not isinstance(value, time):
+            value = time.fromisoformat(str(value))
+        return value.strftime('%H:%M:%S.%f')
+    if isinstance(type_, (Float, Numeric)):
+        return f"{float(value):.6f}"
+    if isinstance(type_, Integer):
+        return str(int(value))
+    return str(value)
+
+
+def _fields(item):
+    """
+    Hashed columns: name -> (type, PostgreSQL expression, index in a
+    source_select() row). The surrogate id is left out; a foreign key is
+    hashed as the natural key of the row it references.
+    """
+    fields = {}
+    for i, name in enumerate(item['columns']):
+        if name == item['surrogate']:
+            continue
+        if name in item['refs']:
+            fields[name] = (String(), f"r_{name}.{REFERENCES[name][1]}",
+                            len(item['columns']) + item['refs'].index(name))
+        else:
+            fields[name] = (item['table'].columns[name].type, f"t.{name}", i)
+    return fields
+
+
+def _text_sql(fields, names):
+    return f"concat_ws(chr({ord(_SEP)}), {', '.join(_canonical_sql(*fields[n][:2]) for n in names)})"
+
+
+def _digest(fields, names, row):
+    text = _SEP.join(_canonical_value(fields[n][0], row[fields[n][2]]) for n in names)
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+
+def _rows_sql(item):
+    """(k, h): md5 of each row's natural key and of the whole row, as PostgreSQL computes them"""
+    fields = _fields(item)
+    return (f"SELECT md5({_text_sql(fields, item['natural'])}) AS k, md5({_text_sql(fields, fields)}) AS h "
+            f"FROM {reference_joins(item)}")
+
+
+def _batches(values, size=_ROWS_PER_QUERY):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+# =====================================================
+# HASH TREE
+# =====================================================
+
+def pg_chunk_hashes(conn, item):
+    """
+    Chunk hashes computed by PostgreSQL.
+
+    Returns:
+        dict: chunk (key hash prefix) -> md5 of the concatenated row hashes
+              in key hash order
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT substr(k, 1, {BUCKET_DIGITS}) AS chunk,
+                   md5(string_agg(h, '' ORDER BY k COLLATE "C", h COLLATE "C"))
+            FROM ({_rows_sql(item)}) r
+            GROUP BY 1
+        """)
+        return dict(cur.fetchall())
+
+
+def pg_table_hash(conn, item):
+    """md5 of all chunk hashes in chunk order (one row over the wire)"""
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT md5(COALESCE(string_agg(chunk || ':' || h, ',' ORDER BY chunk COLLATE "C"), ''))
+            FROM (SELECT substr(k, 1, {BUCKET_DIGITS}) AS chunk,
+                         md5(string_agg(h, '' ORDER BY k COLLATE "C", h COLLATE "C")) AS h
+                  FROM ({_rows_sql(item)}) r
+                  GROUP BY 1) c
+        """)
+        return cur.fetchone()[0]
+
+
+def sqlite_row_hashes(source, item):
+    """
+    Hashes of every local row, computed in Python (same text as PostgreSQL).
+
+    Returns:
+        list: (key hash, row hash, primary key) in key hash order
+    """
+    fields = _fields(item)
+    key_index = [item['columns'].index(k) for k in item['key']]
+    rows = [(_digest(fields, item['natural'], row), _digest(fields, fields, row),
+             tuple(row[i] for i in key_index))
+            for row in source.execute(source_select(item))]
+    rows.sort()
+    return rows
+
+
+def chunk_hashes(rows):
+    """Chunk hashes of sqlite_row_hashes() rows (same tree as PostgreSQL)"""
+    chunks = {}
+    for k, h, _pk in rows:
+        chunks.setdefault(k[:BUCKET_DIGITS], hashlib.md5()).update(h.encode('ascii'))
+    return {chunk: digest.hexdigest() for chunk, digest in chunks.items()}
+
+
+def table_hash(chunks):
+    text = ','.join(f"{chunk}:{h}" for chunk, h in sorted(chunks.items()))
+    return hashlib.md5(text.encode('ascii')).hexdigest()
+
+
+def pg_row_hashes(conn, item, buckets):
+    """Key hash -> row hash of the PostgreSQL rows in `buckets`"""
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT k, h FROM ({_rows_sql(item)}) r WHERE substr(k, 1, {BUCKET_DIGITS}) = ANY(%s)",
+                    (list(buckets),))
+        return dict(cur.fetchall())
+
+
+def target_columns(conn):
+    """Table name -> column names that exist in PostgreSQL (current schema)"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT table_name, column_name FROM information_schema.columns "
+                    "WHERE table_schema = current_schema()")
+        rows = cur.fetchall()
+    conn.rollback()
+    columns = {}
+    for table_name, column_name in rows:
+        columns.setdefault(table_name, set()).add(column_name)
+    return columns
+
+
+def schema_diff(source, item, remote_columns):
+    """
+    Diff counts of a table whose target schema cannot be hashed (--check
+    leaves the target's schema alone): every local row is local_only when
+    the table is missing, changed when some of its columns are.
+
+    Returns:
+        dict: local_only, remote_only, changed; None when the schemas match
+    """
+    name = item['table'].name
+    missing = [c for c in item['columns'] if c not in remote_columns.get(name, ())]
+    if not missing:
+        return None
+    rows = source.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+    if name not in remote_columns:
+        print(f"🆕 {name:<28} not on target, {rows:,} local rows")
+        return {'local_only': rows, 'remote_only': 0, 'changed': 0}
+    print(f"⚠️  {name:<28} target has no {', '.join(missing)}, {rows:,} local rows "
+          f"(sync without --check to migrate it)")
+    return {'local_only': 0, 'remote_only': 0, 'changed': rows}
+
+
+def diff_table(source, conn, item):
+    """
+    Walk the hash tree of one table.
+
+    Returns:
+        dict: local (key hash -> local primary key of the local_only and
+              changed rows), remote (key hashes of the remote_only and
+              changed rows), plus the counts local_only, remote_only, changed
+              and duplicates (local rows repeating another's natural key)
+    """
+    diff = {'local': {}, 'remote': set(), 'local_only': 0, 'remote_only': 0, 'changed': 0}
+    rows = sqlite_row_hashes(source, item)
+    diff['duplicates'] = len(rows) - len({k for k, _h, _pk in rows})
+    local_chunks = chunk_hashes(rows)
+    if pg_table_hash(conn, item) == table_hash(local_chunks):
+        return diff
+
+    remote_chunks = pg_chunk_hashes(conn, item)
+    buckets = {b for b in set(local_chunks) | set(remote_chunks)
+               if local_chunks.get(b) != remote_chunks.get(b)}
+    remote = pg_row_hashes(conn, item, sorted(buckets))
+    local = {k: (h, pk) for k, h, pk in rows if k[:BUCKET_DIGITS] in buckets}
+    for k, (h, pk) in local.items():
+        if k not in remote:
+            diff['local_only'] += 1
+        elif remote[k] != h:
+            diff['changed'] += 1
+            diff['remote'].add(k)
+        else:
+            continue
+        diff['local'][k] = pk
+    for k in remote:
+        if k not in local:
+            diff['remote_only'] += 1
+            diff['remote'].add(k)
+    conn.rollback()
+    return diff
+
+
+# =====================================================
+# TRANSFER
+# =====================================================
+
+def _sqlite_value(value):
+    """psycopg2 value in the format SQLAlchemy stores in SQLite"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, time):
+        return value.strftime('%H:%M:%S.%f')
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _pk_where(item, count):
+    """WHERE clause selecting `count` rows by primary key"""
+    key = item['key']
+    if len(key) == 1:
+        return f"t.{key[0]} IN ({', '.join('?' * count)})"
+    row = f"({', '.join('?' * len(key))})"
+    return f"({', '.join('t.' + k for k in key)}) IN (VALUES {', '.join([row] * count)})"
+
+
+def push(source, conn, item, diff):
+    """Upsert the local_only / changed local rows into PostgreSQL"""
+    rows = []
+    for batch in _batches(diff['local'].values()):
+        rows.extend(source.execute(f"{source_select(item)} WHERE {_pk_where(item, len(batch))}",
+                                   [v for pk in batch for v in pk]).fetchall())
+    if not rows:
+        return
+    with conn.cursor() as cur:
+        skipped = copy_upsert(cur, item, rows)
+    conn.commit()
+    if skipped:
+        print(f"⚠️  {item['table'].name}: {skipped:,} rows reference a staff member / worker "
+              f"missing from the target, skipped")
+
+
+def pull(source, conn, item, diff, delete=False):
+    """Upsert the remote_only / changed PostgreSQL rows into SQLite (and delete local-only rows)"""
+    table_name, columns, key = item['table'].name, item['columns'], item['key']
+    fields = _fields(item)
+    rows = []
+    with conn.cursor() as cur:
+        for batch in _batches(diff['remote']):
+            cur.execute(f"{source_select(item)} WHERE md5({_text_sql(fields, item['natural'])}) = ANY(%s)",
+                        (batch,))
+            rows.extend(cur.fetchall())
+    conn.rollback()
+
+    # The referenced rows were pulled first (plan order): map natural keys to local ids
+    local_ids = {c: dict(source.execute(f"SELECT {REFERENCES[c][1]}, id FROM {REFERENCES[c][0]}"))
+                 for c in item['refs']}
+    written = [c for c in columns if c != item['surrogate']]
+    updated = [c for c in written if c not in key]
+    next_id = None
+    if table_name in ID_SEQUENCES:
+        next_id = source.execute(f"SELECT MAX(m) FROM (SELECT MAX(id) AS m FROM {ID_SEQUENCES[table_name]} "
+                                 f"UNION ALL SELECT MAX(id) FROM {table_name})").fetchone()[0] or 0
+    skipped = 0
+    with source:
+        for row in rows:
+            values = dict(zip(columns, (_sqlite_value(v) for v in row)))
+            for i, c in enumerate(item['refs']):
+                values[c] = local_ids[c].get(row[len(columns) + i])
+            if any(values[c] is None for c in item['refs']):
+                skipped += 1
+                continue
+            pk = diff['local'].get(_digest(fields, item['natural'], row))
+            if pk is not None:
+                source.execute(f"UPDATE {table_name} SET {', '.join(f'{c} = ?' for c in updated)} "
+                               f"WHERE {' AND '.join(f'{k} = ?' for k in key)}",
+                               [values[c] for c in updated] + list(pk))
+                continue
+            insert = written
+            if next_id is not None:
+                next_id += 1
+                values['id'], insert = next_id, ['id'] + written
+            source.execute(f"INSERT INTO {table_name} ({', '.join(insert)}) "
+                           f"VALUES ({', '.join('?' * len(insert))})", [values[c] for c in insert])
+        local_only = [pk for k, pk in diff['local'].items() if k not in diff['remote']]
+        if delete and local_only:
+            source.executemany(f"DELETE FROM {table_name} WHERE {' AND '.join(f'{k} = ?' for k in key)}",
+                               local_only)
+    if skipped:
+        print(f"⚠️  {table_name}: {skipped:,} rows reference a staff member / worker "
+              f"missing locally, skipped")
+
+
+# =====================================================
+# MAIN
+# =====================================================
+
+def sync(source_path, target_url, direction='push', delete=False, check=False):
+    """
+    Diff every table and transfer the differences.
+
+    Args:
+        direction: 'push' (local wins) or 'pull' (PostgreSQL wins)
+        delete: delete the local-only rows of a pull
+        check: only report the differences (no DDL or writes on either side)
+
+    Returns:
+        dict: table name -> diff counts
+    """
+    if delete and direction == 'push':
+        raise ValueError("--delete needs --pull: PostgreSQL rows are not scoped to a source, "
+                         "so a push would delete other kiosks' and the web app's rows")
+    flask_app, tables = prepare_target(target_url, create=not check)
+    conn = psycopg2.connect(target_url)
+    source = sqlite3.connect(source_path if not check and direction == 'pull'
+                             else f"file:{source_path}?mode=ro", uri=True)
+    plan = plan_tables(source, tables)
+
+    results = {}
+    try:
+        remote_columns = target_columns(conn) if check else None
+        for item in plan:
+            if remote_columns is not None:
+                counts = schema_diff(source, item, remote_columns)
+                if counts is not None:
+                    results[item['table'].name] = counts
+                    continue
+            started = _time.perf_counter()
+            diff = diff_table(source, conn, item)
+            counts = {k: diff[k] for k in ('local_only', 'remote_only', 'changed')}
+            results[item['table'].name] = counts
+            elapsed = _time.perf_counter() - started
+            if diff['duplicates']:
+                print(f"⚠️  {item['table'].name}: {diff['duplicates']:,} local rows repeat another row's "
+                      f"{', '.join(item['natural'])}; only one of each is synced")
+            if not any(counts.values()):
+                print(f"✅ {item['table'].name:<28} in sync  {elapsed:6.2f} s")
+                continue
+            print(f"🔀 {item['table'].name:<28} local only {counts['local_only']:>7,}  "
+                  f"Supabase only {counts['remote_only']:>7,}  changed {counts['changed']:>7,}  {elapsed:6.2f} s")
+            if check:
+                continue
+            if direction == 'push':
+                push(source, conn, item, diff)
+            else:
+                pull(source, conn, item, diff, delete=delete)
+    finally:
+        source.close()
+        conn.close()
+    if not check and direction == 'push' and any(any(c.values()) for c in results.values()):
+        # Pushed rows can be back-dated: rebuild the facts and reports
+        refresh_reports(flask_app)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Checksum diff / incremental sync of SQLite and PostgreSQL')
+    parser.add_argument('--source', default='attendance_system.db', help='local SQLite database file')
+    parser.add_argument('--target', default=SUPABASE_URL, help='PostgreSQL URL (default MIGRATION_TARGET_URL / DATABASE_URL)')
+    parser.add_argument('--pull', action='store_true', help='PostgreSQL rows win (default: local rows win)')
+    parser.add_argument('--delete', action='store_true', help='with --pull: delete local rows missing in PostgreSQL')
+    parser.add_argument('--check', action='store_true', help='only report differences')
+    args = parser.parse_args()
+    if args.delete and not args.pull:
+        parser.error("--delete needs --pull: PostgreSQL holds every kiosk's rows, with no record "
+                     "of their source, so a push cannot tell which rows this kiosk deleted")
+
+    if not os.path.exists(args.source):
+        print(f"❌ Local database not found: {args.source}")
+        return 1
+    target_url = args.target.replace('postgres://', 'postgresql://', 1)
+    if not target_url.startswith('postgresql://'):
+        print("❌ No PostgreSQL target: set MIGRATION_TARGET_URL (or DATABASE_URL) or pass --target")
+        return 1
+
+    direction = 'pull' if args.pull else 'push'
+    print(f"🔍 {'Checking' if args.check else 'Syncing (' + direction + ')'} {args.source} <-> "
+          f"{target_url.rsplit('@', 1)[-1]}")
+    started = _time.perf_counter()
+    results = sync(args.source, target_url, direction=direction, delete=args.delete, check=args.check)
+    differing = sum(sum(c.values()) for c in results.values())
+    print(f"{'✅' if not differing else '🔀'} {differing:,} differing rows in "
+          f"{_time.perf_counter() - started:.1f} s")
+    return 1 if args.check and differing else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
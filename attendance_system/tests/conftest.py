@@ -0,0 +1,35 @@
+"""
+Shared test setup: app.py imported with the scheduler, report refresher,
+pool warm-up and email off, and an application bound to a scratch SQLite
+database per test.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Read once, when app.py and its modules are imported
+for _name, _value in (('DATABASE_URL', 'sqlite://'), ('SCHEDULER_ENABLED', '0'),
+                      ('REPORT_REFRESH_SECONDS', '0'), ('DB_POOL_WARMUP', '0'),
+                      ('EMAIL_ENABLED', 'false'), ('LOG_LEVEL', 'WARNING')):
+    os.environ.setdefault(_name, _value)
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    return tmp_path / 'attendance.db'
+
+
+@pytest.fixture
+def app_module(monkeypatch, database_path):
+    """app.py, with get_app() returning an app on the scratch database"""
+    import app
+
+    flask_app = app.create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database_path}'})
+    monkeypatch.setattr(app, '_app', flask_app)
+    yield app
+    with flask_app.app_context():
+        app.db.engine.dispose()
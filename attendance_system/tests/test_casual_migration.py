@@ -0,0 +1,86 @@
+"""
+migrate_database() on a casual_attendance table from before the worker
+registry (name / phone_number on every shift).
+"""
+
+import sqlite3
+
+import pytest
+
+# Pre-registry schema (one row per shift, phone numbers as typed)
+LEGACY_SCHEMA = """
+    CREATE TABLE casual_attendance (
+        id INTEGER NOT NULL PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        phone_number VARCHAR(20) NOT NULL,
+        work_type VARCHAR(50) NOT NULL,
+        clock_in TIME NOT NULL,
+        clock_out TIME,
+        work_date DATE NOT NULL,
+        created_at DATETIME
+    )
+"""
+
+LEGACY_SHIFTS = [
+    (1, 'Jane W', '+254 712 345 678', 'Loading', '08:00:00.000000', '17:00:00.000000', '2026-10-01'),
+    (2, 'Peter K', '0733-111-222', 'Loading', '08:00:00.000000', '16:00:00.000000', '2026-10-01'),
+    (3, 'Jane Wanjiru', '712345678', 'Sorting', '07:30:00.000000', '15:30:00.000000', '2026-10-02'),
+    (4, 'Peter Kamau', '+254 733 111 222', 'Packing', '09:00:00.000000', None, '2026-10-02'),
+    (5, 'Jane Wanjiru', '0712-345-678', 'Sorting', '08:00:00.000000', '12:00:00.000000', '2026-10-03'),
+]
+
+
+@pytest.fixture
+def legacy_database(database_path):
+    with sqlite3.connect(database_path) as conn:
+        conn.execute(LEGACY_SCHEMA)
+        conn.executemany(
+            "INSERT INTO casual_attendance "
+            "(id, name, phone_number, work_type, clock_in, clock_out, work_date, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, '2026-10-01 08:00:00.000000')", LEGACY_SHIFTS)
+    return database_path
+
+
+def _schema(path):
+    with sqlite3.connect(path) as conn:
+        columns = {row[1]: row for row in conn.execute("PRAGMA table_info(casual_attendance)")}
+        workers = {phone: (worker_id, name, work_type) for worker_id, phone, name, work_type in conn.execute(
+            "SELECT id, phone_number, name, default_work_type FROM casual_workers")}
+        shifts = dict(conn.execute("SELECT id, worker_id FROM casual_attendance"))
+    return columns, workers, shifts
+
+
+def test_migration_builds_registry(app_module, legacy_database):
+    app_module.migrate_database()
+
+    columns, workers, shifts = _schema(legacy_database)
+    assert 'name' not in columns and 'phone_number' not in columns
+    assert columns['worker_id'][3] == 1  # NOT NULL, as in a fresh database
+
+    # One worker per normalized phone; the latest shift's name and type win
+    assert {phone: w[1:] for phone, w in workers.items()} == {
+        '0712345678': ('Jane Wanjiru', 'Sorting'),
+        '0733111222': ('Peter Kamau', 'Packing'),
+    }
+    jane, peter = workers['0712345678'][0], workers['0733111222'][0]
+    assert shifts == {1: jane, 2: peter, 3: jane, 4: peter, 5: jane}
+
+
+def test_second_run_is_a_no_op(app_module, legacy_database):
+    from casual_workers import migrate_casual_history, needs_migration
+
+    app_module.migrate_database()
+    before = _schema(legacy_database)
+
+    app_module.migrate_database()
+    assert _schema(legacy_database) == before
+    with app_module.get_app().app_context():
+        assert not needs_migration(app_module.db)
+        assert migrate_casual_history(app_module.db) == 0
+
+
+def test_ensure_indexes_refuses_legacy_schema(app_module, legacy_database):
+    with app_module.get_app().app_context():
+        app_module.db.create_all()
+        with pytest.raises(RuntimeError, match='casual_workers.py --migrate'):
+            app_module.ensure_indexes()
@@ -0,0 +1,96 @@
+"""
+Casual payroll hours: overnight and open shifts, period bounds, the
+closed-period cache and request validation.
+"""
+
+from datetime import date, time
+
+import pytest
+
+import casual_payroll as payroll
+
+
+@pytest.fixture
+def worker_id(app_module):
+    """Id of a registered worker (inside an app context)"""
+    db = app_module.db
+    with app_module.get_app().app_context():
+        db.create_all()
+        worker = app_module.CasualWorker(phone_number='0712345678', name='Jane Wanjiru',
+                                         default_work_type='Loading')
+        db.session.add(worker)
+        db.session.commit()
+        yield worker.id
+
+
+def _shift(app_module, worker_id, work_date, clock_in, clock_out=None, work_type='Loading'):
+    shift = app_module.CasualAttendance(worker_id=worker_id, work_type=work_type, work_date=work_date,
+                                        clock_in=clock_in, clock_out=clock_out)
+    app_module.db.session.add(shift)
+    app_module.db.session.commit()
+    return shift
+
+
+def test_overnight_shift_counts_eight_hours(app_module, worker_id):
+    assert payroll.shift_hours(time(22, 0), time(6, 0)) == 8
+    _shift(app_module, worker_id, date(2026, 10, 5), time(22, 0), time(6, 0))
+
+    result = payroll.compute_payroll(app_module.db, date(2026, 10, 5), date(2026, 10, 5))
+    assert result['rows'][0]['hours'] == 8
+    assert result['totals']['hours'] == 8
+
+
+def test_open_shifts_are_counted_not_paid(app_module, worker_id):
+    _shift(app_module, worker_id, date(2026, 10, 5), time(8, 0), time(12, 30))
+    _shift(app_module, worker_id, date(2026, 10, 6), time(8, 0))
+
+    totals = payroll.compute_payroll(app_module.db, date(2026, 10, 5), date(2026, 10, 6))['totals']
+    assert totals == {'workers': 1, 'shifts': 2, 'open_shifts': 1, 'hours': 4.5}
+
+
+def test_week_runs_monday_to_sunday(app_module, worker_id):
+    # Sunday night's shift ends on Monday but belongs to the week it started in
+    assert payroll.period_bounds('week', date(2026, 10, 25)) == (date(2026, 10, 19), date(2026, 10, 25))
+    _shift(app_module, worker_id, date(2026, 10, 18), time(8, 0), time(16, 0))
+    _shift(app_module, worker_id, date(2026, 10, 19), time(8, 0), time(12, 0))
+    _shift(app_module, worker_id, date(2026, 10, 25), time(22, 0), time(4, 0))
+    _shift(app_module, worker_id, date(2026, 10, 26), time(8, 0), time(17, 0))
+
+    start, end = payroll.period_bounds('week', date(2026, 10, 21))
+    totals = payroll.compute_payroll(app_module.db, start, end)['totals']
+    assert (totals['shifts'], totals['hours']) == (2, 10)
+
+
+def test_closed_period_with_open_shifts_is_not_cached(app_module, worker_id):
+    start, end = payroll.period_bounds('month', date(2026, 8, 1))
+    _shift(app_module, worker_id, date(2026, 8, 3), time(8, 0), time(16, 0))
+    stale = _shift(app_module, worker_id, date(2026, 8, 4), time(8, 0))
+
+    first = payroll.casual_payroll(app_module.db, start, end)
+    assert first['closed'] and not first['cached'] and first['totals']['open_shifts'] == 1
+    assert not payroll.casual_payroll(app_module.db, start, end)['cached']
+
+    # Closed later (close_stale_shifts()): the counts change, then they are cached
+    stale.clock_out = time(12, 0)
+    app_module.db.session.commit()
+    fresh = payroll.casual_payroll(app_module.db, start, end)
+    assert not fresh['cached'] and fresh['totals']['hours'] == 12
+    cached = payroll.casual_payroll(app_module.db, start, end)
+    assert cached['cached'] and cached['totals'] == fresh['totals']
+
+
+@pytest.mark.parametrize('query', [
+    'period=fortnight',
+    'period=week&date=2026-13-01',
+    'period=day&date=yesterday',
+    'start=2026-10-15&end=2026-10-01',
+    'start=2026-10-01&end=soon',
+])
+def test_invalid_period_is_rejected(app_module, worker_id, query):
+    client = app_module.get_app().test_client()
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+    for path in ('/api/casual/payroll', '/api/casual/payroll.csv'):
+        response = client.get(f'{path}?{query}')
+        assert response.status_code == 400, path
+        assert response.json['error'].startswith('Invalid period')
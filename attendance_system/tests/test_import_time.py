@@ -0,0 +1,52 @@
+"""
+Import-time and cold-start budgets of check_import_time.py, run as tests so
+a heavy module-level import fails CI instead of slowing every worker boot.
+"""
+
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import check_import_time as budget  # noqa: E402
+
+RUNS = 3
+
+
+@pytest.fixture(autouse=True)
+def isolated_env(monkeypatch, tmp_path):
+    # Inherited by the measuring interpreters: a scratch database the
+    # /health probe can count staff in, no background threads, quiet logs
+    from app import Staff
+
+    database = tmp_path / 'attendance.db'
+    engine = create_engine(f'sqlite:///{database}')
+    Staff.__table__.create(engine)
+    engine.dispose()
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{database}')
+    monkeypatch.setenv('SCHEDULER_ENABLED', '0')
+    monkeypatch.setenv('REPORT_REFRESH_SECONDS', '0')
+    monkeypatch.setenv('DB_POOL_WARMUP', '0')
+    monkeypatch.setenv('LOG_LEVEL', 'WARNING')
+
+
+def test_import_app_within_budget():
+    import_ms, _rows = min((budget.measure_import() for _ in range(RUNS)), key=lambda r: r[0])
+    assert import_ms <= budget.IMPORT_TIME_BUDGET_MS, (
+        f"import app took {import_ms:.0f} ms (budget {budget.IMPORT_TIME_BUDGET_MS:.0f} ms)")
+
+
+def test_deferred_modules_not_imported_at_startup():
+    _import_ms, rows = budget.measure_import()
+    imported = {name for name, _self_us, _cumulative_us, _depth in rows}
+    assert [m for m in budget.DEFERRED_MODULES if m in imported] == []
+
+
+def test_cold_start_within_budget():
+    cold_ms, status = min((budget.measure_cold_start() for _ in range(RUNS)), key=lambda r: r[0])
+    assert status == 200
+    assert cold_ms <= budget.COLD_START_BUDGET_MS, (
+        f"cold start took {cold_ms:.0f} ms (budget {budget.COLD_START_BUDGET_MS:.0f} ms)")
@@ -0,0 +1,102 @@
+"""
+fiscal_year_rollover_job() across fiscal years, and lease-row leader election.
+"""
+
+import json
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def scheduler(app_module):
+    """scheduler.py inside an app context, with three employees on 5 days of leave"""
+    import scheduler
+    from archive import ensure_archive_tables
+
+    db = app_module.db
+    with app_module.get_app().app_context():
+        db.create_all()
+        ensure_archive_tables(db)
+        scheduler.ensure_scheduler_tables(db)
+        for code, active in (('EMP001', True), ('EMP002', True), ('EMP003', False)):
+            db.session.add(app_module.Staff(employee_code=code, first_name='Test', last_name=code,
+                                            join_date=date(2020, 1, 1), is_active=active,
+                                            leave_balance=5))
+        db.session.commit()
+        yield scheduler
+
+
+def _rollover(app_module, scheduler, today):
+    """Run the job as the scheduler does (recorded in scheduler_runs) on `today`"""
+    job = scheduler.Job('fiscal_year_rollover', 3600,
+                        lambda db: scheduler.fiscal_year_rollover_job(db, today))
+    run_id = scheduler.run_job(app_module.get_app(), app_module.db, job)
+    with app_module.db.engine.connect() as conn:
+        row = conn.execute(scheduler.scheduler_runs.select()
+                           .where(scheduler.scheduler_runs.c.id == run_id)).one()
+    assert row.status == 'ok', row.error
+    return json.loads(row.detail)
+
+
+def _balances(app_module):
+    return {s.employee_code: s.leave_balance for s in app_module.Staff.query.all()}
+
+
+def test_first_run_only_records_the_year(app_module, scheduler):
+    assert _rollover(app_module, scheduler, date(2026, 10, 19)) == {'fiscal_year': 2027, 'baseline': True}
+    assert _balances(app_module) == {'EMP001': 5, 'EMP002': 5, 'EMP003': 5}
+
+
+def test_same_year_run_is_a_no_op(app_module, scheduler):
+    _rollover(app_module, scheduler, date(2026, 10, 19))
+    assert _rollover(app_module, scheduler, date(2027, 9, 30)) == {'fiscal_year': 2027}
+    assert _balances(app_module) == {'EMP001': 5, 'EMP002': 5, 'EMP003': 5}
+
+
+def test_new_year_resets_leave_once_and_archives(app_module, scheduler):
+    db = app_module.db
+    staff_id = app_module.Staff.query.filter_by(employee_code='EMP001').one().id
+    for day in (date(2024, 3, 4), date(2025, 3, 4), date(2026, 3, 4)):
+        db.session.add(app_module.Attendance(staff_id=staff_id, work_date=day, clock_in=time(8, 0),
+                                             status='present'))
+    db.session.commit()
+    _rollover(app_module, scheduler, date(2026, 9, 15))
+
+    detail = _rollover(app_module, scheduler, date(2026, 10, 1))
+    assert detail['fiscal_year'] == 2027 and detail['leave_reset'] == 2
+    # FY2024 and FY2025 are closed; FY2026 and FY2027 stay live
+    assert detail['archived'] == 2
+    assert _balances(app_module) == {'EMP001': 21, 'EMP002': 21, 'EMP003': 5}
+
+    app_module.Staff.query.filter_by(employee_code='EMP001').one().leave_balance = 20
+    db.session.commit()
+    assert _rollover(app_module, scheduler, date(2026, 10, 2)) == {'fiscal_year': 2027}
+    assert _balances(app_module)['EMP001'] == 20
+
+
+def test_lease_has_one_holder_until_it_expires(app_module, scheduler, monkeypatch):
+    db = app_module.db
+    holder = {'name': 'kiosk:1'}
+    monkeypatch.setattr(scheduler, 'process_name', lambda: holder['name'])
+    leaders = {name: scheduler.LeaseLeader(db) for name in ('kiosk:1', 'kiosk:2')}
+
+    def acquire(name):
+        holder['name'] = name
+        return leaders[name].acquire()
+
+    assert acquire('kiosk:1')
+    assert not acquire('kiosk:2')
+    assert acquire('kiosk:1')  # renewal
+    assert not acquire('kiosk:2')
+
+    # The holder stops renewing: the lease passes once it has expired
+    with db.engine.begin() as conn:
+        conn.execute(scheduler.scheduler_leader.update()
+                     .values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    assert acquire('kiosk:2')
+    assert not acquire('kiosk:1')
+
+    holder['name'] = 'kiosk:2'
+    leaders['kiosk:2'].release()
+    assert acquire('kiosk:1')